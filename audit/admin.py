@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from audit.models import Auditoria
+
+
+@admin.register(Auditoria)
+class AuditoriaAdmin(admin.ModelAdmin):
+    """Auditoría (solo lectura)"""
+
+    list_display = ('fecha', 'entidad', 'objeto_id', 'accion', 'usuario')
+    list_filter = ('entidad', 'accion')
+    search_fields = ('objeto_id',)
+    list_select_related = ('usuario',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
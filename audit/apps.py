@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class AuditConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'audit'
+    verbose_name = 'Auditoría'
+
+    def ready(self):
+        from . import registro
+        registro.conectar()
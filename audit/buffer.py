@@ -0,0 +1,93 @@
+"""
+Buffer en memoria de registros de auditoría.
+
+Los registros llegan ya confirmados (``transaction.on_commit``) y un hilo
+de fondo los inserta con ``bulk_create`` cada ``FLUSH_INTERVAL`` segundos,
+o antes si el buffer llega a ``BATCH_SIZE``. Así la petición que guarda un
+pago no espera el INSERT de auditoría.
+
+Con ``FLUSH_INTERVAL = 0`` se insertan en el mismo hilo al confirmar la
+transacción (útil en pruebas y comandos). Lo pendiente se inserta también
+al salir del proceso; si el proceso muere sin salir, se pierden a lo sumo
+los registros de un intervalo.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger('audit')
+
+
+def configuracion():
+    config = {'FLUSH_INTERVAL': 2.0, 'BATCH_SIZE': 200, 'MAX_PENDING': 10000}
+    config.update(getattr(settings, 'AUDIT_SETTINGS', {}))
+    return config
+
+
+class BufferAuditoria:
+
+    def __init__(self):
+        self._pendientes = []
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._vaciar_al_salir = False
+
+    def agregar(self, registro):
+        config = configuracion()
+        with self._lock:
+            self._pendientes.append(registro)
+            lleno = len(self._pendientes) >= config['BATCH_SIZE']
+        if not config['FLUSH_INTERVAL']:
+            self.vaciar()
+            return
+        self._asegurar_hilo()
+        if lleno:
+            self._despertar.set()
+
+    def vaciar(self):
+        """Inserta lo pendiente. Devuelve cuántos registros se guardaron."""
+        from .models import Auditoria
+
+        with self._lock:
+            registros, self._pendientes = self._pendientes, []
+        if not registros:
+            return 0
+        try:
+            Auditoria.objects.bulk_create(registros, batch_size=500)
+        except DatabaseError:
+            logger.exception('No se pudo guardar la auditoría (%d registros)', len(registros))
+            with self._lock:
+                # Se reintenta en el siguiente ciclo, sin crecer sin límite
+                self._pendientes[:0] = registros[-configuracion()['MAX_PENDING']:]
+            return 0
+        return len(registros)
+
+    def _asegurar_hilo(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._ciclo, name='auditoria', daemon=True)
+            self._hilo.start()
+            if not self._vaciar_al_salir:
+                atexit.register(self.vaciar)
+                self._vaciar_al_salir = True
+
+    def _ciclo(self):
+        while True:
+            self._despertar.wait(configuracion()['FLUSH_INTERVAL'])
+            self._despertar.clear()
+            try:
+                self.vaciar()
+            finally:
+                connections.close_all()
+
+
+buffer = BufferAuditoria()
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:49
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Auditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidad', models.CharField(help_text='app_label.modelo', max_length=50)),
+                ('objeto_id', models.BigIntegerField()),
+                ('accion', models.CharField(choices=[('CREAR', 'Creación'), ('EDITAR', 'Edición'), ('BORRAR', 'Eliminación')], max_length=6)),
+                ('cambios', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('fecha', models.DateTimeField()),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Auditoría',
+                'verbose_name_plural': 'Auditoría',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['entidad', 'objeto_id', 'fecha'], name='auditoria_objeto_idx')],
+            },
+        ),
+    ]
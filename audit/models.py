@@ -0,0 +1,60 @@
+"""
+Modelos de auditoría: una fila por cambio, con el diff de campos en JSON
+"""
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class AuditableMixin:
+    """
+    Guarda los valores con que se cargó la instancia (sin consultas extra)
+    para que ``audit.registro`` calcule el diff al guardar.
+    """
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._auditoria_inicial = dict(zip(field_names, values))
+        return instance
+
+
+class Auditoria(models.Model):
+    """Cambio de un registro auditado"""
+    
+    ACCION_CHOICES = [
+        ('CREAR', 'Creación'),
+        ('EDITAR', 'Edición'),
+        ('BORRAR', 'Eliminación'),
+    ]
+    
+    entidad = models.CharField(max_length=50, help_text="app_label.modelo")
+    objeto_id = models.BigIntegerField()
+    accion = models.CharField(max_length=6, choices=ACCION_CHOICES)
+    # {campo: [antes, después]}; en CREAR y BORRAR, {campo: valor}
+    cambios = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    fecha = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Auditoría"
+        verbose_name_plural = "Auditoría"
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['entidad', 'objeto_id', 'fecha'], name='auditoria_objeto_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.entidad}:{self.objeto_id} {self.accion} {self.fecha:%Y-%m-%d %H:%M}"
+    
+    @property
+    def campos(self):
+        """[(campo, antes, después)] para mostrar en las plantillas"""
+        if self.accion == 'EDITAR':
+            return [(campo, antes, despues) for campo, (antes, despues) in self.cambios.items()]
+        if self.accion == 'CREAR':
+            return [(campo, None, valor) for campo, valor in self.cambios.items()]
+        return [(campo, valor, None) for campo, valor in self.cambios.items()]
@@ -0,0 +1,125 @@
+"""
+Captura de cambios de los modelos auditados.
+
+Los modelos listados en ``AUDIT_SETTINGS['MODELS']`` (con
+``AuditableMixin``) registran en ``post_save`` / ``post_delete`` el diff de
+sus campos contra los valores con que se cargaron. El registro se entrega
+al buffer (audit/buffer.py) solo cuando la transacción se confirma: un
+cambio revertido no deja rastro.
+
+El usuario sale de la petición en curso (``AuditoriaMiddleware``); en
+comandos y tareas queda vacío.
+"""
+
+import contextvars
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .buffer import buffer
+from .models import Auditoria
+
+
+MODELOS = ['loans.Prestamo', 'loans.Cliente', 'loans.CoDeudor', 'payments.Pago']
+
+_peticion = contextvars.ContextVar('auditoria_peticion', default=None)
+
+
+def modelos_auditados():
+    return [apps.get_model(etiqueta) for etiqueta in getattr(settings, 'AUDIT_SETTINGS', {}).get('MODELS', MODELOS)]
+
+
+def conectar():
+    for modelo in modelos_auditados():
+        post_save.connect(_guardado, sender=modelo, dispatch_uid=f'auditoria_guardado_{modelo._meta.label_lower}')
+        post_delete.connect(_borrado, sender=modelo, dispatch_uid=f'auditoria_borrado_{modelo._meta.label_lower}')
+
+
+def usuario_actual():
+    request = _peticion.get()
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+# ============= DIFF =============
+
+def _plano(valor):
+    if isinstance(valor, FieldFile):
+        return valor.name
+    return valor
+
+
+def _valores(instance):
+    """Campos auditables cargados en la instancia (sin tocar descriptores)"""
+    return {
+        campo.attname: _plano(instance.__dict__[campo.attname])
+        for campo in instance._meta.concrete_fields
+        if campo.attname in instance.__dict__
+        and not getattr(campo, 'auto_now', False)
+        and not getattr(campo, 'auto_now_add', False)
+    }
+
+
+def _sin_vacios(valores):
+    return {campo: valor for campo, valor in valores.items() if valor not in (None, '')}
+
+
+def _guardado(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    nuevos = _valores(instance)
+    if created:
+        accion, cambios = 'CREAR', _sin_vacios(nuevos)
+    else:
+        anteriores = getattr(instance, '_auditoria_inicial', None)
+        if anteriores is None:
+            # Instancia que no salió de la base de datos: sin valores previos
+            cambios = {campo: [None, valor] for campo, valor in _sin_vacios(nuevos).items()}
+        else:
+            cambios = {
+                campo: [_plano(anteriores[campo]), valor]
+                for campo, valor in nuevos.items()
+                if campo in anteriores and _plano(anteriores[campo]) != valor
+            }
+        accion = 'EDITAR'
+    instance._auditoria_inicial = nuevos
+    if cambios:
+        _encolar(sender, instance.pk, accion, cambios, using)
+
+
+def _borrado(sender, instance, using=None, **kwargs):
+    _encolar(sender, instance.pk, 'BORRAR', _sin_vacios(_valores(instance)), using)
+
+
+def _encolar(modelo, objeto_id, accion, cambios, using):
+    registro = Auditoria(
+        entidad=modelo._meta.label_lower,
+        objeto_id=objeto_id,
+        accion=accion,
+        cambios=cambios,
+        usuario_id=usuario_actual(),
+        fecha=timezone.now(),
+    )
+    transaction.on_commit(partial(buffer.agregar, registro), using=using)
+
+
+# ============= CONSULTA =============
+
+def historial(*objetos, relacionados=None, limite=50):
+    """
+    Últimos cambios de los objetos dados y, opcionalmente, de los
+    relacionados: ``{modelo: queryset de ids}`` (p. ej. los pagos de un
+    préstamo). Una consulta.
+    """
+    filtro = Q()
+    for objeto in objetos:
+        filtro |= Q(entidad=objeto._meta.label_lower, objeto_id=objeto.pk)
+    for modelo, ids in (relacionados or {}).items():
+        filtro |= Q(entidad=modelo._meta.label_lower, objeto_id__in=ids)
+    return Auditoria.objects.filter(filtro).select_related('usuario').order_by('-fecha', '-id')[:limite]
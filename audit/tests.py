@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from audit.models import Auditoria
+from audit.registro import historial
+from loans.models import Cliente
+from prestamosjl.pruebas import (
+    auditoria_sincrona, crear_cliente, crear_pago, crear_prestamista, crear_prestamo, crear_usuario,
+)
+
+
+@auditoria_sincrona
+class AuditoriaTest(TestCase):
+    """Diff de campos por cambio, entregado solo al confirmar la transacción"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamista = crear_prestamista()
+
+    def registros(self, objeto):
+        return list(Auditoria.objects.filter(
+            entidad=objeto._meta.label_lower, objeto_id=objeto.pk,
+        ).order_by('id').values_list('accion', 'cambios', 'usuario_id'))
+
+    def test_crear_y_editar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente = crear_cliente(self.prestamista, nombre='Ana')
+        cliente = Cliente.objects.get(pk=cliente.pk)
+        cliente.nombre = 'Ana María'
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente.save()
+            # Guardar sin cambios no deja registro
+            cliente.save()
+
+        (crear, _, _), editar = self.registros(cliente)
+        self.assertEqual(crear, 'CREAR')
+        self.assertEqual(editar, ('EDITAR', {'nombre': ['Ana', 'Ana María']}, None))
+
+    def test_transaccion_revertida_no_deja_rastro(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    cliente = crear_cliente(self.prestamista)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.registros(cliente), [])
+
+    def test_usuario_de_la_peticion_e_historial(self):
+        usuario = crear_usuario('cajero', self.prestamista)
+        prestamo = crear_prestamo(crear_cliente(self.prestamista))
+        with self.captureOnCommitCallbacks(execute=True):
+            pago = crear_pago(prestamo, 100000)
+        self.client.force_login(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('payments:pago_anular', args=[pago.pk]), {'motivo': 'Duplicado'})
+
+        accion, cambios, usuario_id = self.registros(pago)[-1]
+        self.assertEqual((accion, usuario_id), ('EDITAR', usuario.pk))
+        self.assertEqual(cambios['anulado'], [False, True])
+        # El historial del préstamo incluye los cambios de sus pagos
+        entidades = {r.entidad for r in historial(prestamo, relacionados={type(pago): [pago.pk]})}
+        self.assertEqual(entidades, {'payments.pago'})
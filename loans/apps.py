@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LoansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'loans'
+
+    def ready(self):
+        from . import panels  # noqa: F401 (conecta la invalidación de los paneles)
@@ -0,0 +1,105 @@
+"""
+Búsquedas para los campos de autocompletar.
+
+Solo en la cartera del prestamista en curso (users/tenencia.py), por
+prefijo y con límite de resultados, para que cada consulta use un índice:
+los de ``Cliente`` que empiezan por prestamista (cédula, ``Lower(nombre)``,
+``Lower(apellido)``) y el único del código del préstamo. El prefijo se expresa como
+rango (``>= q`` y ``< q + U+10FFFF``) en vez de LIKE, que en SQLite no usa
+índices con la intercalación por defecto.
+
+Configuración en ``LOAN_SETTINGS['AUTOCOMPLETE']``::
+
+    'AUTOCOMPLETE': {
+        'MIN_CHARS': 2,   # no se busca con menos caracteres
+        'LIMIT': 10,      # resultados por consulta
+    }
+"""
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from users.models import ESTADOS_ABIERTOS
+from .models import Cliente, Prestamo
+
+
+def configuracion():
+    config = {'MIN_CHARS': 2, 'LIMIT': 10}
+    config.update(getattr(settings, 'LOAN_SETTINGS', {}).get('AUTOCOMPLETE', {}))
+    return config
+
+
+def _prefijo(campo, valor):
+    return Q(**{f'{campo}__gte': valor, f'{campo}__lt': valor + '\U0010ffff'})
+
+
+def _filtro_clientes(q, prefijo=''):
+    """Q de clientes cuya cédula, nombre o apellido empieza por `q`
+    (con dos o más palabras: nombre y apellido, en cualquier orden)"""
+    palabras = q.lower().split()
+    if len(palabras) == 1:
+        return (_prefijo(f'{prefijo}cedula', q) | _prefijo(f'{prefijo}nombre_min', palabras[0])
+                | _prefijo(f'{prefijo}apellido_min', palabras[0]))
+    primera, resto = palabras[0], ' '.join(palabras[1:])
+    return (
+        (_prefijo(f'{prefijo}nombre_min', primera) & _prefijo(f'{prefijo}apellido_min', resto))
+        | (_prefijo(f'{prefijo}apellido_min', primera) & _prefijo(f'{prefijo}nombre_min', resto))
+    )
+
+
+def _con_minusculas(queryset):
+    return queryset.annotate(nombre_min=Lower('nombre'), apellido_min=Lower('apellido'))
+
+
+def clientes_activos():
+    return Cliente.del_prestamista.filter(activo=True)
+
+
+def prestamos_abiertos():
+    return Prestamo.del_prestamista.filter(estado__in=ESTADOS_ABIERTOS)
+
+
+def etiqueta_cliente(cliente):
+    return f'{cliente.nombre} {cliente.apellido} - {cliente.cedula}'
+
+
+def etiqueta_prestamo(prestamo):
+    return f'{prestamo.codigo} - {prestamo.cliente.nombre_completo} (Saldo: ${prestamo.saldo_actual:,.0f})'
+
+
+def buscar_clientes(q, limite=None):
+    """Clientes activos por prefijo de cédula, nombre o apellido"""
+    config = configuracion()
+    q = (q or '').strip()
+    if len(q) < config['MIN_CHARS']:
+        return []
+    return list(
+        _con_minusculas(clientes_activos()).filter(_filtro_clientes(q))
+        .only('id', 'nombre', 'apellido', 'cedula')
+        .order_by('apellido', 'nombre')[:limite or config['LIMIT']]
+    )
+
+
+def buscar_prestamos(q, limite=None):
+    """
+    Préstamos abiertos por prefijo del código (``PR000123``, o solo el
+    número) o de la cédula, nombre o apellido del cliente.
+    """
+    config = configuracion()
+    q = (q or '').strip()
+    if len(q) < config['MIN_CHARS']:
+        return []
+    limite = limite or config['LIMIT']
+
+    clientes = _con_minusculas(Cliente.del_prestamista.all()).filter(_filtro_clientes(q)).order_by().values('id')[:limite * 5]
+    filtro = Q(cliente_id__in=clientes)
+    if q.upper().startswith('PR'):
+        filtro |= _prefijo('codigo', q.upper())
+    elif q.isdigit():
+        filtro |= Q(codigo=f'PR{int(q):06d}')
+    return list(
+        prestamos_abiertos().filter(filtro).select_related('cliente')
+        .only('id', 'codigo', 'saldo_actual', 'cliente__nombre', 'cliente__apellido')
+        .order_by('-fecha_prestamo')[:limite]
+    )
@@ -0,0 +1,189 @@
+"""
+Causación mensual de intereses.
+
+Por cada periodo (mes) se crea una ``CausacionInteres`` por préstamo
+abierto, según su ``tipo_interes``:
+
+* ANTICIPADO: se causa el primer día del periodo.
+* VENCIDO: se causa el último día del periodo.
+
+Un préstamo entra en el periodo si ya estaba desembolsado en la fecha de
+causación, y nada se causa antes de esa fecha: el interés vencido de un mes
+se causa al cerrarlo, no el día 1 (loans/tareas.py). El proceso recorre los préstamos por id en lotes
+(``iterator`` + ``bulk_create``) y guarda en ``CheckpointLote`` el último
+id procesado en la misma transacción que el lote: si la corrida se cae,
+la siguiente retoma desde ahí. La restricción única (préstamo, periodo)
+garantiza además que repetir un lote no duplica intereses, y cada
+causación se asienta en el libro contable (loans/libro.py) en esa misma
+transacción. Repetir un periodo ya completado recorre solo los préstamos que
+aún no tienen su causación (desembolsados después, o que no habían llegado a
+la fecha de causación).
+
+Un pago en un periodo que el préstamo aún no tiene causado lo causa en el
+momento (``causar_prestamo``, desde payments/distribucion.py), con fecha de
+causación no posterior a la del pago; el proceso mensual lo encuentra ya
+causado y lo salta.
+
+Los pagos cubren solo interés causado: ``aplicar_pago`` consume las
+causaciones pendientes de la más antigua a la más reciente (como la mora
+en loans/penalidades.py) y ``revertir_pago`` lo deshace al anular.
+"""
+
+import calendar
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from users.models import ESTADOS_ABIERTOS
+from . import dinero, libro
+from .models import CausacionInteres, CheckpointLote, Prestamo
+
+
+PROCESO = 'causacion_intereses'
+
+
+def limites_periodo(periodo):
+    """Primer y último día del mes de `periodo`"""
+    inicio = periodo.replace(day=1)
+    fin = inicio.replace(day=calendar.monthrange(inicio.year, inicio.month)[1])
+    return inicio, fin
+
+
+def calcular_interes(base, porcentaje):
+    return dinero.porcentaje(base, porcentaje)
+
+
+def causar_intereses(periodo, chunk=2000, progreso=None, hoy=None):
+    """
+    Causa los intereses del periodo que ya vencieron a `hoy` (por defecto,
+    la fecha actual). Devuelve el checkpoint final. Volver a llamarla con un
+    periodo completado causa solo los préstamos que quedaron sin causación.
+    """
+    inicio, fin = limites_periodo(periodo)
+    hoy = hoy or timezone.now().date()
+    checkpoint, _ = CheckpointLote.objects.get_or_create(proceso=PROCESO, periodo=inicio)
+    if checkpoint.estado == 'COMPLETADO':
+        checkpoint.estado, checkpoint.ultimo_id = 'EN_CURSO', 0
+
+    prestamos = Prestamo.objects.filter(
+        estado__in=ESTADOS_ABIERTOS,
+        fecha_prestamo__lte=min(fin, hoy),
+        id__gt=checkpoint.ultimo_id,
+    ).exclude(
+        Exists(CausacionInteres.objects.filter(prestamo=OuterRef('pk'), periodo=inicio))
+    ).order_by('id').values_list(
+        'id', 'tipo_interes', 'saldo_actual', 'porcentaje_interes', 'fecha_prestamo'
+    )
+
+    lote = []
+    for fila in prestamos.iterator(chunk_size=chunk):
+        lote.append(fila)
+        if len(lote) >= chunk:
+            _procesar_lote(checkpoint, lote, inicio, fin, hoy)
+            if progreso:
+                progreso(checkpoint)
+            lote = []
+    if lote:
+        _procesar_lote(checkpoint, lote, inicio, fin, hoy)
+
+    checkpoint.estado = 'COMPLETADO'
+    checkpoint.finalizado = timezone.now()
+    checkpoint.save(update_fields=['estado', 'ultimo_id', 'finalizado', 'actualizado'])
+    return checkpoint
+
+
+def _procesar_lote(checkpoint, lote, inicio, fin, hoy):
+    causaciones = []
+    for pk, tipo, saldo, porcentaje, fecha_prestamo in lote:
+        fecha = inicio if tipo == 'ANTICIPADO' else fin
+        if fecha_prestamo > fecha or fecha > hoy or saldo <= 0:
+            continue
+        causaciones.append(_causacion(pk, tipo, saldo, porcentaje, inicio, fecha))
+
+    with transaction.atomic():
+        CausacionInteres.objects.bulk_create(causaciones, batch_size=500, ignore_conflicts=True)
+        if causaciones:
+            libro.registrar_lote([libro.causacion(c) for c in causaciones])
+        checkpoint.ultimo_id = lote[-1][0]
+        checkpoint.procesados += len(lote)
+        checkpoint.save(update_fields=['ultimo_id', 'procesados', 'actualizado'])
+
+
+def _causacion(prestamo_id, tipo, saldo, porcentaje, inicio, fecha):
+    return CausacionInteres(
+        prestamo_id=prestamo_id,
+        periodo=inicio,
+        fecha_causacion=fecha,
+        tipo_interes=tipo,
+        base=saldo,
+        porcentaje_interes=porcentaje,
+        valor=calcular_interes(saldo, porcentaje),
+    )
+
+
+def por_causar(prestamo, fecha):
+    """
+    Causación (sin guardar) del periodo de `fecha` si el préstamo aún no lo
+    tiene causado; None si ya lo tiene o no le corresponde.
+    """
+    inicio, fin = limites_periodo(fecha)
+    if (prestamo.estado not in ESTADOS_ABIERTOS or prestamo.saldo_actual <= 0
+            or prestamo.fecha_prestamo > fecha
+            or prestamo.causaciones.filter(periodo=inicio).exists()):
+        return None
+    # Anticipado: el día 1 (o el desembolso); vencido: se adelanta al pago
+    fecha_causacion = max(inicio, prestamo.fecha_prestamo) if prestamo.tipo_interes == 'ANTICIPADO' else fecha
+    return _causacion(
+        prestamo.pk, prestamo.tipo_interes, prestamo.saldo_actual, prestamo.porcentaje_interes,
+        inicio, fecha_causacion,
+    )
+
+
+def causar_prestamo(prestamo, fecha):
+    """
+    Causa y asienta el periodo de `fecha` si el préstamo aún no lo tiene.
+    Llamar dentro de la transacción que bloquea el préstamo.
+    """
+    causacion = por_causar(prestamo, fecha)
+    if causacion is not None:
+        causacion.save()
+        libro.registrar(*libro.causacion(causacion))
+    return causacion
+
+
+# ============= PAGOS =============
+
+def aplicar_pago(prestamo_id, valor):
+    """
+    Consume hasta `valor` de los intereses causados pendientes del préstamo,
+    del periodo más antiguo al más reciente. Devuelve lo aplicado. Llamar
+    dentro de la transacción que registra el pago.
+    """
+    restante = valor
+    pendientes = CausacionInteres.objects.select_for_update().filter(
+        prestamo_id=prestamo_id, valor_pagado__lt=F('valor')
+    ).order_by('periodo')
+    for causacion in pendientes:
+        if restante <= 0:
+            break
+        abono = min(causacion.valor - causacion.valor_pagado, restante)
+        causacion.valor_pagado += abono
+        causacion.save(update_fields=['valor_pagado'])
+        restante -= abono
+    return valor - restante
+
+
+def revertir_pago(prestamo_id, valor):
+    """Devuelve `valor` a los intereses pagados, del periodo más reciente al más antiguo"""
+    restante = valor
+    pagadas = CausacionInteres.objects.select_for_update().filter(
+        prestamo_id=prestamo_id, valor_pagado__gt=0
+    ).order_by('-periodo')
+    for causacion in pagadas:
+        if restante <= 0:
+            break
+        devolucion = min(causacion.valor_pagado, restante)
+        causacion.valor_pagado -= devolucion
+        causacion.save(update_fields=['valor_pagado'])
+        restante -= devolucion
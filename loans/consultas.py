@@ -0,0 +1,75 @@
+"""
+Consultas de las vistas y paneles de loans sobre la cartera del
+prestamista en curso (managers ``del_prestamista``).
+
+Las vistas, los paneles y ``loans/hotpaths.py`` arman sus querysets con
+estas funciones, así ``explain_hotpaths`` revisa exactamente la consulta
+que se ejecuta.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Q
+
+from .models import Cliente, Prestamo
+
+
+def clientes(search='', estado=''):
+    """Lista de clientes (loans:cliente_lista)"""
+    # deuda_total y prestamos_activos_count se mantienen en Cliente: sin JOIN
+    queryset = Cliente.del_prestamista.order_by('apellido', 'nombre')
+    if search:
+        queryset = queryset.filter(
+            Q(nombre__icontains=search) |
+            Q(apellido__icontains=search) |
+            Q(cedula__icontains=search) |
+            Q(celular__icontains=search)
+        )
+    if estado == 'activos':
+        queryset = queryset.filter(activo=True)
+    elif estado == 'inactivos':
+        queryset = queryset.filter(activo=False)
+    return queryset
+
+
+def clientes_con_deuda():
+    """Clientes con saldo, del que más debe al que menos (índice cliente_prest_deuda_idx)"""
+    return Cliente.del_prestamista.filter(deuda_total__gt=0).order_by('-deuda_total')
+
+
+def prestamos(estado='', search='', orden='-fecha_prestamo'):
+    """Lista de préstamos (loans:prestamo_lista)"""
+    queryset = Prestamo.del_prestamista.select_related('cliente', 'prestamista')
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    if search:
+        queryset = queryset.filter(
+            Q(codigo__icontains=search) |
+            Q(cliente__nombre__icontains=search) |
+            Q(cliente__apellido__icontains=search) |
+            Q(cliente__cedula__icontains=search)
+        )
+    return queryset.order_by(orden)
+
+
+def prestamos_por_fecha(desde, hasta):
+    """Préstamos desembolsados entre dos fechas (loans:reportes)"""
+    return Prestamo.del_prestamista.filter(
+        fecha_prestamo__gte=desde,
+        fecha_prestamo__lte=hasta,
+    ).select_related('cliente')
+
+
+def prestamos_en_mora(orden='-fecha_vencimiento'):
+    return Prestamo.del_prestamista.filter(
+        estado='MORA'
+    ).select_related('cliente').order_by(orden)
+
+
+def prestamos_por_vencer(hoy, dias=7):
+    """Préstamos activos que vencen entre hoy y dentro de `dias` días"""
+    return Prestamo.del_prestamista.filter(
+        fecha_vencimiento__lte=hoy + timedelta(days=dias),
+        fecha_vencimiento__gte=hoy,
+        estado='ACTIVO'
+    ).select_related('cliente').order_by('fecha_vencimiento')
@@ -0,0 +1,195 @@
+"""
+Montos en pesos.
+
+Todos los montos de los modelos son ``DineroField``. Por defecto se guardan
+como ``DecimalField`` (dos decimales). Con el modo de pesos enteros::
+
+    LOAN_SETTINGS['MONEY'] = {'INTEGER_PESOS': True}
+
+se guardan como ``BIGINT`` y en Python son ``int``: las sumas y
+comparaciones en la base de datos son enteras y al leer no hay que
+convertir cada fila a ``Decimal`` (en SQLite, desde un float).
+
+La migración ``loans.0012_dinero`` / ``payments.0007_dinero`` deja las
+columnas en el modo configurado al migrar: el tipo de columna sale del
+ajuste, no del historial de migraciones. Para cambiar de modo después:
+cambiar el ajuste y correr ``python manage.py convertir_dinero``. Mientras
+no se corra, el chequeo ``loans.E001`` (``migrate`` y ``manage.py check
+--database default``) falla: el código leería ``int`` de columnas
+decimales o al revés.
+
+Redondeo: cada cargo (interés, mora) se calcula exacto a partir del saldo
+y la tasa y se redondea una sola vez, a la unidad del modo (peso o
+centavo), con la mitad hacia arriba (``porcentaje``). Al pasar a pesos
+enteros, los montos guardados se redondean igual.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.db import connection, models
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.functions import Round
+
+
+def pesos_enteros():
+    return bool(getattr(settings, 'LOAN_SETTINGS', {}).get('MONEY', {}).get('INTEGER_PESOS', False))
+
+
+def unidad():
+    return Decimal('1') if pesos_enteros() else Decimal('0.01')
+
+
+def redondear(valor):
+    """`valor` redondeado a la unidad del modo, mitad hacia arriba (int en pesos enteros)"""
+    if pesos_enteros():
+        if isinstance(valor, int):
+            return valor
+        return int(Decimal(valor).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    return Decimal(valor).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _dividir(dividendo, divisor):
+    """División entera redondeada con la mitad hacia arriba (divisor > 0)"""
+    cociente, resto = divmod(abs(dividendo), divisor)
+    cociente += 2 * resto >= divisor
+    return cociente if dividendo >= 0 else -cociente
+
+
+def porcentaje(base, tasa, veces=1):
+    """
+    `tasa` % de `base`, `veces` veces (p. ej. días de mora), redondeado una
+    sola vez. En pesos enteros, con aritmética entera exacta.
+    """
+    if pesos_enteros():
+        numerador, denominador = Decimal(tasa).as_integer_ratio()
+        return _dividir(redondear(base) * numerador * veces, denominador * 100)
+    return redondear(Decimal(base) * Decimal(tasa) * veces / 100)
+
+
+class DineroField(models.DecimalField):
+    """
+    Monto en pesos: ``DecimalField(max_digits, 2)`` o, en modo pesos
+    enteros, ``BIGINT`` leído como ``int``. ``enteros`` fija el modo del
+    campo (None: el del ajuste); lo usa ``convertir``.
+    """
+
+    def __init__(self, *args, max_digits=12, decimal_places=2, enteros=None, **kwargs):
+        self.enteros = enteros
+        super().__init__(*args, max_digits=max_digits, decimal_places=decimal_places, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.enteros is not None:
+            kwargs['enteros'] = self.enteros
+        return name, path, args, kwargs
+
+    @property
+    def en_pesos(self):
+        return pesos_enteros() if self.enteros is None else self.enteros
+
+    def get_internal_type(self):
+        # Define el tipo de columna y los conversores del backend
+        return 'BigIntegerField' if self.en_pesos else 'DecimalField'
+
+    @property
+    def validators(self):
+        if self.en_pesos:
+            return [*self.default_validators, *self._validators]
+        return super().validators
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value is None or not self.en_pesos:
+            return value
+        return int(value.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+    def formfield(self, **kwargs):
+        if self.en_pesos:
+            kwargs.setdefault('decimal_places', 0)
+        return super().formfield(**kwargs)
+
+
+# ============= CAMBIO DE MODO =============
+
+def campos_dinero():
+    """{modelo: [campos DineroField]} de todos los modelos instalados"""
+    campos = {}
+    for modelo in apps.get_models():
+        propios = [c for c in modelo._meta.concrete_fields if isinstance(c, DineroField) and c.model is modelo]
+        if propios and not modelo._meta.proxy:
+            campos[modelo] = propios
+    return campos
+
+
+def _tipo_columna(cursor, modelo, campo):
+    for columna in connection.introspection.get_table_description(cursor, modelo._meta.db_table):
+        if columna.name == campo.column:
+            return connection.introspection.get_field_type(columna.type_code, columna)
+
+
+def fuera_de_modo():
+    """{modelo: [campos]} cuyas columnas no están en el modo configurado"""
+    destino = 'BigIntegerField' if pesos_enteros() else 'DecimalField'
+    pendientes = {}
+    with connection.cursor() as cursor:
+        tablas = set(connection.introspection.table_names(cursor))
+        for modelo, campos in campos_dinero().items():
+            if modelo._meta.db_table not in tablas:
+                continue
+            campos = [c for c in campos if _tipo_columna(cursor, modelo, c) != destino]
+            if campos:
+                pendientes[modelo] = campos
+    return pendientes
+
+
+def convertir(progreso=None):
+    """
+    Cambia las columnas de dinero que no estén en el modo configurado.
+    Al pasar a pesos enteros redondea antes los montos. Devuelve cuántas
+    columnas cambió.
+    """
+    cambiadas = 0
+    for modelo, pendientes in fuera_de_modo().items():
+        with connection.schema_editor() as schema_editor:
+            if pesos_enteros():
+                # update() del QuerySet base: también en los modelos de solo agregar
+                models.QuerySet(modelo).update(**{c.name: Round(c.name) for c in pendientes})
+            for campo in pendientes:
+                nombre, ruta, args, kwargs = campo.deconstruct()
+                anterior = DineroField(*args, enteros=not pesos_enteros(), **kwargs)
+                anterior.set_attributes_from_name(nombre)
+                anterior.model = modelo
+                schema_editor.alter_field(modelo, anterior, campo)
+        cambiadas += len(pendientes)
+        if progreso:
+            progreso(modelo, pendientes)
+    return cambiadas
+
+
+# ============= VERIFICACIÓN =============
+
+MIGRACIONES_DINERO = [('loans', '0012_dinero'), ('payments', '0007_dinero')]
+
+
+@checks.register(checks.Tags.database)
+def revisar_modo(app_configs, databases=None, **kwargs):
+    """loans.E001: columnas de dinero en otro modo que el del ajuste"""
+    if not databases or connection.alias not in databases:
+        return []
+    recorder = MigrationRecorder(connection)
+    # Antes de las migraciones de dinero las columnas son decimales
+    if not recorder.has_table() or not set(MIGRACIONES_DINERO) <= recorder.applied_migrations().keys():
+        return []
+    pendientes = fuera_de_modo()
+    if not pendientes:
+        return []
+    modo = 'pesos enteros' if pesos_enteros() else 'decimales'
+    return [checks.Error(
+        f'Las columnas de dinero no están en el modo configurado ({modo}): '
+        + ', '.join(modelo._meta.label for modelo in pendientes),
+        hint="Correr 'python manage.py convertir_dinero' o volver LOAN_SETTINGS['MONEY'] al modo anterior.",
+        id='loans.E001',
+    )]
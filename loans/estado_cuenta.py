@@ -0,0 +1,121 @@
+"""
+Estado de cuenta de un cliente: sus pagos (no anulados) con saldos
+acumulados calculados en la base de datos con funciones de ventana.
+
+Por cada movimiento:
+
+* ``capital_acumulado``: capital abonado al préstamo hasta ese pago
+  (ventana por préstamo), y de ahí ``saldo_prestamo``.
+* ``pagado_acumulado``: total pagado por el cliente hasta ese pago.
+
+Las páginas se recorren por clave (fecha_pago, id) de la más reciente a la
+más antigua. El filtro ``< cursor`` no altera las ventanas de las filas
+de la página: sus acumulados solo dependen de filas anteriores a ellas.
+
+Los pagos de préstamos archivados (payments/archivo.py) están en
+``PagoArchivado``, con los mismos ids. Cada tabla se consulta por separado
+y las filas se intercalan por la clave: ``capital_acumulado`` no cambia
+(los pagos de un préstamo están todos en la misma tabla) y a
+``pagado_acumulado`` se le suma lo pagado en la otra tabla antes de la fila.
+"""
+
+import csv
+import heapq
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Window
+from django.db.models.functions import Coalesce
+
+from payments.models import Pago, PagoArchivado
+
+
+ORDEN_ASC = [F('fecha_pago').asc(), F('id').asc()]
+
+
+def tamano_pagina():
+    return getattr(settings, 'LOAN_SETTINGS', {}).get('STATEMENT_PAGE_SIZE', 50)
+
+
+TABLAS = (Pago, PagoArchivado)
+
+
+def _clave(pago):
+    return pago.fecha_pago, pago.pk
+
+
+def movimientos(cliente, modelo=Pago):
+    """Pagos del cliente en `modelo` con sus acumulados (sin ordenar ni paginar)"""
+    otra = PagoArchivado if modelo is Pago else Pago
+    pagado_otra = otra.objects.filter(prestamo__cliente=cliente, anulado=False).filter(
+        Q(fecha_pago__lt=OuterRef('fecha_pago')) | Q(fecha_pago=OuterRef('fecha_pago'), id__lt=OuterRef('id'))
+    ).order_by().values('prestamo__cliente').annotate(total=Sum('valor_total')).values('total')
+    return modelo.objects.filter(
+        prestamo__cliente=cliente, anulado=False
+    ).select_related('prestamo').annotate(
+        capital_acumulado=Window(Sum('valor_capital'), partition_by=F('prestamo_id'), order_by=ORDEN_ASC),
+        pagado_acumulado=Window(Sum('valor_total'), order_by=ORDEN_ASC)
+        + Coalesce(Subquery(pagado_otra), Decimal('0')),
+    )
+
+
+def completar_saldo(pago):
+    pago.saldo_prestamo = pago.prestamo.valor_inicial - pago.capital_acumulado
+    return pago
+
+
+def leer_cursor(valor):
+    """'AAAA-MM-DD.id' -> (date, id); None si no es válido"""
+    try:
+        fecha, pk = valor.split('.')
+        return date.fromisoformat(fecha), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def pagina(cliente, cursor=None, tamano=None):
+    """
+    Una página del estado de cuenta, del movimiento más reciente al más
+    antiguo. Devuelve (movimientos, cursor_siguiente o None).
+    """
+    tamano = tamano or tamano_pagina()
+    filas = []
+    for modelo in TABLAS:
+        queryset = movimientos(cliente, modelo)
+        if cursor:
+            fecha, pk = cursor
+            queryset = queryset.filter(Q(fecha_pago__lt=fecha) | Q(fecha_pago=fecha, id__lt=pk))
+        filas += queryset.order_by('-fecha_pago', '-id')[:tamano + 1]
+
+    filas = sorted(filas, key=_clave, reverse=True)[:tamano + 1]
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        ultimo = filas[-1]
+        siguiente = f'{ultimo.fecha_pago.isoformat()}.{ultimo.pk}'
+    return [completar_saldo(pago) for pago in filas], siguiente
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de escribirla"""
+
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(cliente):
+    """Estado de cuenta completo en CSV, línea por línea (memoria constante)"""
+    writer = csv.writer(_Eco())
+    yield writer.writerow([
+        'Fecha', 'Recibo', 'Préstamo', 'Método', 'Valor', 'Interés', 'Capital',
+        'Saldo préstamo', 'Total pagado acumulado',
+    ])
+    tablas = [movimientos(cliente, modelo).order_by(*ORDEN_ASC).iterator(chunk_size=2000) for modelo in TABLAS]
+    for pago in heapq.merge(*tablas, key=_clave):
+        completar_saldo(pago)
+        yield writer.writerow([
+            pago.fecha_pago.isoformat(), pago.recibo_numero, pago.prestamo.codigo,
+            pago.get_metodo_pago_display(), pago.valor_total, pago.valor_interes,
+            pago.valor_capital, pago.saldo_prestamo, pago.pagado_acumulado,
+        ])
@@ -3,7 +3,11 @@ Formularios del sistema de préstamos
 """
 
 from django import forms
+from django.core.exceptions import ValidationError
+from .busqueda import clientes_activos, etiqueta_cliente, etiqueta_prestamo, prestamos_abiertos
 from .models import Cliente, Prestamo, CoDeudor
+from .widgets import AutocompletarWidget
+from payments import distribucion
 from payments.models import Pago
 
 
@@ -65,8 +69,9 @@ class ClienteForm(forms.ModelForm):
     
     def clean_cedula(self):
         cedula = self.cleaned_data.get('cedula')
-        # Verificar que no exista otra con la misma cédula
-        qs = Cliente.objects.filter(cedula=cedula)
+        # Única en la cartera del prestamista en curso: no revela si la
+        # cédula existe en otra cartera
+        qs = Cliente.del_prestamista.filter(cedula=cedula)
         if self.instance.pk:
             qs = qs.exclude(pk=self.instance.pk)
         if qs.exists():
@@ -111,16 +116,16 @@ class PrestamoForm(forms.ModelForm):
     class Meta:
         model = Prestamo
         fields = [
-            'prestamista','cliente', 'codeudor', 'valor_inicial',
+            'cliente', 'codeudor', 'valor_inicial',
             'porcentaje_interes', 'tipo_interes',
             'fecha_prestamo', 'fecha_vencimiento', 'plazo_meses',
             'letra_foto', 'letra_foto_reverso',
             'observaciones'
         ]
         widgets = {
-            'cliente': forms.Select(attrs={
-                'class': 'form-select',
-                'required': True
+            'cliente': AutocompletarWidget('loans:cliente_autocompletar', etiqueta_cliente, attrs={
+                'class': 'form-control',
+                'placeholder': 'Buscar por cédula, nombre o apellido...'
             }),
             'codeudor': forms.Select(attrs={
                 'class': 'form-select'
@@ -171,8 +176,8 @@ class PrestamoForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Ordenar clientes por apellido
-        self.fields['cliente'].queryset = Cliente.objects.filter(activo=True).order_by('apellido', 'nombre')
+        # Sin lista de clientes: el widget busca y el envío se valida por pk
+        self.fields['cliente'].queryset = clientes_activos()
         
         # Si hay un cliente seleccionado, mostrar solo sus co-deudores
         if 'cliente' in self.data:
@@ -181,8 +186,8 @@ class PrestamoForm(forms.ModelForm):
                 self.fields['codeudor'].queryset = CoDeudor.objects.filter(cliente_id=cliente_id)
             except (ValueError, TypeError):
                 pass
-        elif self.instance.pk and self.instance.cliente:
-            self.fields['codeudor'].queryset = self.instance.cliente.codeudores.all()
+        elif self.instance.pk and self.instance.cliente_id:
+            self.fields['codeudor'].queryset = CoDeudor.objects.filter(cliente_id=self.instance.cliente_id)
         else:
             self.fields['codeudor'].queryset = CoDeudor.objects.none()
     
@@ -207,9 +212,9 @@ class PagoRapidoForm(forms.ModelForm):
             'metodo_pago', 'fecha_pago', 'referencia', 'observaciones'
         ]
         widgets = {
-            'prestamo': forms.Select(attrs={
-                'class': 'form-select',
-                'required': True
+            'prestamo': AutocompletarWidget('loans:prestamo_autocompletar', etiqueta_prestamo, attrs={
+                'class': 'form-control',
+                'placeholder': 'Buscar por código o cliente...'
             }),
             'valor_total': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -249,38 +254,25 @@ class PagoRapidoForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Mostrar solo préstamos activos
-        self.fields['prestamo'].queryset = Prestamo.objects.filter(
-            estado__in=['ACTIVO', 'VENCIDO', 'MORA']
-        ).select_related('cliente').order_by('-fecha_prestamo')
+        # Solo préstamos abiertos, buscados con el widget y validados por pk
+        self.fields['prestamo'].queryset = prestamos_abiertos().select_related('cliente')
     
     def clean(self):
         cleaned_data = super().clean()
         valor_total = cleaned_data.get('valor_total')
-        valor_interes = cleaned_data.get('valor_interes', 0)
-        valor_capital = cleaned_data.get('valor_capital', 0)
         prestamo = cleaned_data.get('prestamo')
         
-        # Validar que la suma cuadre
-        if valor_interes + valor_capital != valor_total:
-            # Auto-ajustar si solo se dio el total
-            if valor_interes == 0 and valor_capital == 0:
-                # Calcular interés del mes y el resto a capital
-                if prestamo:
-                    interes_mes = prestamo.interes_mensual
-                    cleaned_data['valor_interes'] = min(interes_mes, valor_total)
-                    cleaned_data['valor_capital'] = valor_total - cleaned_data['valor_interes']
-            else:
-                raise forms.ValidationError(
-                    f'La suma de interés (${valor_interes}) y capital (${valor_capital}) '
-                    f'debe ser igual al total (${valor_total})'
+        # Vista previa del reparto (mora primero); el pago se reparte de nuevo
+        # al guardarse, con el préstamo bloqueado (payments/distribucion.py)
+        if prestamo and valor_total:
+            try:
+                distribucion.cotizar(
+                    prestamo, valor_total,
+                    cleaned_data.get('valor_interes'), cleaned_data.get('valor_capital'),
+                    cleaned_data.get('fecha_pago'),
                 )
-        
-        # Validar que no exceda el saldo
-        if prestamo and valor_capital > prestamo.saldo_actual:
-            raise forms.ValidationError(
-                f'El pago de capital (${valor_capital}) excede el saldo actual (${prestamo.saldo_actual})'
-            )
+            except ValidationError as e:
+                raise forms.ValidationError(e.messages)
         
         return cleaned_data
 
@@ -0,0 +1,120 @@
+"""
+Fotos mensuales de la cartera.
+
+Al cierre de cada mes ``tomar_foto`` guarda una ``FotoCartera`` por
+préstamo abierto (saldo, estado, mora pendiente y días de mora) y una
+``FotoPrestamista`` con los totales y las edades de la cartera. Los
+reportes históricos leen esos cortes en vez de reconstruir el estado a
+partir de los pagos.
+
+Los saldos salen del libro contable (loans/libro.py): se toma un
+checkpoint al corte y se lee el último saldo de CARTERA y MORA_POR_COBRAR;
+los préstamos sin asientos usan ``saldo_actual``. El estado es el del
+momento en que corre el proceso, por eso conviene correrlo el día del
+corte. Repetir un corte lo reemplaza.
+"""
+
+import calendar
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from users.models import ESTADOS_ABIERTOS
+from . import libro
+from .dinero import DineroField
+from .models import FotoCartera, FotoPrestamista, Prestamo, SaldoCheckpoint
+
+
+# (campo, días de mora desde, hasta)
+EDADES = [
+    ('saldo_al_dia', 0, 0),
+    ('saldo_1_30', 1, 30),
+    ('saldo_31_60', 31, 60),
+    ('saldo_61_90', 61, 90),
+    ('saldo_mas_90', 91, None),
+]
+
+MESES_HISTORIAL = 12
+MAX_MESES = 120
+
+
+def fin_de_mes(fecha):
+    return fecha.replace(day=calendar.monthrange(fecha.year, fecha.month)[1])
+
+
+def _saldo_libro(cuenta, corte):
+    return Subquery(SaldoCheckpoint.objects.filter(
+        prestamo_id=OuterRef('pk'), cuenta=cuenta, fecha__lte=corte
+    ).order_by('-fecha').values('saldo')[:1])
+
+
+def tomar_foto(corte, chunk=2000):
+    """Guarda (o reemplaza) la foto de la cartera al `corte`. Devuelve cuántos préstamos entraron"""
+    decimal = DineroField(max_digits=14)
+    prestamos = Prestamo.objects.filter(
+        estado__in=ESTADOS_ABIERTOS, fecha_prestamo__lte=corte,
+    ).annotate(
+        saldo_corte=Coalesce(_saldo_libro('CARTERA', corte), 'saldo_actual', output_field=decimal),
+        mora_corte=Coalesce(_saldo_libro('MORA_POR_COBRAR', corte), Value(Decimal('0')), output_field=decimal),
+    ).order_by('id').values_list(
+        'id', 'prestamista_id', 'estado', 'fecha_vencimiento', 'saldo_corte', 'mora_corte'
+    )
+
+    with transaction.atomic():
+        libro.tomar_checkpoint(corte)
+        FotoCartera.objects.filter(corte=corte).delete()
+        FotoPrestamista.objects.filter(corte=corte).delete()
+
+        total = 0
+        lote = []
+        for pk, prestamista_id, estado, vencimiento, saldo, mora in prestamos.iterator(chunk_size=chunk):
+            dias = (corte - vencimiento).days if vencimiento and vencimiento < corte else 0
+            lote.append(FotoCartera(
+                corte=corte, prestamo_id=pk, prestamista_id=prestamista_id, estado=estado,
+                saldo=saldo, mora_pendiente=max(mora, Decimal('0')), dias_mora=dias,
+            ))
+            if len(lote) >= chunk:
+                FotoCartera.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+        FotoCartera.objects.bulk_create(lote)
+        total += len(lote)
+
+        FotoPrestamista.objects.bulk_create([
+            FotoPrestamista(corte=corte, **fila) for fila in _totales(corte)
+        ])
+    return total
+
+
+def _totales(corte):
+    """Totales por prestamista de las fotos del corte (una consulta agrupada)"""
+    edades = {}
+    for campo, desde, hasta in EDADES:
+        rango = Q(dias_mora__gte=desde) if hasta is None else Q(dias_mora__gte=desde, dias_mora__lte=hasta)
+        edades[campo] = Coalesce(Sum('saldo', filter=rango), Decimal('0'))
+    return FotoCartera.objects.filter(corte=corte).values('prestamista_id').annotate(
+        prestamos_abiertos=Count('id'),
+        prestamos_mora=Count('id', filter=Q(estado='MORA')),
+        saldo_total=Sum('saldo'),
+        mora_pendiente=Sum('mora_pendiente'),
+        **edades,
+    ).order_by()
+
+
+def historial(prestamista, meses=None):
+    """
+    Últimos `meses` cortes del prestamista (entre 1 y MAX_MESES), del más
+    antiguo al más reciente, con la variación de saldo y de préstamos en mora
+    frente al corte anterior.
+    """
+    meses = min(max(meses or MESES_HISTORIAL, 1), MAX_MESES)
+    fotos = list(FotoPrestamista.objects.filter(prestamista=prestamista).order_by('-corte')[:meses])
+    fotos.reverse()
+    anterior = None
+    for foto in fotos:
+        foto.variacion_saldo = foto.saldo_total - anterior.saldo_total if anterior else None
+        foto.variacion_mora = foto.prestamos_mora - anterior.prestamos_mora if anterior else None
+        anterior = foto
+    return fotos
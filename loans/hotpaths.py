@@ -0,0 +1,96 @@
+"""
+Consultas frecuentes (hot paths) de las vistas, para revisar sus planes de
+ejecución con ``python manage.py explain_hotpaths``.
+
+Cada función recibe la fecha de hoy y devuelve el queryset de una vista o
+panel, armado con la misma función que usa la vista (loans/consultas.py,
+payments/consultas.py) sobre la cartera del prestamista en curso, que
+``explain_hotpaths`` fija. Para revisar una vista nueva basta con sacar
+su consulta a esos módulos y registrarla con ``@hotpath('app:vista/panel')``.
+"""
+
+from datetime import timedelta
+
+from . import consultas
+from payments import consultas as consultas_pagos
+
+
+HOTPATHS = {}
+
+
+def hotpath(nombre):
+    def registrar(func):
+        HOTPATHS[nombre] = func
+        return func
+    return registrar
+
+
+# ============= LOANS =============
+
+@hotpath('loans:dashboard/por_vencer')
+def dashboard_por_vencer(hoy):
+    return consultas.prestamos_por_vencer(hoy)[:5]
+
+
+@hotpath('loans:dashboard/mora')
+def dashboard_mora(hoy):
+    return consultas.prestamos_en_mora(orden='-fecha_prestamo')[:5]
+
+
+@hotpath('loans:dashboard/pagos_hoy')
+def dashboard_pagos_hoy(hoy):
+    return consultas_pagos.pagos_del_dia(hoy, orden='-created_at')[:5]
+
+
+@hotpath('loans:dashboard/clientes_deuda')
+def dashboard_clientes_deuda(hoy):
+    return consultas.clientes_con_deuda()[:5]
+
+
+@hotpath('loans:cliente_lista/activos')
+def cliente_lista_activos(hoy):
+    return consultas.clientes(estado='activos')
+
+
+@hotpath('loans:prestamo_lista/estado')
+def prestamo_lista_estado(hoy):
+    return consultas.prestamos(estado='ACTIVO')
+
+
+@hotpath('loans:reportes')
+def reportes(hoy):
+    return consultas.prestamos_por_fecha(hoy - timedelta(days=30), hoy)
+
+
+@hotpath('loans:prestamos_mora')
+def prestamos_mora(hoy):
+    return consultas.prestamos_en_mora()
+
+
+@hotpath('loans:prestamos_vencer')
+def prestamos_vencer(hoy):
+    return consultas.prestamos_por_vencer(hoy)
+
+
+# ============= PAYMENTS =============
+
+@hotpath('payments:pago_lista/fechas_metodo')
+def pago_lista_filtrada(hoy):
+    return consultas_pagos.pagos(
+        metodo='EFECTIVO', fecha_desde=hoy - timedelta(days=30), fecha_hasta=hoy,
+    )
+
+
+@hotpath('payments:pago_lista/referencia')
+def pago_por_referencia(hoy):
+    return consultas_pagos.pagos(referencia='TRX-000000')
+
+
+@hotpath('payments:pago_rapido/pagos_hoy')
+def pago_rapido_pagos_hoy(hoy):
+    return consultas_pagos.pagos_del_dia(hoy, orden='-created_at')[:10]
+
+
+@hotpath('payments:reporte_diario')
+def reporte_diario(hoy):
+    return consultas_pagos.pagos_del_dia(hoy)
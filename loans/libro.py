@@ -0,0 +1,294 @@
+"""
+Libro contable de partida doble, solo de agregar.
+
+Cada evento de negocio genera un ``Asiento`` con sus ``Movimiento``
+(débitos = créditos) en la misma transacción que lo registra:
+
+============  ===================================  ===================================
+Evento        Débito                               Crédito
+============  ===================================  ===================================
+Desembolso    CARTERA                              CAJA
+Interés       INTERES_POR_COBRAR                   INGRESO_INTERES
+Penalidad     MORA_POR_COBRAR                      INGRESO_MORA
+Pago          CAJA                                 MORA_POR_COBRAR, INTERES_POR_COBRAR,
+                                                   CARTERA
+Reverso       (las líneas del asiento original con débito y crédito invertidos)
+============  ===================================  ===================================
+
+Los asientos nunca se modifican ni se borran (``SoloAgregarQuerySet``):
+anular un pago agrega su reverso con fecha de la anulación. La
+``referencia`` única del asiento (``pago:123``, ``interes:7:2025-09-01``...)
+evita registrar dos veces el mismo evento.
+
+``SaldoCheckpoint`` guarda, por préstamo y cuenta, el saldo con todos los
+movimientos hasta una fecha (``tomar_checkpoint``). El saldo a cualquier
+fecha es el del último checkpoint anterior más los movimientos desde
+entonces. Un movimiento con fecha anterior a un checkpoint lo invalida.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import CharField, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from .models import Asiento, Movimiento, SaldoCheckpoint
+
+
+CUENTAS = [cuenta for cuenta, _ in Movimiento.CUENTA_CHOICES]
+CUENTAS_CREDITO = {'INGRESO_INTERES', 'INGRESO_MORA'}
+CERO = Decimal('0')
+
+
+def _asiento(prestamo_id, tipo, fecha, referencia, descripcion, lineas):
+    """(Asiento, [Movimiento]) sin guardar; `lineas` = [(cuenta, débito, crédito)]"""
+    lineas = [(cuenta, debito, credito) for cuenta, debito, credito in lineas if debito or credito]
+    debitos = sum((debito for _, debito, _ in lineas), CERO)
+    creditos = sum((credito for _, _, credito in lineas), CERO)
+    if debitos != creditos:
+        raise ValueError(f'Asiento {referencia} descuadrado: débitos {debitos} != créditos {creditos}')
+    asiento = Asiento(
+        prestamo_id=prestamo_id, tipo=tipo, fecha=fecha,
+        referencia=referencia, descripcion=descripcion[:200],
+    )
+    movimientos = [
+        Movimiento(prestamo_id=prestamo_id, cuenta=cuenta, fecha=fecha, debito=debito, credito=credito)
+        for cuenta, debito, credito in lineas
+    ]
+    return asiento, movimientos
+
+
+# ============= ASIENTOS POR EVENTO =============
+
+def desembolso(prestamo):
+    return _asiento(
+        prestamo.pk, 'DESEMBOLSO', prestamo.fecha_prestamo, f'desembolso:{prestamo.pk}',
+        f'Desembolso {prestamo.codigo}',
+        [('CARTERA', prestamo.valor_inicial, CERO), ('CAJA', CERO, prestamo.valor_inicial)],
+    )
+
+
+def causacion(causacion):
+    return _asiento(
+        causacion.prestamo_id, 'INTERES', causacion.fecha_causacion,
+        f'interes:{causacion.prestamo_id}:{causacion.periodo.isoformat()}',
+        f'Interés {causacion.tipo_interes.lower()} {causacion.periodo:%Y-%m}',
+        [('INTERES_POR_COBRAR', causacion.valor, CERO), ('INGRESO_INTERES', CERO, causacion.valor)],
+    )
+
+
+def penalidad(penalidad):
+    return _asiento(
+        penalidad.prestamo_id, 'PENALIDAD', penalidad.hasta,
+        f'penalidad:{penalidad.prestamo_id}:{penalidad.hasta.isoformat()}',
+        f'Mora {penalidad.dias} días hasta {penalidad.hasta}',
+        [('MORA_POR_COBRAR', penalidad.valor, CERO), ('INGRESO_MORA', CERO, penalidad.valor)],
+    )
+
+
+def _lineas_pago(pago):
+    return [
+        ('CAJA', pago.valor_total, CERO),
+        ('MORA_POR_COBRAR', CERO, pago.valor_mora),
+        ('INTERES_POR_COBRAR', CERO, pago.valor_interes),
+        ('CARTERA', CERO, pago.valor_capital),
+    ]
+
+
+def pago(pago):
+    return _asiento(
+        pago.prestamo_id, 'PAGO', pago.fecha_pago, f'pago:{pago.pk}',
+        f'Pago {pago.recibo_numero}', _lineas_pago(pago),
+    )
+
+
+def reverso_pago(pago, fecha=None):
+    fecha = fecha or (timezone.localdate(pago.fecha_anulacion) if pago.fecha_anulacion else timezone.now().date())
+    return _asiento(
+        pago.prestamo_id, 'REVERSO', fecha, f'reverso:pago:{pago.pk}',
+        f'Reverso {pago.recibo_numero}: {pago.motivo_anulacion or "eliminado"}',
+        [(cuenta, credito, debito) for cuenta, debito, credito in _lineas_pago(pago)],
+    )
+
+
+# ============= REGISTRO =============
+
+def registrar(asiento, movimientos):
+    """
+    Guarda el asiento de un evento nuevo (una referencia repetida viola la
+    restricción única). Llamar dentro de la transacción del evento.
+    """
+    asiento.save()
+    for movimiento in movimientos:
+        movimiento.asiento = asiento
+    Movimiento.objects.bulk_create(movimientos)
+    _invalidar_checkpoints([(asiento, movimientos)])
+
+
+def registrar_lote(asientos):
+    """
+    Guarda varios asientos con tres consultas más los bulk_create. Los que
+    ya existen (misma referencia) se omiten. Llamar dentro de la
+    transacción del evento. Devuelve cuántos asientos se crearon.
+    """
+    referencias = [asiento.referencia for asiento, _ in asientos]
+    existentes = set(Asiento.objects.filter(referencia__in=referencias).values_list('referencia', flat=True))
+    nuevos = [(asiento, movimientos) for asiento, movimientos in asientos if asiento.referencia not in existentes]
+    if not nuevos:
+        return 0
+
+    Asiento.objects.bulk_create([asiento for asiento, _ in nuevos], batch_size=500)
+    # bulk_create no devuelve ids en todos los motores: se leen por referencia
+    ids = dict(Asiento.objects.filter(
+        referencia__in=[asiento.referencia for asiento, _ in nuevos]
+    ).values_list('referencia', 'id'))
+    lineas = []
+    for asiento, movimientos in nuevos:
+        for movimiento in movimientos:
+            movimiento.asiento_id = ids[asiento.referencia]
+            lineas.append(movimiento)
+    Movimiento.objects.bulk_create(lineas, batch_size=500)
+
+    _invalidar_checkpoints(nuevos)
+    return len(nuevos)
+
+
+def _invalidar_checkpoints(asientos):
+    """Borra los checkpoints que no incluyen los movimientos recién agregados"""
+    desde = {}
+    for asiento, _ in asientos:
+        fecha = desde.get(asiento.prestamo_id)
+        desde[asiento.prestamo_id] = min(fecha, asiento.fecha) if fecha else asiento.fecha
+    if len(desde) == 1:
+        (prestamo_id, fecha), = desde.items()
+        SaldoCheckpoint.objects.filter(prestamo_id=prestamo_id, fecha__gte=fecha).delete()
+    else:
+        SaldoCheckpoint.objects.filter(
+            prestamo_id__in=desde, fecha__gte=min(desde.values())
+        ).delete()
+
+
+# ============= SALDOS =============
+
+def _neto(debito, credito, cuenta):
+    return credito - debito if cuenta in CUENTAS_CREDITO else debito - credito
+
+
+def saldos(prestamo_id, fecha=None):
+    """
+    Saldo de cada cuenta del préstamo al cierre de `fecha` (hoy por
+    defecto): último checkpoint + movimientos posteriores. Dos consultas.
+    """
+    fecha = fecha or timezone.now().date()
+    resultado = dict.fromkeys(CUENTAS, CERO)
+    movimientos = Movimiento.objects.filter(prestamo_id=prestamo_id, fecha__lte=fecha)
+
+    ultimo = SaldoCheckpoint.objects.filter(
+        prestamo_id=prestamo_id, fecha__lte=fecha
+    ).order_by('-fecha').values('fecha')[:1]
+    checkpoint = SaldoCheckpoint.objects.filter(
+        prestamo_id=prestamo_id, fecha=Subquery(ultimo)
+    ).values_list('cuenta', 'saldo', 'fecha')
+    desde = None
+    for cuenta, valor, desde in checkpoint:
+        resultado[cuenta] = valor
+    if desde:
+        movimientos = movimientos.filter(fecha__gt=desde)
+
+    for fila in movimientos.values('cuenta').annotate(debito=Sum('debito'), credito=Sum('credito')).order_by():
+        resultado[fila['cuenta']] += _neto(fila['debito'], fila['credito'], fila['cuenta'])
+    return resultado
+
+
+def saldo(prestamo_id, cuenta='CARTERA', fecha=None):
+    return saldos(prestamo_id, fecha)[cuenta]
+
+
+def _ultimo_checkpoint(fecha):
+    return SaldoCheckpoint.objects.filter(
+        prestamo_id=OuterRef('prestamo_id'), fecha__lte=fecha
+    ).order_by('-fecha').values('fecha')[:1]
+
+
+def tomar_checkpoint(fecha, chunk=500):
+    """
+    Guarda el saldo a `fecha` de los préstamos con movimientos desde su
+    último checkpoint. Devuelve cuántos préstamos se actualizaron.
+    """
+    deltas = Movimiento.objects.filter(fecha__lte=fecha).annotate(
+        ultimo_checkpoint=Subquery(_ultimo_checkpoint(fecha))
+    ).filter(
+        Q(ultimo_checkpoint__isnull=True) | Q(fecha__gt=F('ultimo_checkpoint'))
+    ).values('prestamo_id', 'cuenta').annotate(
+        debito=Sum('debito'), credito=Sum('credito'),
+    ).order_by('prestamo_id')
+
+    actualizados = 0
+    lote = defaultdict(dict)
+    for fila in deltas.iterator(chunk_size=2000):
+        # Las cuentas de un préstamo llegan juntas: se corta entre préstamos
+        if len(lote) >= chunk and fila['prestamo_id'] not in lote:
+            actualizados += _guardar_checkpoints(lote, fecha)
+            lote = defaultdict(dict)
+        lote[fila['prestamo_id']][fila['cuenta']] = _neto(fila['debito'], fila['credito'], fila['cuenta'])
+    if lote:
+        actualizados += _guardar_checkpoints(lote, fecha)
+    return actualizados
+
+
+def _guardar_checkpoints(lote, fecha):
+    saldos_previos = defaultdict(dict)
+    for prestamo_id, cuenta, valor in SaldoCheckpoint.objects.filter(
+        prestamo_id__in=lote, fecha=Subquery(_ultimo_checkpoint(fecha))
+    ).values_list('prestamo_id', 'cuenta', 'saldo'):
+        saldos_previos[prestamo_id][cuenta] = valor
+
+    checkpoints = []
+    for prestamo_id, deltas in lote.items():
+        previos = saldos_previos[prestamo_id]
+        for cuenta in CUENTAS:
+            if cuenta in previos or cuenta in deltas:
+                checkpoints.append(SaldoCheckpoint(
+                    prestamo_id=prestamo_id, cuenta=cuenta, fecha=fecha,
+                    saldo=previos.get(cuenta, CERO) + deltas.get(cuenta, CERO),
+                ))
+    SaldoCheckpoint.objects.bulk_create(checkpoints, batch_size=500, ignore_conflicts=True)
+    return len(lote)
+
+
+# ============= APERTURA =============
+
+def abrir_libro(chunk=500, progreso=None):
+    """
+    Asienta la historia de los préstamos sin asiento de desembolso
+    (anteriores al libro o cargados con bulk_create): desembolso,
+    intereses, penalidades, pagos y reversos de pagos anulados. Los que ya
+    tienen algún evento asentado (una causación posterior, por ejemplo)
+    conservan esos asientos: ``registrar_lote`` omite sus referencias.
+    Devuelve cuántos asientos se crearon.
+    """
+    from django.db import transaction
+    from payments.models import Pago
+    from .models import CausacionInteres, Penalidad, Prestamo
+
+    pendientes = Prestamo.objects.exclude(Exists(Asiento.objects.filter(
+        referencia=Concat(Value('desembolso:'), Cast(OuterRef('pk'), CharField()), output_field=CharField()),
+    ))).order_by('id').values_list('id', flat=True)
+
+    creados = 0
+    ids = list(pendientes[:chunk])
+    while ids:
+        asientos = [desembolso(prestamo) for prestamo in Prestamo.objects.filter(pk__in=ids)]
+        asientos += [causacion(c) for c in CausacionInteres.objects.filter(prestamo_id__in=ids)]
+        asientos += [penalidad(p) for p in Penalidad.objects.filter(prestamo_id__in=ids)]
+        for p in Pago.objects.filter(prestamo_id__in=ids):
+            asientos.append(pago(p))
+            if p.anulado:
+                asientos.append(reverso_pago(p))
+        with transaction.atomic():
+            creados += registrar_lote(asientos)
+        if progreso:
+            progreso(ids[-1], creados)
+        ids = list(pendientes.filter(id__gt=ids[-1])[:chunk])
+    return creados
@@ -0,0 +1,30 @@
+"""
+Asienta en el libro contable (loans/libro.py) la historia de los préstamos
+que aún no tienen asientos. Correrlo una vez después de migrar; repetirlo
+no duplica nada.
+
+    python manage.py abrir_libro
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from loans.libro import abrir_libro
+
+
+class Command(BaseCommand):
+    help = 'Asienta la historia de los préstamos sin asientos contables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=500, help='Préstamos por lote')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        creados = abrir_libro(
+            chunk=options['chunk'],
+            progreso=lambda ultimo_id, creados: self.stdout.write(f'  {creados} asientos (id <= {ultimo_id})'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{creados} asientos creados en {time.monotonic() - inicio:.1f}s'
+        ))
@@ -0,0 +1,39 @@
+"""
+Pasa los pagos y el plan de los préstamos cerrados hace más de N meses a
+las tablas de archivo (payments/archivo.py), una transacción por lote.
+Repetirlo solo archiva los que se cerraron desde la última corrida.
+
+    python manage.py archivar_prestamos
+    python manage.py archivar_prestamos --meses 24 --lote 500
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.archivo import archivar
+
+
+class Command(BaseCommand):
+    help = 'Archiva los pagos y el plan de los préstamos cerrados hace tiempo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, help="Meses desde el cierre; por defecto, LOAN_SETTINGS['ARCHIVE']")
+        parser.add_argument('--lote', type=int, help='Préstamos por transacción')
+
+    def handle(self, *args, **options):
+        if options['meses'] is not None and options['meses'] < 0:
+            raise CommandError('--meses no puede ser negativo')
+
+        inicio = time.monotonic()
+        prestamos, pagos, cuotas = archivar(
+            meses=options['meses'],
+            lote=options['lote'],
+            progreso=lambda ultimo_id, prestamos, pagos, cuotas: self.stdout.write(
+                f'  {prestamos} préstamos, {pagos} pagos (id <= {ultimo_id})'
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{prestamos} préstamos archivados con {pagos} pagos y {cuotas} cuotas '
+            f'en {time.monotonic() - inicio:.1f}s'
+        ))
@@ -0,0 +1,39 @@
+"""
+Carga la mora de los préstamos vencidos hasta una fecha de corte
+(loans/penalidades.py). Pensado para correr una vez al día; repetirlo con
+el mismo corte no carga nada más.
+
+    python manage.py calcular_penalidades
+    python manage.py calcular_penalidades --corte 2025-09-30
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from loans.penalidades import calcular_penalidades
+
+
+class Command(BaseCommand):
+    help = 'Calcula las penalidades por mora de todos los préstamos vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corte', help='Fecha de corte (AAAA-MM-DD); por defecto, hoy')
+
+    def handle(self, *args, **options):
+        if options['corte']:
+            try:
+                corte = date.fromisoformat(options['corte'])
+            except ValueError:
+                raise CommandError('La fecha de corte debe tener el formato AAAA-MM-DD')
+        else:
+            corte = timezone.now().date()
+
+        inicio = time.monotonic()
+        cargos, total = calcular_penalidades(corte)
+        self.stdout.write(self.style.SUCCESS(
+            f'Corte {corte}: {cargos} penalidades por ${total:,.2f} '
+            f'en {time.monotonic() - inicio:.1f}s'
+        ))
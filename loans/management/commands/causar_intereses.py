@@ -0,0 +1,47 @@
+"""
+Causa los intereses mensuales de los préstamos abiertos (loans/causacion.py).
+Es idempotente y se puede retomar: si se interrumpe, basta con volver a
+ejecutarlo. Solo causa lo que ya venció: el interés vencido del mes en curso
+espera a su cierre.
+
+    python manage.py causar_intereses                  # mes anterior y en curso
+    python manage.py causar_intereses --periodo 2025-09
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from loans.causacion import causar_intereses
+
+
+class Command(BaseCommand):
+    help = 'Causa los intereses del periodo para todos los préstamos abiertos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', help='Mes a causar (AAAA-MM); por defecto, el anterior y el actual')
+        parser.add_argument('--chunk', type=int, default=2000, help='Préstamos por lote')
+
+    def handle(self, *args, **options):
+        if options['periodo']:
+            try:
+                periodos = [date.fromisoformat(f"{options['periodo']}-01")]
+            except ValueError:
+                raise CommandError('El periodo debe tener el formato AAAA-MM')
+        else:
+            actual = timezone.now().date().replace(day=1)
+            periodos = [(actual - timedelta(days=1)).replace(day=1), actual]
+
+        for periodo in periodos:
+            inicio = time.monotonic()
+            checkpoint = causar_intereses(
+                periodo,
+                chunk=options['chunk'],
+                progreso=lambda c: self.stdout.write(f'  {c.procesados} préstamos (id <= {c.ultimo_id})'),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Periodo {periodo:%Y-%m}: {checkpoint.procesados} préstamos procesados '
+                f'en {time.monotonic() - inicio:.1f}s'
+            ))
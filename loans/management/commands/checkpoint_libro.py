@@ -0,0 +1,40 @@
+"""
+Guarda los saldos contables a una fecha (loans/libro.py) para que las
+consultas de saldo solo sumen los movimientos posteriores. Pensado para
+correr al cierre de cada mes.
+
+    python manage.py checkpoint_libro
+    python manage.py checkpoint_libro --fecha 2025-09-30
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from loans.libro import tomar_checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Guarda el checkpoint de saldos contables de todos los préstamos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha del checkpoint (AAAA-MM-DD); por defecto, hoy')
+
+    def handle(self, *args, **options):
+        if options['fecha']:
+            try:
+                fecha = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+        else:
+            fecha = timezone.now().date()
+
+        inicio = time.monotonic()
+        with transaction.atomic():
+            prestamos = tomar_checkpoint(fecha)
+        self.stdout.write(self.style.SUCCESS(
+            f'Checkpoint {fecha}: {prestamos} préstamos en {time.monotonic() - inicio:.1f}s'
+        ))
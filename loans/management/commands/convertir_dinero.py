@@ -0,0 +1,30 @@
+"""
+Pasa las columnas de dinero al modo de LOAN_SETTINGS['MONEY']
+(loans/dinero.py): pesos enteros (BIGINT) o decimales. Correrlo después
+de cambiar el ajuste en una base existente; si ya están en el modo
+configurado no hace nada.
+
+    python manage.py convertir_dinero
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from loans.dinero import convertir, pesos_enteros
+
+
+class Command(BaseCommand):
+    help = 'Convierte las columnas de dinero al modo configurado (pesos enteros o decimales)'
+
+    def handle(self, *args, **options):
+        modo = 'pesos enteros' if pesos_enteros() else 'decimales'
+        inicio = time.monotonic()
+        cambiadas = convertir(
+            progreso=lambda modelo, campos: self.stdout.write(
+                f'  {modelo._meta.label}: {", ".join(c.name for c in campos)}'
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{cambiadas} columnas convertidas a {modo} en {time.monotonic() - inicio:.1f}s'
+        ))
@@ -0,0 +1,40 @@
+"""
+Envía los recordatorios de pago del día (loans/recordatorios.py). Correrlo
+varias veces el mismo día no repite recordatorios: solo reintenta los
+pendientes.
+
+    python manage.py enviar_recordatorios
+    python manage.py enviar_recordatorios --prestamista 3
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from loans.recordatorios import enviar_recordatorios
+
+
+class Command(BaseCommand):
+    help = 'Envía los recordatorios de pago de los préstamos por vencer y vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Día de envío (AAAA-MM-DD); por defecto, hoy')
+        parser.add_argument('--prestamista', type=int, help='Solo los préstamos de este prestamista (id)')
+
+    def handle(self, *args, **options):
+        if options['fecha']:
+            try:
+                hoy = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+        else:
+            hoy = timezone.now().date()
+
+        inicio = time.monotonic()
+        preparados, enviados, fallidos = enviar_recordatorios(hoy, options['prestamista'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{hoy}: {preparados} preparados, {enviados} enviados, {fallidos} fallidos '
+            f'en {time.monotonic() - inicio:.1f}s'
+        ))
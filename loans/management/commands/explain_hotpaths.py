@@ -0,0 +1,109 @@
+"""
+Muestra el plan de ejecución de las consultas frecuentes de las vistas
+(loans/hotpaths.py) y reporta los recorridos completos de tablas.
+
+    python manage.py explain_hotpaths
+    python manage.py explain_hotpaths loans:reportes --verbose
+    python manage.py explain_hotpaths --fail-on-scan   # para CI
+"""
+
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from users.models import Prestamista
+from users.tenencia import usar_prestamista
+from loans.hotpaths import HOTPATHS
+
+
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def recorridos_completos(plan, vendor):
+    """Tablas leídas completas según el texto del plan"""
+    if vendor == 'sqlite':
+        tablas = []
+        for linea in plan.splitlines():
+            m = SQLITE_SCAN.search(linea)
+            # SEARCH es una búsqueda; SCAN (aun "USING INDEX") lee todas las filas
+            if m and m.group(1) != 'CONSTANT':
+                tablas.append(m.group(1))
+        return tablas
+    if vendor == 'postgresql':
+        return POSTGRES_SCAN.findall(plan)
+    if vendor == 'mysql':
+        tablas = []
+
+        def recorrer(nodo):
+            if isinstance(nodo, dict):
+                if nodo.get('access_type') == 'ALL':
+                    tablas.append(nodo.get('table_name', '?'))
+                for valor in nodo.values():
+                    recorrer(valor)
+            elif isinstance(nodo, list):
+                for valor in nodo:
+                    recorrer(valor)
+
+        recorrer(json.loads(plan))
+        return tablas
+    return []
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN de las consultas de las vistas; reporta recorridos completos de tablas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombres', nargs='*', help='Hot paths a revisar (por defecto, todos)')
+        parser.add_argument('--prestamista', type=int, help='ID del prestamista (por defecto, el primero)')
+        parser.add_argument('--analyze', action='store_true', help='Ejecuta ANALYZE antes, para planes con estadísticas')
+        parser.add_argument('--verbose', action='store_true', help='Muestra el SQL y el plan completo')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Termina con error si hay recorridos completos')
+
+    def handle(self, *args, **options):
+        desconocidos = set(options['nombres']) - set(HOTPATHS)
+        if desconocidos:
+            raise CommandError(f'Hot paths desconocidos: {", ".join(sorted(desconocidos))}')
+        nombres = options['nombres'] or sorted(HOTPATHS)
+
+        if options['prestamista']:
+            prestamista = Prestamista.objects.filter(pk=options['prestamista']).first()
+        else:
+            prestamista = Prestamista.objects.order_by('id').first()
+        if prestamista is None:
+            raise CommandError('No hay prestamista: las consultas son por cartera')
+        hoy = timezone.now().date()
+        vendor = connection.vendor
+
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        con_recorridos = 0
+        for nombre in nombres:
+            with usar_prestamista(prestamista):
+                queryset = HOTPATHS[nombre](hoy)
+                plan = queryset.explain(format='json') if vendor == 'mysql' else queryset.explain()
+            tablas = recorridos_completos(plan, vendor)
+
+            if tablas:
+                con_recorridos += 1
+                self.stdout.write(self.style.WARNING(
+                    f'[SCAN] {nombre}: recorrido completo de {", ".join(sorted(set(tablas)))}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'[ OK ] {nombre}'))
+
+            if options['verbose'] or tablas:
+                if options['verbose']:
+                    self.stdout.write(f'       {queryset.query}')
+                for linea in plan.splitlines():
+                    self.stdout.write(f'       {linea}')
+
+        resumen = f'{con_recorridos} de {len(nombres)} consultas con recorridos completos'
+        if con_recorridos and options['fail_on_scan']:
+            raise CommandError(resumen)
+        self.stdout.write(resumen)
@@ -0,0 +1,37 @@
+"""
+Guarda la foto de cierre de mes de la cartera (loans/fotos.py). Pensado
+para correr el último día de cada mes; repetir un mes reemplaza su foto.
+
+    python manage.py foto_cartera                  # mes anterior
+    python manage.py foto_cartera --mes 2025-09
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from loans.fotos import fin_de_mes, tomar_foto
+
+
+class Command(BaseCommand):
+    help = 'Guarda la foto de cierre de mes de todos los préstamos abiertos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mes a cerrar (AAAA-MM); por defecto, el anterior')
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                corte = fin_de_mes(date.fromisoformat(f"{options['mes']}-01"))
+            except ValueError:
+                raise CommandError('El mes debe tener el formato AAAA-MM')
+        else:
+            corte = timezone.now().date().replace(day=1) - timedelta(days=1)
+
+        inicio = time.monotonic()
+        prestamos = tomar_foto(corte)
+        self.stdout.write(self.style.SUCCESS(
+            f'Corte {corte}: {prestamos} préstamos en {time.monotonic() - inicio:.1f}s'
+        ))
@@ -0,0 +1,260 @@
+"""
+Genera una cartera sintética para pruebas de carga y escala.
+
+Ejemplo (volumen de producción):
+
+    python manage.py seed_portfolio --prestamistas 50 --clientes 200000 \\
+        --prestamos 500000 --pagos 5000000 --seed 42
+"""
+
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from users.models import Prestamista
+from loans.models import Cliente, CoDeudor, Prestamo
+from payments.models import Pago
+
+
+NOMBRES = [
+    'Juan', 'María', 'Carlos', 'Luisa', 'Andrés', 'Diana', 'Jorge', 'Paula',
+    'Luis', 'Camila', 'Pedro', 'Sandra', 'Felipe', 'Natalia', 'Óscar', 'Marta',
+    'Diego', 'Claudia', 'Javier', 'Ana', 'Ricardo', 'Gloria', 'Hernán', 'Lina',
+]
+APELLIDOS = [
+    'Gómez', 'Rodríguez', 'Martínez', 'López', 'García', 'Pérez', 'Sánchez',
+    'Ramírez', 'Torres', 'Díaz', 'Vargas', 'Moreno', 'Castro', 'Ortiz', 'Rojas',
+    'Jiménez', 'Herrera', 'Muñoz', 'Restrepo', 'Cardona', 'Osorio', 'Giraldo',
+]
+BARRIOS = ['Centro', 'La Floresta', 'Belén', 'Laureles', 'Robledo', 'Manrique', 'Envigado']
+RELACIONES = ['Hermano', 'Hermana', 'Esposo/a', 'Amigo', 'Padre', 'Madre', 'Primo']
+
+# Mezcla de estados de préstamo (estado, peso)
+ESTADOS = [('ACTIVO', 55), ('PAGADO', 25), ('MORA', 10), ('VENCIDO', 7), ('CANCELADO', 3)]
+METODOS = [('EFECTIVO', 70), ('TRANSFERENCIA', 20), ('CONSIGNACION', 8), ('CHEQUE', 1), ('OTRO', 1)]
+PORCENTAJE_ANULADOS = 0.02
+
+
+class Command(BaseCommand):
+    help = 'Genera una cartera sintética (prestamistas, clientes, préstamos y pagos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prestamistas', type=int, default=5)
+        parser.add_argument('--clientes', type=int, default=2000)
+        parser.add_argument('--prestamos', type=int, default=5000)
+        parser.add_argument('--pagos', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=42, help='Semilla para datos reproducibles')
+        parser.add_argument('--chunk', type=int, default=5000, help='Tamaño de lote para bulk_create')
+
+    def handle(self, *args, **options):
+        if options['prestamistas'] < 1 or options['clientes'] < 1:
+            raise CommandError('Se necesita al menos un prestamista y un cliente')
+
+        self.rng = random.Random(options['seed'])
+        self.chunk = options['chunk']
+        self.hoy = date.today()
+        inicio = time.monotonic()
+
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # Carga masiva: no esperar fsync en cada commit de lote
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+
+        prestamista_ids = self.crear_prestamistas(options['prestamistas'])
+        codeudor_por_cliente = self.crear_clientes(options['clientes'], options['seed'], prestamista_ids)
+        cliente_ids = list(codeudor_por_cliente)
+        self.crear_prestamos_y_pagos(
+            options['prestamos'], options['pagos'], cliente_ids, codeudor_por_cliente
+        )
+        # bulk_create no pasa por save(): calcular el resumen de los clientes nuevos
+        Cliente.objects.filter(pk__gte=cliente_ids[0], pk__lte=cliente_ids[-1]).actualizar_resumen()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Cartera generada en {time.monotonic() - inicio:.1f}s'
+        ))
+
+    # ---------- utilidades ----------
+
+    @staticmethod
+    def siguiente_id(model):
+        """Preasigna la secuencia: primer id libre del modelo"""
+        return (model.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+
+    def elegir(self, opciones):
+        valores, pesos = zip(*opciones)
+        return self.rng.choices(valores, weights=pesos)[0]
+
+    def celular(self):
+        return f'3{self.rng.randint(0, 2)}{self.rng.randint(10000000, 99999999)}'
+
+    def insertar(self, model, objetos):
+        for i in range(0, len(objetos), self.chunk):
+            with transaction.atomic():
+                model.objects.bulk_create(objetos[i:i + self.chunk], batch_size=self.chunk)
+
+    # ---------- generadores ----------
+
+    def crear_prestamistas(self, cantidad):
+        primer_id = self.siguiente_id(Prestamista)
+        prestamistas = [
+            Prestamista(
+                id=pk,
+                codigo=f'PR{pk:03d}',
+                nombres=self.rng.choice(NOMBRES),
+                apellidos=self.rng.choice(APELLIDOS),
+                cedula=f'PS{pk:08d}',
+                telefono=self.celular(),
+                porcentaje_prestamo=Decimal(self.rng.choice(['3.00', '4.00', '5.00'])),
+            )
+            for pk in range(primer_id, primer_id + cantidad)
+        ]
+        self.insertar(Prestamista, prestamistas)
+        self.stdout.write(f'  {cantidad} prestamistas')
+        return [p.id for p in prestamistas]
+
+    def crear_clientes(self, cantidad, seed, prestamista_ids):
+        """
+        Crea clientes y codeudores, repartidos entre los prestamistas (sus
+        préstamos quedan en esa cartera); devuelve {cliente_id: codeudor_id o None}
+        """
+        primer_id = self.siguiente_id(Cliente)
+        self.prestamista_por_cliente = {}
+        primer_codeudor = self.siguiente_id(CoDeudor)
+        codeudor_por_cliente = {}
+        codeudor_id = primer_codeudor
+
+        for base in range(primer_id, primer_id + cantidad, self.chunk):
+            clientes, codeudores = [], []
+            for pk in range(base, min(base + self.chunk, primer_id + cantidad)):
+                self.prestamista_por_cliente[pk] = prestamista_ids[pk % len(prestamista_ids)]
+                clientes.append(Cliente(
+                    id=pk,
+                    prestamista_id=self.prestamista_por_cliente[pk],
+                    nombre=self.rng.choice(NOMBRES),
+                    apellido=self.rng.choice(APELLIDOS),
+                    cedula=f'{seed:03d}{pk:09d}',
+                    direccion_principal=f'Calle {self.rng.randint(1, 120)} # {self.rng.randint(1, 99)}-{self.rng.randint(1, 99)}, {self.rng.choice(BARRIOS)}',
+                    celular=self.celular(),
+                    celular_alternativo=self.celular() if self.rng.random() < 0.3 else '',
+                    activo=self.rng.random() < 0.92,
+                ))
+                codeudor_por_cliente[pk] = None
+                if self.rng.random() < 0.35:
+                    codeudores.append(CoDeudor(
+                        id=codeudor_id,
+                        cliente_id=pk,
+                        nombre_completo=f'{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)}',
+                        cedula=f'CD{codeudor_id:09d}',
+                        celular=self.celular(),
+                        direccion=f'Carrera {self.rng.randint(1, 80)} # {self.rng.randint(1, 99)}-{self.rng.randint(1, 99)}',
+                        relacion=self.rng.choice(RELACIONES),
+                    ))
+                    codeudor_por_cliente[pk] = codeudor_id
+                    codeudor_id += 1
+            self.insertar(Cliente, clientes)
+            self.insertar(CoDeudor, codeudores)
+
+        self.stdout.write(f'  {cantidad} clientes, {codeudor_id - primer_codeudor} codeudores')
+        return codeudor_por_cliente
+
+    def crear_prestamos_y_pagos(self, total_prestamos, total_pagos, cliente_ids, codeudor_por_cliente):
+        if total_prestamos < 1:
+            return
+        primer_prestamo = self.siguiente_id(Prestamo)
+        primer_pago = self.siguiente_id(Pago)
+        pago_id = primer_pago
+        pagos_restantes = total_pagos
+
+        for base in range(primer_prestamo, primer_prestamo + total_prestamos, self.chunk):
+            prestamos, pagos = [], []
+            fin = min(base + self.chunk, primer_prestamo + total_prestamos)
+            for pk in range(base, fin):
+                prestamos_restantes = primer_prestamo + total_prestamos - pk
+                media = pagos_restantes / prestamos_restantes
+                n_pagos = min(pagos_restantes, max(0, round(self.rng.uniform(0.5, 1.5) * media)))
+                if prestamos_restantes == 1:
+                    n_pagos = pagos_restantes
+                pagos_restantes -= n_pagos
+
+                prestamo, pagos_prestamo = self.generar_prestamo(
+                    pk, pago_id, n_pagos, cliente_ids, codeudor_por_cliente
+                )
+                pago_id += len(pagos_prestamo)
+                prestamos.append(prestamo)
+                pagos.extend(pagos_prestamo)
+
+            self.insertar(Prestamo, prestamos)
+            self.insertar(Pago, pagos)
+            self.stdout.write(f'  préstamos {fin - primer_prestamo}/{total_prestamos}, pagos {pago_id - primer_pago}')
+
+    def generar_prestamo(self, pk, primer_pago, n_pagos, cliente_ids, codeudor_por_cliente):
+        rng = self.rng
+        cliente_id = rng.choice(cliente_ids)
+        prestamista_id = self.prestamista_por_cliente[cliente_id]
+        estado = self.elegir(ESTADOS)
+        valor = Decimal(rng.randrange(50, 5000) * 10000)
+        porcentaje = Decimal(rng.choice(['3.00', '4.00', '5.00', '6.00']))
+        plazo = rng.choice([3, 6, 12, 18, 24])
+        fecha_prestamo = self.hoy - timedelta(days=rng.randint(30, 365 * 3))
+        fecha_vencimiento = fecha_prestamo + timedelta(days=30 * plazo)
+
+        # Pagos mensuales (aprox.) desde el mes siguiente al desembolso
+        saldo = valor
+        pagos = []
+        dias_disponibles = max(1, (self.hoy - fecha_prestamo).days)
+        cuota_capital = (valor / max(n_pagos, 1)).quantize(Decimal('1'))
+        for i in range(n_pagos):
+            fecha_pago = fecha_prestamo + timedelta(days=min(dias_disponibles, 30 * (i + 1)) - rng.randint(0, 5))
+            interes = (saldo * porcentaje / 100).quantize(Decimal('1'))
+            ultimo_pago = estado == 'PAGADO' and i == n_pagos - 1
+            if ultimo_pago:
+                capital = saldo
+            else:
+                capital = min(saldo, cuota_capital * Decimal(rng.choice(['0', '0.5', '1', '1'])))
+            anulado = not ultimo_pago and rng.random() < PORCENTAJE_ANULADOS
+            if not anulado:
+                saldo -= capital
+            total = interes + capital
+            if total <= 0:
+                total = interes = Decimal('1')
+            pagos.append(Pago(
+                id=primer_pago + i,
+                recibo_numero=f'REC{primer_pago + i:08d}',
+                prestamo_id=pk,
+                prestamista_id=prestamista_id,
+                valor_total=total,
+                valor_interes=interes,
+                valor_capital=capital,
+                tipo='MIXTO' if interes and capital else ('INTERES' if interes else 'CAPITAL'),
+                metodo_pago=self.elegir(METODOS),
+                fecha_pago=fecha_pago,
+                anulado=anulado,
+                motivo_anulacion='Pago duplicado' if anulado else '',
+            ))
+
+        if estado == 'PAGADO' and saldo > 0 and not pagos:
+            estado = 'ACTIVO'
+        if estado == 'CANCELADO':
+            saldo = Decimal('0')
+
+        prestamo = Prestamo(
+            id=pk,
+            codigo=f'PR{pk:06d}',
+            cliente_id=cliente_id,
+            prestamista_id=prestamista_id,
+            codeudor_id=codeudor_por_cliente[cliente_id] if rng.random() < 0.6 else None,
+            valor_inicial=valor,
+            saldo_actual=max(saldo, Decimal('0')),
+            porcentaje_interes=porcentaje,
+            tipo_interes='ANTICIPADO' if rng.random() < 0.2 else 'VENCIDO',
+            fecha_prestamo=fecha_prestamo,
+            fecha_vencimiento=fecha_vencimiento,
+            plazo_meses=plazo,
+            estado=estado,
+        )
+        return prestamo, pagos
@@ -0,0 +1,56 @@
+"""
+Copia la base SQLite primaria a la réplica local con la API de backup de
+SQLite. Es el sustituto local de una réplica MySQL: la marca de tiempo de
+la copia se guarda en la réplica para que el router mida su retraso.
+
+    DB_REPLICA=prestamos_replica python manage.py sync_replica
+    DB_REPLICA=prestamos_replica python manage.py sync_replica --every 10
+"""
+
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from prestamosjl.db_router import SYNC_TABLE, replica_settings
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza la réplica SQLite local desde el primario (API de backup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0, help='Repetir cada N segundos')
+        parser.add_argument('--pages', type=int, default=1024, help='Páginas copiadas por paso del backup')
+
+    def handle(self, *args, **options):
+        alias = replica_settings()['ALIAS']
+        if alias not in connections.settings:
+            raise CommandError(f'No hay base "{alias}" configurada (defina DB_REPLICA)')
+        primario = connections['default'].settings_dict
+        replica = connections[alias].settings_dict
+        if connections['default'].vendor != 'sqlite' or connections[alias].vendor != 'sqlite':
+            raise CommandError('sync_replica solo aplica a réplicas SQLite locales')
+
+        while True:
+            inicio = time.monotonic()
+            self.sincronizar(primario['NAME'], replica['NAME'], options['pages'])
+            self.stdout.write(f'Réplica sincronizada en {(time.monotonic() - inicio) * 1000:.0f} ms')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def sincronizar(self, origen, destino, paginas):
+        marca = time.time()
+        src = sqlite3.connect(origen)
+        dst = sqlite3.connect(destino)
+        try:
+            # El backup lee una instantánea consistente aun con escrituras en WAL
+            src.backup(dst, pages=paginas)
+            dst.execute(f'CREATE TABLE IF NOT EXISTS {SYNC_TABLE} (synced_at REAL NOT NULL)')
+            dst.execute(f'DELETE FROM {SYNC_TABLE}')
+            dst.execute(f'INSERT INTO {SYNC_TABLE} (synced_at) VALUES (?)', [marca])
+            dst.commit()
+        finally:
+            dst.close()
+            src.close()
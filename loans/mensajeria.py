@@ -0,0 +1,107 @@
+"""
+Backends de envío de mensajes para los recordatorios (loans/recordatorios.py).
+
+Se elige con ``LOAN_SETTINGS['REMINDERS']['BACKEND']`` (ruta de la clase)
+y se configura con ``OPTIONS``, igual que ``EMAIL_BACKEND``:
+
+* ``ConsolaBackend``: imprime cada mensaje (desarrollo).
+* ``ArchivoBackend``: agrega cada mensaje como una línea JSON a ``PATH``.
+* ``WebhookBackend``: POST JSON a la pasarela SMS/WhatsApp en ``URL``.
+
+Un backend propio hereda ``BackendMensajes`` e implementa ``enviar``;
+los errores se informan con ``ErrorEnvio`` (``reintentable=False`` si no
+tiene sentido repetir, p. ej. número inválido).
+"""
+
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class ErrorEnvio(Exception):
+
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+
+class BackendMensajes:
+    """Los backends se comparten entre hilos: `enviar` debe ser seguro"""
+
+    def __init__(self, CHANNEL='SMS', **opciones):
+        self.canal = CHANNEL
+        self.opciones = opciones
+
+    def enviar(self, numero, texto):
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+
+class ConsolaBackend(BackendMensajes):
+
+    _lock = threading.Lock()
+
+    def enviar(self, numero, texto):
+        with self._lock:
+            sys.stdout.write(f'[{self.canal} {numero}] {texto}\n')
+            sys.stdout.flush()
+
+
+class ArchivoBackend(BackendMensajes):
+
+    def __init__(self, PATH=None, **opciones):
+        super().__init__(**opciones)
+        self.path = PATH or os.path.join(settings.BASE_DIR, 'recordatorios.jsonl')
+        self._lock = threading.Lock()
+        self._archivo = None
+
+    def enviar(self, numero, texto):
+        linea = json.dumps({
+            'fecha': timezone.now().isoformat(), 'canal': self.canal, 'numero': numero, 'texto': texto,
+        }, ensure_ascii=False)
+        with self._lock:
+            if self._archivo is None:
+                self._archivo = open(self.path, 'a', encoding='utf-8')
+            self._archivo.write(linea + '\n')
+            self._archivo.flush()
+
+    def cerrar(self):
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+
+class WebhookBackend(BackendMensajes):
+    """
+    Pasarela HTTP genérica: ``{"to", "body", "channel"}`` por POST, con
+    ``Authorization: Bearer TOKEN``. 429 y 5xx se reintentan.
+    """
+
+    def __init__(self, URL, TOKEN='', TIMEOUT=10, **opciones):
+        super().__init__(**opciones)
+        self.url = URL
+        self.token = TOKEN
+        self.timeout = TIMEOUT
+
+    def enviar(self, numero, texto):
+        cuerpo = json.dumps({'to': numero, 'body': texto, 'channel': self.canal}).encode('utf-8')
+        peticion = urllib.request.Request(self.url, data=cuerpo, method='POST', headers={
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.token}',
+        })
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout):
+                pass
+        except urllib.error.HTTPError as error:
+            raise ErrorEnvio(f'HTTP {error.code}', reintentable=error.code == 429 or error.code >= 500)
+        except (urllib.error.URLError, TimeoutError) as error:
+            raise ErrorEnvio(str(error))
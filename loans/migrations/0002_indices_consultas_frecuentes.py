@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['activo', 'apellido', 'nombre'], name='cliente_activo_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codeudor',
+            index=models.Index(fields=['cedula'], name='codeudor_cedula_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['prestamista', 'estado'], name='prestamo_prestamista_est_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['estado', 'fecha_vencimiento'], name='prestamo_estado_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(condition=models.Q(('estado', 'ACTIVO')), fields=['fecha_vencimiento'], name='prestamo_activo_venc_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:30
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_resumen(apps, schema_editor):
+    """Llena el resumen desnormalizado de los clientes existentes"""
+    Cliente = apps.get_model('loans', 'Cliente')
+    Prestamo = apps.get_model('loans', 'Prestamo')
+    Pago = apps.get_model('payments', 'Pago')
+
+    prestamos = Prestamo.objects.filter(cliente=OuterRef('pk')).order_by().values('cliente')
+    Cliente.objects.update(
+        deuda_total=Coalesce(
+            Subquery(prestamos.filter(estado__in=['ACTIVO', 'VENCIDO', 'MORA'])
+                     .annotate(total=Sum('saldo_actual')).values('total')),
+            Decimal('0'), output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        ),
+        prestamos_activos_count=Coalesce(
+            Subquery(prestamos.filter(estado='ACTIVO').annotate(total=Count('id')).values('total')), 0,
+        ),
+        ultimo_pago=Subquery(
+            Pago.objects.filter(prestamo__cliente=OuterRef('pk'), anulado=False)
+            .order_by().values('prestamo__cliente').annotate(ultimo=Max('fecha_pago'))
+            .values('ultimo')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_indices_consultas_frecuentes'),
+        ('payments', '0002_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='deuda_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='prestamos_activos_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='ultimo_pago',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['-deuda_total'], name='cliente_deuda_idx'),
+        ),
+        migrations.RunPython(calcular_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_resumen_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proceso', models.CharField(max_length=50)),
+                ('periodo', models.DateField()),
+                ('ultimo_id', models.BigIntegerField(default=0, help_text='Último id procesado (en orden ascendente)')),
+                ('procesados', models.PositiveIntegerField(default=0)),
+                ('estado', models.CharField(choices=[('EN_CURSO', 'En curso'), ('COMPLETADO', 'Completado')], default='EN_CURSO', max_length=10)),
+                ('iniciado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('finalizado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Lote',
+                'verbose_name_plural': 'Checkpoints de Lote',
+                'constraints': [models.UniqueConstraint(fields=('proceso', 'periodo'), name='checkpoint_proceso_periodo_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CausacionInteres',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primer día del mes causado')),
+                ('fecha_causacion', models.DateField(help_text='Inicio del periodo si el interés es anticipado, fin si es vencido')),
+                ('tipo_interes', models.CharField(choices=[('ANTICIPADO', 'Anticipado'), ('VENCIDO', 'Vencido')], max_length=11)),
+                ('base', models.DecimalField(decimal_places=2, help_text='Saldo sobre el que se causó', max_digits=12)),
+                ('porcentaje_interes', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='causaciones', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Causación de Interés',
+                'verbose_name_plural': 'Causaciones de Interés',
+                'ordering': ['prestamo', 'periodo'],
+                'constraints': [models.UniqueConstraint(fields=('prestamo', 'periodo'), name='causacion_prestamo_periodo_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_causacion_intereses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Penalidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.DateField()),
+                ('hasta', models.DateField()),
+                ('dias', models.PositiveIntegerField()),
+                ('base', models.DecimalField(decimal_places=2, help_text='Saldo vencido sobre el que se calculó', max_digits=12)),
+                ('tasa_diaria', models.DecimalField(decimal_places=4, help_text='Porcentaje diario aplicado', max_digits=7)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='penalidades', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Penalidad',
+                'verbose_name_plural': 'Penalidades',
+                'ordering': ['prestamo', 'hasta'],
+                'constraints': [models.UniqueConstraint(fields=('prestamo', 'hasta'), name='penalidad_prestamo_hasta_uniq')],
+            },
+        ),
+    ]
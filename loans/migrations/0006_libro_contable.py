@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_penalidades'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Asiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('DESEMBOLSO', 'Desembolso'), ('INTERES', 'Causación de interés'), ('PENALIDAD', 'Penalidad por mora'), ('PAGO', 'Pago'), ('REVERSO', 'Reverso')], max_length=10)),
+                ('fecha', models.DateField()),
+                ('referencia', models.CharField(help_text='Evento de origen, p. ej. pago:123', max_length=50, unique=True)),
+                ('descripcion', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='asientos', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Asiento',
+                'verbose_name_plural': 'Asientos',
+                'ordering': ['fecha', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Movimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cuenta', models.CharField(choices=[('CAJA', 'Caja'), ('CARTERA', 'Cartera (capital por cobrar)'), ('INTERES_POR_COBRAR', 'Intereses por cobrar'), ('MORA_POR_COBRAR', 'Mora por cobrar'), ('INGRESO_INTERES', 'Ingreso por intereses'), ('INGRESO_MORA', 'Ingreso por mora')], max_length=20)),
+                ('fecha', models.DateField()),
+                ('debito', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credito', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('asiento', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos', to='loans.asiento')),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Movimiento',
+                'verbose_name_plural': 'Movimientos',
+                'ordering': ['fecha', 'id'],
+                'indexes': [models.Index(fields=['prestamo', 'cuenta', 'fecha'], name='movimiento_prestamo_cuenta_idx'), models.Index(fields=['fecha'], name='movimiento_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cuenta', models.CharField(choices=[('CAJA', 'Caja'), ('CARTERA', 'Cartera (capital por cobrar)'), ('INTERES_POR_COBRAR', 'Intereses por cobrar'), ('MORA_POR_COBRAR', 'Mora por cobrar'), ('INGRESO_INTERES', 'Ingreso por intereses'), ('INGRESO_MORA', 'Ingreso por mora')], max_length=20)),
+                ('fecha', models.DateField()),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_checkpoint', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Saldo',
+                'verbose_name_plural': 'Checkpoints de Saldo',
+                'constraints': [models.UniqueConstraint(fields=('prestamo', 'cuenta', 'fecha'), name='saldo_checkpoint_uniq')],
+            },
+        ),
+    ]
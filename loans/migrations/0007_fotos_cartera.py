@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_libro_contable'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FotoCartera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corte', models.DateField()),
+                ('estado', models.CharField(choices=[('ACTIVO', 'Activo'), ('PAGADO', 'Pagado'), ('VENCIDO', 'Vencido'), ('MORA', 'En Mora'), ('CANCELADO', 'Cancelado')], max_length=10)),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('mora_pendiente', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dias_mora', models.PositiveIntegerField(default=0)),
+                ('prestamista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos_cartera', to='users.prestamista')),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Foto de Cartera',
+                'verbose_name_plural': 'Fotos de Cartera',
+                'indexes': [models.Index(fields=['prestamista', 'corte'], name='foto_cartera_prestamista_idx')],
+                'constraints': [models.UniqueConstraint(fields=('corte', 'prestamo'), name='foto_cartera_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FotoPrestamista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corte', models.DateField()),
+                ('prestamos_abiertos', models.PositiveIntegerField(default=0)),
+                ('prestamos_mora', models.PositiveIntegerField(default=0)),
+                ('saldo_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('mora_pendiente', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo_al_dia', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo_1_30', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo_mas_90', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('prestamista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos', to='users.prestamista')),
+            ],
+            options={
+                'verbose_name': 'Foto de Prestamista',
+                'verbose_name_plural': 'Fotos de Prestamista',
+                'ordering': ['-corte'],
+                'constraints': [models.UniqueConstraint(fields=('prestamista', 'corte'), name='foto_prestamista_uniq')],
+            },
+        ),
+    ]
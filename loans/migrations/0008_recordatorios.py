@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0007_fotos_cartera'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recordatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('canal', models.CharField(max_length=10)),
+                ('numero', models.CharField(max_length=15)),
+                ('mensaje', models.TextField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIADO', 'Enviado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('enviado_en', models.DateTimeField(blank=True, null=True)),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recordatorios', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Recordatorio',
+                'verbose_name_plural': 'Recordatorios',
+                'indexes': [models.Index(fields=['fecha', 'estado'], name='recordatorio_fecha_estado_idx')],
+                'constraints': [models.UniqueConstraint(fields=('prestamo', 'fecha'), name='recordatorio_diario_uniq')],
+            },
+        ),
+    ]
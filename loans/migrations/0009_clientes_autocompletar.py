@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0008_recordatorios'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Lower('nombre'), name='cliente_nombre_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Lower('apellido'), name='cliente_apellido_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:07
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def asignar_prestamista(apps, schema_editor):
+    """Cada cliente queda en la cartera del prestamista de su último préstamo"""
+    Cliente = apps.get_model('loans', 'Cliente')
+    Prestamo = apps.get_model('loans', 'Prestamo')
+    Prestamista = apps.get_model('users', 'Prestamista')
+
+    Cliente.objects.update(prestamista=Subquery(
+        Prestamo.objects.filter(cliente=OuterRef('pk')).order_by('-fecha_prestamo', '-id').values('prestamista')[:1]
+    ))
+    # Clientes sin préstamos: al primer prestamista
+    primero = Prestamista.objects.order_by('id').first()
+    if primero:
+        Cliente.objects.filter(prestamista__isnull=True).update(prestamista=primero)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0009_clientes_autocompletar'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_activo_nombre_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_deuda_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_nombre_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_apellido_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='prestamo',
+            name='prestamo_prestamista_est_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='prestamo',
+            name='prestamo_activo_venc_idx',
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='prestamista',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='clientes', to='users.prestamista'),
+        ),
+        migrations.RunPython(asignar_prestamista, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['prestamista', 'activo', 'apellido', 'nombre'], name='cliente_prest_activo_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['prestamista', '-deuda_total'], name='cliente_prest_deuda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['prestamista', 'cedula'], name='cliente_prest_cedula_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(models.F('prestamista'), django.db.models.functions.text.Lower('nombre'), name='cliente_prest_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(models.F('prestamista'), django.db.models.functions.text.Lower('apellido'), name='cliente_prest_apellido_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['prestamista', 'estado', 'fecha_vencimiento'], name='prestamo_prest_est_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['prestamista', '-fecha_prestamo'], name='prestamo_prest_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['prestamista', '-created_at'], name='prestamo_prest_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0010_cartera_por_prestamista'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prestamo',
+            name='archivado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,145 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:20
+
+import loans.dinero
+from django.db import migrations
+from django.db.models.functions import Round
+
+
+# Montos que pasan a DineroField (loans/dinero.py)
+MONTOS = {
+    'causacioninteres': ['base', 'valor', 'valor_pagado'],
+    'cliente': ['deuda_total'],
+    'fotocartera': ['mora_pendiente', 'saldo'],
+    'fotoprestamista': ['mora_pendiente', 'saldo_1_30', 'saldo_31_60', 'saldo_61_90', 'saldo_al_dia', 'saldo_mas_90', 'saldo_total'],
+    'movimiento': ['credito', 'debito'],
+    'penalidad': ['base', 'valor', 'valor_pagado'],
+    'prestamo': ['saldo_actual', 'valor_inicial'],
+    'saldocheckpoint': ['saldo'],
+}
+
+
+def redondear_a_pesos(apps, schema_editor):
+    """En modo pesos enteros, redondea los montos (mitad hacia arriba) antes de pasar las columnas a BIGINT"""
+    if not loans.dinero.pesos_enteros():
+        return
+    for modelo, campos in MONTOS.items():
+        # Manager base del modelo histórico: también en los de solo agregar
+        apps.get_model('loans', modelo)._base_manager.update(
+            **{campo: Round(campo) for campo in campos}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0011_archivo_prestamos'),
+    ]
+
+    operations = [
+        migrations.RunPython(redondear_a_pesos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='causacioninteres',
+            name='base',
+            field=loans.dinero.DineroField(decimal_places=2, help_text='Saldo sobre el que se causó', max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='causacioninteres',
+            name='valor',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='causacioninteres',
+            name='valor_pagado',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='deuda_total',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='fotocartera',
+            name='mora_pendiente',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='fotocartera',
+            name='saldo',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='mora_pendiente',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='saldo_1_30',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='saldo_31_60',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='saldo_61_90',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='saldo_al_dia',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='saldo_mas_90',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='fotoprestamista',
+            name='saldo_total',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AlterField(
+            model_name='movimiento',
+            name='credito',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='movimiento',
+            name='debito',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='penalidad',
+            name='base',
+            field=loans.dinero.DineroField(decimal_places=2, help_text='Saldo vencido sobre el que se calculó', max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='penalidad',
+            name='valor',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='penalidad',
+            name='valor_pagado',
+            field=loans.dinero.DineroField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='prestamo',
+            name='saldo_actual',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='prestamo',
+            name='valor_inicial',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='saldocheckpoint',
+            name='saldo',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=14),
+        ),
+    ]
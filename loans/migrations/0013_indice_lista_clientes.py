@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0012_dinero'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_prest_activo_nom_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['prestamista', 'apellido', 'nombre', 'activo'], name='cliente_prest_nom_activo_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0013_indice_lista_clientes'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_prest_cedula_idx',
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='cedula',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(fields=('prestamista', 'cedula'), name='cliente_prest_cedula_uniq'),
+        ),
+    ]
@@ -2,22 +2,72 @@
 Modelos de préstamos - Integrado con users.Prestamista
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Lower
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
 
 # Importar Prestamista desde users
-from users.models import Prestamista
+from users.models import Prestamista, ESTADOS_ABIERTOS
+from users.tenencia import DelPrestamistaManager
+from . import dinero
+from .dinero import DineroField
+from audit.models import AuditableMixin
 
 
-class Cliente(models.Model):
+class ClienteQuerySet(models.QuerySet):
+
+    def actualizar_resumen(self):
+        """
+        Recalcula deuda_total, prestamos_activos_count y ultimo_pago de los
+        clientes del queryset con un solo UPDATE (subconsultas por cliente).
+        """
+        from payments.models import Pago, PagoArchivado
+
+        def por_cliente(queryset, **agregado):
+            nombre = next(iter(agregado))
+            return Subquery(
+                queryset.order_by().values('cliente').annotate(**agregado).values(nombre)
+            )
+
+        def ultimo_pago(modelo):
+            return Subquery(
+                modelo.objects.filter(prestamo__cliente=OuterRef('pk'), anulado=False)
+                .order_by().values('prestamo__cliente').annotate(ultimo=Max('fecha_pago'))
+                .values('ultimo')
+            )
+
+        prestamos = Prestamo.objects.filter(cliente=OuterRef('pk'))
+        return self.update(
+            deuda_total=Coalesce(
+                por_cliente(prestamos.filter(estado__in=ESTADOS_ABIERTOS), total=Sum('saldo_actual')),
+                Decimal('0'), output_field=DineroField(max_digits=14),
+            ),
+            prestamos_activos_count=Coalesce(
+                por_cliente(prestamos.filter(estado='ACTIVO'), total=Count('id')), 0,
+            ),
+            # El más reciente entre los pagos activos y los archivados
+            ultimo_pago=Greatest(
+                Coalesce(ultimo_pago(Pago), ultimo_pago(PagoArchivado)),
+                Coalesce(ultimo_pago(PagoArchivado), ultimo_pago(Pago)),
+            ),
+        )
+
+
+class Cliente(AuditableMixin, models.Model):
     """Cliente que recibe el préstamo"""
     
+    # Prestamista que registró al cliente (users/tenencia.py)
+    prestamista = models.ForeignKey(
+        Prestamista, on_delete=models.PROTECT, related_name='clientes',
+        null=True, blank=True, editable=False,
+    )
     nombre = models.CharField(max_length=100)
     apellido = models.CharField(max_length=100)
-    cedula = models.CharField(max_length=20, unique=True)
+    cedula = models.CharField(max_length=20)
     direccion_principal = models.TextField()
     direccion_secundaria = models.TextField(blank=True)
     celular = models.CharField(max_length=15)
@@ -27,13 +77,36 @@ class Cliente(models.Model):
     observaciones = models.TextField(blank=True)
     activo = models.BooleanField(default=True)
     
+    # Resumen desnormalizado: lo mantienen Prestamo y Pago al guardarse
+    # (ver ClienteQuerySet.actualizar_resumen)
+    deuda_total = DineroField(max_digits=14, default=0, editable=False)
+    prestamos_activos_count = models.PositiveIntegerField(default=0, editable=False)
+    ultimo_pago = models.DateField(null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ClienteQuerySet.as_manager()
+    del_prestamista = DelPrestamistaManager.from_queryset(ClienteQuerySet)()
+    
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['apellido', 'nombre']
+        # Todos empiezan por prestamista: cada consulta recorre una sola cartera
+        indexes = [
+            # Lista ordenada por apellido; activo al final porque Django filtra
+            # activo=True como "WHERE activo", que no usa la columna del índice
+            models.Index(fields=['prestamista', 'apellido', 'nombre', 'activo'], name='cliente_prest_nom_activo_idx'),
+            models.Index(fields=['prestamista', '-deuda_total'], name='cliente_prest_deuda_idx'),
+            models.Index('prestamista', Lower('nombre'), name='cliente_prest_nombre_idx'),
+            models.Index('prestamista', Lower('apellido'), name='cliente_prest_apellido_idx'),
+        ]
+        constraints = [
+            # La cédula es única dentro de la cartera, no entre prestamistas.
+            # Su índice sirve también al autocompletar por prefijo (loans/busqueda.py)
+            models.UniqueConstraint(fields=['prestamista', 'cedula'], name='cliente_prest_cedula_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} {self.apellido} - {self.cedula}"
@@ -43,7 +116,7 @@ class Cliente(models.Model):
         return f"{self.nombre} {self.apellido}"
 
 
-class CoDeudor(models.Model):
+class CoDeudor(AuditableMixin, models.Model):
     """Co-deudor opcional para un cliente"""
     
     cliente = models.ForeignKey(
@@ -59,11 +132,16 @@ class CoDeudor(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['cedula'], name='codeudor_cedula_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.nombre_completo} (Co-deudor de {self.cliente.nombre_completo})"
 
 
-class Prestamo(models.Model):
+class Prestamo(AuditableMixin, models.Model):
     """Préstamo realizado a un cliente"""
     
     TIPO_INTERES_CHOICES = [
@@ -89,8 +167,8 @@ class Prestamo(models.Model):
     codeudor = models.ForeignKey(CoDeudor, on_delete=models.SET_NULL, null=True, blank=True)
     
     # Montos
-    valor_inicial = models.DecimalField(max_digits=12, decimal_places=2)
-    saldo_actual = models.DecimalField(max_digits=12, decimal_places=2)
+    valor_inicial = DineroField()
+    saldo_actual = DineroField()
     
     # Intereses
     porcentaje_interes = models.DecimalField(max_digits=5, decimal_places=2)
@@ -123,21 +201,65 @@ class Prestamo(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     fecha_pago_completo = models.DateTimeField(null=True, blank=True)
+    # Cerrado y con sus pagos y plan en las tablas de archivo (payments/archivo.py)
+    archivado_en = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    objects = models.Manager()
+    del_prestamista = DelPrestamistaManager()
     
     class Meta:
         verbose_name = "Préstamo"
         verbose_name_plural = "Préstamos"
         ordering = ['-fecha_prestamo']
+        indexes = [
+            # Cartera de un prestamista (users/tenencia.py): por estado y
+            # vencimiento, por fecha (listas) y por creación (recientes)
+            models.Index(fields=['prestamista', 'estado', 'fecha_vencimiento'], name='prestamo_prest_est_venc_idx'),
+            models.Index(fields=['prestamista', '-fecha_prestamo'], name='prestamo_prest_fecha_idx'),
+            models.Index(fields=['prestamista', '-created_at'], name='prestamo_prest_creado_idx'),
+            # Procesos sobre todas las carteras (penalidades, recordatorios)
+            models.Index(fields=['estado', 'fecha_vencimiento'], name='prestamo_estado_venc_idx'),
+        ]
     
     def __str__(self):
         return f"{self.codigo} - {self.cliente.nombre_completo} - ${self.saldo_actual}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Cliente al cargar, para actualizar también su resumen si cambia
+        instance._cliente_id_inicial = instance.__dict__.get('cliente_id')
+        instance._prestamista_id_inicial = instance.__dict__.get('prestamista_id')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.codigo:
             self.codigo = self.generar_codigo()
+        nuevo = self._state.adding
         if not self.pk:
             self.saldo_actual = self.valor_inicial
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if nuevo:
+                from .libro import desembolso, registrar
+                registrar(*desembolso(self))
+            elif getattr(self, '_prestamista_id_inicial', self.prestamista_id) != self.prestamista_id:
+                # Los pagos guardan el prestamista del préstamo (índices por cartera)
+                self.pagos.update(prestamista_id=self.prestamista_id)
+                self.pagos_archivados.update(prestamista_id=self.prestamista_id)
+                self._prestamista_id_inicial = self.prestamista_id
+            self.actualizar_resumen_clientes()
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            self.actualizar_resumen_clientes()
+        return resultado
+    
+    def actualizar_resumen_clientes(self):
+        clientes = {self.cliente_id, getattr(self, '_cliente_id_inicial', None)} - {None}
+        Cliente.objects.filter(pk__in=clientes).actualizar_resumen()
+        self._cliente_id_inicial = self.cliente_id
     
     def generar_codigo(self):
         ultimo = Prestamo.objects.all().order_by('-id').first()
@@ -152,4 +274,298 @@ class Prestamo(models.Model):
     
     @property
     def interes_mensual(self):
-        return (self.saldo_actual * self.porcentaje_interes / 100).quantize(Decimal('0.01'))
\ No newline at end of file
+        return dinero.porcentaje(self.saldo_actual, self.porcentaje_interes)
+    
+    @property
+    def interes_causado_pendiente(self):
+        """Intereses causados (CausacionInteres) aún no pagados"""
+        return self.causaciones.aggregate(
+            total=Sum(models.F('valor') - models.F('valor_pagado'))
+        )['total'] or Decimal('0')
+
+
+class CausacionInteres(models.Model):
+    """Interés causado a un préstamo en un periodo (mes)"""
+    
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.CASCADE, related_name='causaciones')
+    periodo = models.DateField(help_text="Primer día del mes causado")
+    fecha_causacion = models.DateField(help_text="Inicio del periodo si el interés es anticipado, fin si es vencido")
+    tipo_interes = models.CharField(max_length=11, choices=Prestamo.TIPO_INTERES_CHOICES)
+    
+    base = DineroField(help_text="Saldo sobre el que se causó")
+    porcentaje_interes = models.DecimalField(max_digits=5, decimal_places=2)
+    valor = DineroField()
+    valor_pagado = DineroField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Causación de Interés"
+        verbose_name_plural = "Causaciones de Interés"
+        ordering = ['prestamo', 'periodo']
+        constraints = [
+            # Una causación por préstamo y periodo: repetir la corrida no duplica
+            models.UniqueConstraint(fields=['prestamo', 'periodo'], name='causacion_prestamo_periodo_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.prestamo_id} - {self.periodo:%Y-%m} - ${self.valor}"
+
+
+class CheckpointLote(models.Model):
+    """Avance de un proceso por lotes, para retomarlo donde se detuvo"""
+    
+    ESTADO_CHOICES = [
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADO', 'Completado'),
+    ]
+    
+    proceso = models.CharField(max_length=50)
+    periodo = models.DateField()
+    ultimo_id = models.BigIntegerField(default=0, help_text="Último id procesado (en orden ascendente)")
+    procesados = models.PositiveIntegerField(default=0)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='EN_CURSO')
+    
+    iniciado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Checkpoint de Lote"
+        verbose_name_plural = "Checkpoints de Lote"
+        constraints = [
+            models.UniqueConstraint(fields=['proceso', 'periodo'], name='checkpoint_proceso_periodo_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.proceso} {self.periodo} ({self.get_estado_display()}, id>{self.ultimo_id})"
+
+
+class Penalidad(models.Model):
+    """Cargo por mora de un préstamo para los días (desde, hasta]"""
+    
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.CASCADE, related_name='penalidades')
+    desde = models.DateField()
+    hasta = models.DateField()
+    dias = models.PositiveIntegerField()
+    
+    base = DineroField(help_text="Saldo vencido sobre el que se calculó")
+    tasa_diaria = models.DecimalField(max_digits=7, decimal_places=4, help_text="Porcentaje diario aplicado")
+    valor = DineroField()
+    valor_pagado = DineroField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Penalidad"
+        verbose_name_plural = "Penalidades"
+        ordering = ['prestamo', 'hasta']
+        constraints = [
+            models.UniqueConstraint(fields=['prestamo', 'hasta'], name='penalidad_prestamo_hasta_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.prestamo_id} - {self.desde} a {self.hasta} - ${self.valor}"
+    
+    @property
+    def pendiente(self):
+        return self.valor - self.valor_pagado
+
+
+# ============= LIBRO CONTABLE =============
+# Libro de partida doble, solo de agregar (ver loans/libro.py)
+
+class SoloAgregarQuerySet(models.QuerySet):
+    """Los asientos no se modifican ni se borran: se reversan con otro asiento"""
+    
+    def update(self, **kwargs):
+        raise TypeError(f'{self.model.__name__} es de solo agregar')
+    
+    def delete(self):
+        raise TypeError(f'{self.model.__name__} es de solo agregar')
+
+
+class SoloAgregarModel(models.Model):
+    
+    objects = SoloAgregarQuerySet.as_manager()
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError(f'{type(self).__name__} es de solo agregar')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise TypeError(f'{type(self).__name__} es de solo agregar')
+
+
+class Asiento(SoloAgregarModel):
+    """Asiento contable de un evento del préstamo"""
+    
+    TIPO_CHOICES = [
+        ('DESEMBOLSO', 'Desembolso'),
+        ('INTERES', 'Causación de interés'),
+        ('PENALIDAD', 'Penalidad por mora'),
+        ('PAGO', 'Pago'),
+        ('REVERSO', 'Reverso'),
+    ]
+    
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.PROTECT, related_name='asientos')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    fecha = models.DateField()
+    referencia = models.CharField(max_length=50, unique=True, help_text="Evento de origen, p. ej. pago:123")
+    descripcion = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Asiento"
+        verbose_name_plural = "Asientos"
+        ordering = ['fecha', 'id']
+    
+    def __str__(self):
+        return f"{self.referencia} ({self.fecha})"
+
+
+class Movimiento(SoloAgregarModel):
+    """Línea de un asiento: débito o crédito a una cuenta del préstamo"""
+    
+    CUENTA_CHOICES = [
+        ('CAJA', 'Caja'),
+        ('CARTERA', 'Cartera (capital por cobrar)'),
+        ('INTERES_POR_COBRAR', 'Intereses por cobrar'),
+        ('MORA_POR_COBRAR', 'Mora por cobrar'),
+        ('INGRESO_INTERES', 'Ingreso por intereses'),
+        ('INGRESO_MORA', 'Ingreso por mora'),
+    ]
+    
+    asiento = models.ForeignKey(Asiento, on_delete=models.PROTECT, related_name='movimientos')
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.PROTECT, related_name='movimientos')
+    cuenta = models.CharField(max_length=20, choices=CUENTA_CHOICES)
+    fecha = models.DateField()
+    debito = DineroField(max_digits=14, default=0)
+    credito = DineroField(max_digits=14, default=0)
+    
+    class Meta:
+        verbose_name = "Movimiento"
+        verbose_name_plural = "Movimientos"
+        ordering = ['fecha', 'id']
+        indexes = [
+            models.Index(fields=['prestamo', 'cuenta', 'fecha'], name='movimiento_prestamo_cuenta_idx'),
+            models.Index(fields=['fecha'], name='movimiento_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cuenta} D{self.debito} C{self.credito}"
+
+
+class SaldoCheckpoint(models.Model):
+    """Saldo de una cuenta de un préstamo con todos los movimientos hasta `fecha`"""
+    
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.CASCADE, related_name='saldos_checkpoint')
+    cuenta = models.CharField(max_length=20, choices=Movimiento.CUENTA_CHOICES)
+    fecha = models.DateField()
+    saldo = DineroField(max_digits=14)
+    
+    class Meta:
+        verbose_name = "Checkpoint de Saldo"
+        verbose_name_plural = "Checkpoints de Saldo"
+        constraints = [
+            models.UniqueConstraint(fields=['prestamo', 'cuenta', 'fecha'], name='saldo_checkpoint_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.prestamo_id} {self.cuenta} {self.fecha}: ${self.saldo}"
+
+
+# ============= FOTOS DE CARTERA =============
+# Cortes mensuales para reportes históricos (ver loans/fotos.py)
+
+class FotoCartera(models.Model):
+    """Estado de un préstamo abierto al corte de un mes"""
+    
+    corte = models.DateField()
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.CASCADE, related_name='fotos')
+    prestamista = models.ForeignKey(Prestamista, on_delete=models.CASCADE, related_name='fotos_cartera')
+    estado = models.CharField(max_length=10, choices=Prestamo.ESTADO_CHOICES)
+    saldo = DineroField(max_digits=14)
+    mora_pendiente = DineroField(max_digits=14, default=0)
+    dias_mora = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Foto de Cartera"
+        verbose_name_plural = "Fotos de Cartera"
+        constraints = [
+            models.UniqueConstraint(fields=['corte', 'prestamo'], name='foto_cartera_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['prestamista', 'corte'], name='foto_cartera_prestamista_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.corte} {self.prestamo_id}: ${self.saldo}"
+
+
+class FotoPrestamista(models.Model):
+    """Totales de la cartera de un prestamista al corte de un mes"""
+    
+    corte = models.DateField()
+    prestamista = models.ForeignKey(Prestamista, on_delete=models.CASCADE, related_name='fotos')
+    prestamos_abiertos = models.PositiveIntegerField(default=0)
+    prestamos_mora = models.PositiveIntegerField(default=0)
+    saldo_total = DineroField(max_digits=16, default=0)
+    mora_pendiente = DineroField(max_digits=16, default=0)
+    # Edades de la cartera: saldo por días de mora al corte
+    saldo_al_dia = DineroField(max_digits=16, default=0)
+    saldo_1_30 = DineroField(max_digits=16, default=0)
+    saldo_31_60 = DineroField(max_digits=16, default=0)
+    saldo_61_90 = DineroField(max_digits=16, default=0)
+    saldo_mas_90 = DineroField(max_digits=16, default=0)
+    
+    class Meta:
+        verbose_name = "Foto de Prestamista"
+        verbose_name_plural = "Fotos de Prestamista"
+        ordering = ['-corte']
+        constraints = [
+            models.UniqueConstraint(fields=['prestamista', 'corte'], name='foto_prestamista_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.corte} {self.prestamista}: ${self.saldo_total}"
+
+
+# ============= RECORDATORIOS =============
+# Recordatorios de pago por SMS/WhatsApp (ver loans/recordatorios.py)
+
+class Recordatorio(models.Model):
+    """Recordatorio de pago de un préstamo; uno por préstamo y día"""
+    
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('ENVIADO', 'Enviado'),
+        ('FALLIDO', 'Fallido'),
+    ]
+    
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.CASCADE, related_name='recordatorios')
+    fecha = models.DateField()
+    canal = models.CharField(max_length=10)
+    numero = models.CharField(max_length=15)
+    mensaje = models.TextField()
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='PENDIENTE')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Recordatorio"
+        verbose_name_plural = "Recordatorios"
+        constraints = [
+            models.UniqueConstraint(fields=['prestamo', 'fecha'], name='recordatorio_diario_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha', 'estado'], name='recordatorio_fecha_estado_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.prestamo_id} {self.fecha} {self.canal} ({self.estado})"
@@ -0,0 +1,235 @@
+"""
+Paneles del dashboard y los reportes.
+
+Cada panel es una función síncrona e independiente que devuelve datos ya
+evaluados (listas, dicts), de modo que se puede ejecutar en su propio hilo.
+``ejecutar`` la adapta para vistas async: con
+``LOAN_SETTINGS['CONCURRENT_PANELS']`` cada panel corre en un hilo con su
+propia conexión y los paneles de una vista se esperan con
+``asyncio.gather``, así el tiempo total se acerca al del panel más lento.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Q, Sum, Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import consultas
+from .models import Cliente, Prestamo
+from users.models import ESTADOS_ABIERTOS
+from users.tenencia import usar_prestamista
+from payments.consultas import pagos_del_dia
+from payments.models import Pago
+from prestamosjl.middleware import instrumentar_conexiones
+
+
+def paneles_concurrentes():
+    return getattr(settings, 'LOAN_SETTINGS', {}).get('CONCURRENT_PANELS', True)
+
+
+def _en_hilo_propio(func):
+    def _wrapped(*args, **kwargs):
+        try:
+            # Las consultas del hilo cuentan en las de la petición (SQL_INSTRUMENTATION)
+            with instrumentar_conexiones():
+                return func(*args, **kwargs)
+        finally:
+            # El hilo vuelve al pool: no dejar su conexión abierta
+            connections.close_all()
+    return _wrapped
+
+
+async def ejecutar(func, *args, **kwargs):
+    """Ejecuta un panel síncrono desde una vista async"""
+    if paneles_concurrentes():
+        return await sync_to_async(_en_hilo_propio(func), thread_sensitive=False)(*args, **kwargs)
+    return await sync_to_async(func)(*args, **kwargs)
+
+
+# ============= DASHBOARD =============
+#
+# Cada panel del dashboard es un fragmento HTML independiente
+# (``loans:dashboard_panel``) que la página carga por separado. El HTML se
+# guarda en caché con el TTL del panel; la clave incluye una versión por
+# modelo del que depende (por modelo y prestamista en los paneles
+# ``por_prestamista``), y las señales de abajo incrementan la del
+# prestamista dueño de la fila al guardar o borrar, así que solo se
+# recalculan los paneles afectados de esa cartera.
+
+PANELES = {}
+
+
+def panel(nombre, plantilla, ttl, depende_de=(), por_prestamista=False):
+    """Registra una función ``(prestamista) -> contexto`` como panel"""
+    def decorador(func):
+        PANELES[nombre] = {
+            'func': func,
+            'plantilla': plantilla,
+            'ttl': ttl,
+            'depende_de': depende_de,
+            'por_prestamista': por_prestamista,
+        }
+        return func
+    return decorador
+
+
+def ttl_panel(nombre):
+    ttls = getattr(settings, 'LOAN_SETTINGS', {}).get('DASHBOARD_PANEL_TTL', {})
+    return ttls.get(nombre, PANELES[nombre]['ttl'])
+
+
+def _clave_version(modelo, dueno='todos'):
+    return f'panel_version:{modelo}:{dueno}'
+
+
+def invalidar_paneles(modelo, *prestamista_ids):
+    """Sube la versión de `modelo` de los paneles globales y de los de cada prestamista dado"""
+    for dueno in ('todos', *prestamista_ids):
+        clave = _clave_version(modelo, dueno)
+        cache.add(clave, 0, None)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # La clave expiró o fue expulsada entre add e incr
+            cache.set(clave, 1, None)
+
+
+def clave_panel(nombre, prestamista):
+    config = PANELES[nombre]
+    dueno = getattr(prestamista, 'pk', None) if config['por_prestamista'] else 'todos'
+    claves = [_clave_version(m, dueno) for m in config['depende_de']]
+    versiones = cache.get_many(claves)
+    partes = [str(versiones.get(clave, 0)) for clave in claves]
+    return f'panel:{nombre}:{dueno}:{".".join(partes)}'
+
+
+def renderizar_panel(nombre, prestamista):
+    """HTML del panel, desde la caché o recalculado"""
+    config = PANELES[nombre]
+    clave = clave_panel(nombre, prestamista)
+    html = cache.get(clave)
+    if html is None:
+        # Las consultas compartidas (loans/consultas.py) usan del_prestamista
+        with usar_prestamista(prestamista):
+            html = render_to_string(config['plantilla'], config['func'](prestamista))
+        cache.set(clave, html, ttl_panel(nombre))
+    return html
+
+
+@panel('estadisticas', 'loans/panels/estadisticas.html', ttl=60, depende_de=('prestamo', 'cliente'), por_prestamista=True)
+def estadisticas(prestamista):
+    stats = Prestamo.objects.filter(prestamista=prestamista).aggregate(
+        total_prestamos=Count('id'),
+        prestamos_activos=Count('id', filter=Q(estado='ACTIVO')),
+        prestamos_mora=Count('id', filter=Q(estado='MORA')),
+        prestamos_vencidos=Count('id', filter=Q(estado='VENCIDO')),
+        prestamos_pagados=Count('id', filter=Q(estado='PAGADO')),
+        total_prestado=Sum('saldo_actual'),
+        saldo_pendiente=Sum('saldo_actual', filter=Q(estado__in=ESTADOS_ABIERTOS)),
+    )
+    stats['total_prestado'] = stats['total_prestado'] or 0
+    stats['saldo_pendiente'] = stats['saldo_pendiente'] or 0
+    stats['total_clientes'] = Cliente.objects.filter(prestamista=prestamista, activo=True).count()
+    return {'stats': stats}
+
+
+@panel('recientes', 'loans/panels/recientes.html', ttl=30, depende_de=('prestamo',), por_prestamista=True)
+def prestamos_recientes(prestamista):
+    return {
+        'prestamos_recientes': list(
+            Prestamo.objects.filter(prestamista=prestamista).select_related('cliente').order_by('-created_at')[:5]
+        ),
+    }
+
+
+@panel('por_vencer', 'loans/panels/por_vencer.html', ttl=300, depende_de=('prestamo',), por_prestamista=True)
+def prestamos_por_vencer(prestamista, dias=7):
+    return {
+        'prestamos_vencer': list(consultas.prestamos_por_vencer(timezone.now().date(), dias)[:5]),
+    }
+
+
+@panel('mora', 'loans/panels/mora.html', ttl=120, depende_de=('prestamo',), por_prestamista=True)
+def prestamos_en_mora(prestamista):
+    return {
+        'prestamos_mora': list(consultas.prestamos_en_mora(orden='-fecha_prestamo')[:5]),
+    }
+
+
+# El resumen de Cliente se actualiza con update() al guardar préstamos y pagos
+@panel('deudores', 'loans/panels/deudores.html', ttl=300, depende_de=('prestamo', 'pago'), por_prestamista=True)
+def clientes_con_deuda(prestamista):
+    return {
+        'clientes_deuda': list(consultas.clientes_con_deuda()[:5]),
+    }
+
+
+@panel('pagos_hoy', 'loans/panels/pagos_hoy.html', ttl=30, depende_de=('pago',), por_prestamista=True)
+def pagos_de_hoy(prestamista):
+    return {
+        'pagos_hoy': list(pagos_del_dia(timezone.now().date(), orden='-created_at')[:5]),
+    }
+
+
+@receiver([post_save, post_delete], sender=Prestamo)
+@receiver([post_save, post_delete], sender=Pago)
+@receiver([post_save, post_delete], sender=Cliente)
+def _invalidar_al_cambiar(sender, instance, **kwargs):
+    modelo = sender._meta.model_name
+    # Solo la cartera dueña de la fila (y la anterior, si el préstamo cambió de prestamista)
+    duenos = {instance.prestamista_id, getattr(instance, '_prestamista_id_inicial', None)} - {None}
+    # Tras el commit: antes, otra petición podría volver a guardar datos viejos
+    transaction.on_commit(lambda: invalidar_paneles(modelo, *duenos))
+
+
+# ============= REPORTES =============
+
+def resumen_prestamos(prestamos):
+    """Totales y desglose por estado en una sola consulta agrupada"""
+    por_estado = {
+        fila['estado']: fila
+        for fila in prestamos.order_by().values('estado').annotate(
+            cantidad=Count('id'), monto=Sum('valor_inicial')
+        )
+    }
+    reporte = {'total_prestamos': 0, 'monto_total': 0, 'por_estado': {}}
+    for estado, _ in Prestamo.ESTADO_CHOICES:
+        fila = por_estado.get(estado, {})
+        cantidad, monto = fila.get('cantidad', 0), fila.get('monto') or 0
+        reporte['por_estado'][estado] = {'cantidad': cantidad, 'monto': monto}
+        reporte['total_prestamos'] += cantidad
+        reporte['monto_total'] += monto
+    return reporte
+
+
+def resumen_pagos(pagos):
+    """Totales del día y desglose por método de pago en una consulta agrupada"""
+    nombres = dict(Pago.METODO_PAGO_CHOICES)
+    resumen = {
+        'total_pagos': 0, 'total_recaudado': 0, 'total_intereses': 0,
+        'total_capital': 0, 'por_metodo': {},
+    }
+    filas = pagos.order_by().values('metodo_pago').annotate(
+        cantidad=Count('id'),
+        monto=Sum('valor_total'),
+        intereses=Sum('valor_interes'),
+        capital=Sum('valor_capital'),
+    )
+    for fila in sorted(filas, key=lambda f: list(nombres).index(f['metodo_pago'])):
+        resumen['por_metodo'][nombres[fila['metodo_pago']]] = {
+            'cantidad': fila['cantidad'], 'monto': fila['monto'] or 0,
+        }
+        resumen['total_pagos'] += fila['cantidad']
+        resumen['total_recaudado'] += fila['monto'] or 0
+        resumen['total_intereses'] += fila['intereses'] or 0
+        resumen['total_capital'] += fila['capital'] or 0
+    return resumen
+
+
+def evaluar(queryset):
+    return list(queryset)
@@ -0,0 +1,183 @@
+"""
+Penalidades por mora.
+
+Configuración en ``LOAN_SETTINGS['PENALTY']``::
+
+    'PENALTY': {
+        'DAILY_RATE': 0.1,          # % diario sobre el saldo vencido
+        'GRACE_DAYS': 3,            # días después del vencimiento sin cobro
+        'MAX_PERCENT': 20,          # tope acumulado, % del saldo (None: sin tope)
+        'MAX_AMOUNT': None,         # tope acumulado en pesos (None: sin tope)
+        'USURY_MONTHLY_RATE': None, # tasa de usura mensual: interés + mora no la superan
+    }
+
+La mora corre desde ``fecha_vencimiento + GRACE_DAYS``. Cada corrida de
+``calcular_penalidades`` carga, por préstamo vencido, los días desde el
+último cargo (o desde el inicio del cobro) hasta la fecha de corte, como
+una ``Penalidad`` pendiente, asentada en el libro contable
+(loans/libro.py) en la misma transacción. Los pagos consumen primero esas
+penalidades (``aplicar_pago``).
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from users.models import ESTADOS_ABIERTOS
+from . import dinero, libro
+from .models import Penalidad, Prestamo
+
+
+def configuracion():
+    config = {
+        'DAILY_RATE': 0.1, 'GRACE_DAYS': 3, 'MAX_PERCENT': 20,
+        'MAX_AMOUNT': None, 'USURY_MONTHLY_RATE': None,
+    }
+    config.update(getattr(settings, 'LOAN_SETTINGS', {}).get('PENALTY', {}))
+    return config
+
+
+def tasa_diaria(porcentaje_interes, config):
+    """Tasa diaria de mora (%), recortada para no superar la usura"""
+    tasa = Decimal(str(config['DAILY_RATE']))
+    if config['USURY_MONTHLY_RATE'] is not None:
+        margen = Decimal(str(config['USURY_MONTHLY_RATE'])) - porcentaje_interes
+        tasa = min(tasa, max(margen, Decimal('0')) / 30)
+    return tasa.quantize(Decimal('0.0001'))
+
+
+def tope(base, config):
+    """Máximo acumulado de penalidades para un saldo (None: sin tope)"""
+    topes = []
+    if config['MAX_PERCENT'] is not None:
+        topes.append(base * Decimal(str(config['MAX_PERCENT'])) / 100)
+    if config['MAX_AMOUNT'] is not None:
+        topes.append(Decimal(str(config['MAX_AMOUNT'])))
+    return min(topes) if topes else None
+
+
+def calcular(base, porcentaje_interes, fecha_vencimiento, ultimo_hasta, ya_cargado, corte, config):
+    """
+    Cargo de mora hasta `corte` para un préstamo. Devuelve
+    (desde, dias, tasa_diaria, valor); dias = 0 si no hay nada que cobrar.
+    """
+    desde = fecha_vencimiento + timedelta(days=config['GRACE_DAYS'])
+    if ultimo_hasta and ultimo_hasta > desde:
+        desde = ultimo_hasta
+    dias = max((corte - desde).days, 0)
+    tasa = tasa_diaria(porcentaje_interes, config)
+    valor = dinero.porcentaje(base, tasa, dias)
+
+    limite = tope(base, config)
+    if limite is not None:
+        valor = dinero.redondear(max(min(valor, limite - ya_cargado), Decimal('0')))
+    return desde, dias, tasa, valor
+
+
+def _vencidos(corte, config):
+    """Préstamos con mora cobrable a `corte`, con su último cargo y lo ya cargado"""
+    cargos = Penalidad.objects.filter(prestamo=OuterRef('pk')).order_by().values('prestamo')
+    return Prestamo.objects.filter(
+        estado__in=ESTADOS_ABIERTOS,
+        saldo_actual__gt=0,
+        fecha_vencimiento__lt=corte - timedelta(days=config['GRACE_DAYS']),
+    ).annotate(
+        ultimo_hasta=Subquery(cargos.annotate(m=Max('hasta')).values('m')),
+        ya_cargado=Coalesce(Subquery(cargos.annotate(s=Sum('valor')).values('s')), Decimal('0')),
+    )
+
+
+def calcular_penalidades(corte, chunk=2000):
+    """
+    Carga la mora de todos los préstamos vencidos hasta `corte` en una
+    pasada: una consulta para leerlos y bulk_create para los cargos.
+    Repetirla con el mismo corte no carga nada más. Devuelve (cargos, total).
+    """
+    config = configuracion()
+    vencidos = _vencidos(corte, config).values_list(
+        'id', 'saldo_actual', 'porcentaje_interes', 'fecha_vencimiento', 'ultimo_hasta', 'ya_cargado'
+    )
+
+    penalidades = []
+    for pk, saldo, porcentaje, vencimiento, ultimo_hasta, ya_cargado in vencidos.iterator(chunk_size=chunk):
+        desde, dias, tasa, valor = calcular(saldo, porcentaje, vencimiento, ultimo_hasta, ya_cargado, corte, config)
+        if dias and valor > 0:
+            penalidades.append(Penalidad(
+                prestamo_id=pk, desde=desde, hasta=corte, dias=dias,
+                base=saldo, tasa_diaria=tasa, valor=valor,
+            ))
+
+    with transaction.atomic():
+        Penalidad.objects.bulk_create(penalidades, batch_size=500, ignore_conflicts=True)
+        if penalidades:
+            libro.registrar_lote([libro.penalidad(p) for p in penalidades])
+    return len(penalidades), sum((p.valor for p in penalidades), Decimal('0'))
+
+
+def cotizar(prestamo, fecha):
+    """
+    Vista previa de la mora de un préstamo a una fecha (no guarda nada).
+    Solo consulta el acumulado de sus penalidades.
+    """
+    config = configuracion()
+    cargos = prestamo.penalidades.aggregate(
+        ultimo_hasta=Max('hasta'),
+        ya_cargado=Coalesce(Sum('valor'), Decimal('0')),
+        pagado=Coalesce(Sum('valor_pagado'), Decimal('0')),
+    )
+    cotizacion = {
+        'fecha': fecha,
+        'dias_mora': 0,
+        'tasa_diaria': tasa_diaria(prestamo.porcentaje_interes, config),
+        'por_cargar': Decimal('0'),
+        'cargado': cargos['ya_cargado'],
+        'pendiente': cargos['ya_cargado'] - cargos['pagado'],
+    }
+    if prestamo.fecha_vencimiento and prestamo.estado in ESTADOS_ABIERTOS and prestamo.saldo_actual > 0:
+        cotizacion['dias_mora'] = max((fecha - prestamo.fecha_vencimiento).days, 0)
+        _, _, _, valor = calcular(
+            prestamo.saldo_actual, prestamo.porcentaje_interes, prestamo.fecha_vencimiento,
+            cargos['ultimo_hasta'], cargos['ya_cargado'], fecha, config,
+        )
+        cotizacion['por_cargar'] = valor
+    cotizacion['total'] = cotizacion['pendiente'] + cotizacion['por_cargar']
+    return cotizacion
+
+
+def aplicar_pago(prestamo_id, valor):
+    """
+    Consume hasta `valor` de las penalidades pendientes del préstamo, de la
+    más antigua a la más reciente. Devuelve lo aplicado. Llamar dentro de la
+    transacción que registra el pago.
+    """
+    restante = valor
+    pendientes = Penalidad.objects.select_for_update().filter(
+        prestamo_id=prestamo_id, valor_pagado__lt=F('valor')
+    ).order_by('hasta')
+    for penalidad in pendientes:
+        if restante <= 0:
+            break
+        abono = min(penalidad.pendiente, restante)
+        penalidad.valor_pagado += abono
+        penalidad.save(update_fields=['valor_pagado'])
+        restante -= abono
+    return valor - restante
+
+
+def revertir_pago(prestamo_id, valor):
+    """Devuelve `valor` a las penalidades pagadas, de la más reciente a la más antigua"""
+    restante = valor
+    pagadas = Penalidad.objects.select_for_update().filter(
+        prestamo_id=prestamo_id, valor_pagado__gt=0
+    ).order_by('-hasta')
+    for penalidad in pagadas:
+        if restante <= 0:
+            break
+        devolucion = min(penalidad.valor_pagado, restante)
+        penalidad.valor_pagado -= devolucion
+        penalidad.save(update_fields=['valor_pagado'])
+        restante -= devolucion
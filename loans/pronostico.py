@@ -0,0 +1,241 @@
+"""
+Pronóstico de cobros de la cartera.
+
+``pronostico`` responde cuánto se espera cobrar por día o por semana en los
+próximos ``HORIZON_DAYS`` días. Carga los préstamos abiertos del
+prestamista en columnas (una consulta, arreglos de NumPy) y arma el
+cronograma de todos a la vez, sin recorrerlos uno a uno:
+
+* Una cuota en cada aniversario mensual de ``fecha_prestamo`` y la última
+  en ``fecha_vencimiento`` (o al cumplir ``plazo_meses``); el saldo se
+  reparte en partes iguales entre las cuotas que faltan, como en el
+  simulador.
+* Interés sobre el saldo de cada periodo: VENCIDO en la cuota que lo
+  cierra, ANTICIPADO en la que lo abre (la última cuota es solo capital).
+* Sin vencimiento ni plazo: solo el interés, cada mes.
+* Ya vencidos: todo el saldo (e interés de un periodo si es VENCIDO), que
+  se informa aparte como vencido y no entra en los días del pronóstico.
+
+Con ``PROBABILITY_WEIGHTS`` se calcula además el cobro esperado: cada
+préstamo pesa por su probabilidad de pago, sacada de sus ``Pago`` de los
+últimos ``HISTORY_MONTHS`` meses (pagos por mes observado, suavizado:
+``(pagos + 1) / (meses + 1)``, con tope 1).
+
+El resultado queda en caché hasta el final del día, por prestamista,
+agrupación y horizonte.
+
+Configuración en ``LOAN_SETTINGS['FORECAST']``::
+
+    'FORECAST': {
+        'HORIZON_DAYS': 91,           # días hacia adelante (máximo 366)
+        'HISTORY_MONTHS': 6,          # historia de pagos para los pesos
+        'PROBABILITY_WEIGHTS': True,
+    }
+"""
+
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from payments.models import Pago
+from users.models import ESTADOS_ABIERTOS
+from .models import Prestamo
+
+
+AGRUPACIONES = ('dia', 'semana')
+MAX_DIAS = 366
+DIAS_POR_MES = 365.25 / 12
+
+
+def configuracion():
+    config = {'HORIZON_DAYS': 91, 'HISTORY_MONTHS': 6, 'PROBABILITY_WEIGHTS': True}
+    config.update(getattr(settings, 'LOAN_SETTINGS', {}).get('FORECAST', {}))
+    return config
+
+
+# ============= CARGA =============
+
+def cargar(prestamista):
+    """Préstamos abiertos con saldo del prestamista, como columnas (ordenados por id)"""
+    # Montos como float y fechas como texto ISO: sin conversores por fila
+    # del ORM (Decimal, date); NumPy parsea las fechas de una vez
+    filas = list(Prestamo.objects.filter(
+        prestamista=prestamista, estado__in=ESTADOS_ABIERTOS, saldo_actual__gt=0,
+    ).order_by('id').values_list(
+        'id',
+        Cast('saldo_actual', FloatField()),
+        Cast('porcentaje_interes', FloatField()),
+        'tipo_interes',
+        Cast('fecha_prestamo', CharField()),
+        Cast('fecha_vencimiento', CharField()),
+        'plazo_meses',
+    ))
+    ids, saldos, tasas, tipos, inicios, vencimientos, plazos = zip(*filas) if filas else [()] * 7
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'saldo': np.array(saldos, dtype=float),
+        'tasa': np.array(tasas, dtype=float) / 100,
+        'anticipado': np.array(tipos, dtype=object) == 'ANTICIPADO',
+        'inicio': np.array(inicios, dtype='datetime64[D]'),
+        # None queda como NaT / nan
+        'vencimiento': np.array(vencimientos, dtype='datetime64[D]'),
+        'plazo': np.array(plazos, dtype=float),
+    }
+
+
+def probabilidades(prestamista, columnas, hoy, meses):
+    """Probabilidad de pago de cada préstamo según sus pagos de los últimos `meses`"""
+    desde = hoy - timedelta(days=round(meses * DIAS_POR_MES))
+    cuentas = np.array(Pago.objects.filter(
+        prestamista=prestamista, fecha_pago__gte=desde, fecha_pago__lte=hoy, anulado=False,
+    ).values_list('prestamo_id').annotate(pagos=Count('id')).order_by(), dtype=np.int64).reshape(-1, 2)
+
+    pagos = np.zeros(len(columnas['id']))
+    posiciones = np.searchsorted(columnas['id'], cuentas[:, 0])
+    encontrados = posiciones < len(columnas['id'])
+    encontrados[encontrados] = columnas['id'][posiciones[encontrados]] == cuentas[encontrados, 0]
+    pagos[posiciones[encontrados]] = cuentas[encontrados, 1]
+
+    edad = (np.datetime64(hoy, 'D') - columnas['inicio']).astype(np.int64) / DIAS_POR_MES
+    observados = np.clip(edad, 0, meses)
+    return np.minimum((pagos + 1) / (observados + 1), 1)
+
+
+# ============= CRONOGRAMA =============
+
+def _mes(fechas):
+    """Meses desde 1970-01 de cada fecha"""
+    return fechas.astype('datetime64[M]').astype(np.int64)
+
+
+def _aniversario(meses, dia):
+    """Fecha del día `dia` del mes `meses` (desde 1970-01), sin pasar del fin de mes"""
+    inicio = meses.astype('datetime64[M]').astype('datetime64[D]')
+    fin = (meses + 1).astype('datetime64[M]').astype('datetime64[D]')
+    return np.minimum(inicio + (dia - 1).astype('timedelta64[D]'), fin - 1)
+
+
+def cronograma(columnas, hoy, dias):
+    """
+    Cuotas de todos los préstamos que caen en los próximos `dias` días,
+    aplanadas: (día desde hoy, monto, fila del préstamo). La cuota de un
+    préstamo ya vencido tiene día negativo.
+    """
+    hoy = np.datetime64(hoy, 'D')
+    fin = hoy + dias
+    saldo, tasa = columnas['saldo'], columnas['tasa']
+    inicio = columnas['inicio']
+    mes0 = _mes(inicio)
+    dia = (inicio - inicio.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64) + 1
+
+    # Vencimiento: el de la fila o, si no tiene, el aniversario del plazo
+    vencimiento = columnas['vencimiento'].copy()
+    por_plazo = np.isnat(vencimiento) & ~np.isnan(columnas['plazo'])
+    vencimiento[por_plazo] = _aniversario(
+        mes0[por_plazo] + columnas['plazo'][por_plazo].astype(np.int64), dia[por_plazo],
+    )
+    con_vencimiento = ~np.isnat(vencimiento)
+    vencimiento = np.where(con_vencimiento, vencimiento, fin)
+
+    # Primer aniversario desde hoy (el 1 es un mes después del desembolso)
+    j0 = np.maximum(_mes(hoy) - mes0, 1)
+    j0 += _aniversario(mes0 + j0, dia) < hoy
+    # Último aniversario antes del vencimiento
+    jv = _mes(vencimiento) - mes0
+    jv -= _aniversario(mes0 + jv, dia) >= vencimiento
+    # Cuotas que faltan, contando la del vencimiento
+    restantes = np.where(con_vencimiento, np.maximum(jv - j0 + 1, 0) + 1, 1)
+
+    # Aniversarios: una columna por mes del horizonte
+    k = np.arange(dias // 28 + 2)
+    fechas = _aniversario(mes0[:, None] + j0[:, None] + k, dia[:, None])
+    validas = (fechas < fin) & (fechas < vencimiento[:, None])
+    # Fracción del saldo en el periodo que cierra (VENCIDO) o abre (ANTICIPADO) la cuota
+    n = restantes[:, None]
+    fraccion = np.where(columnas['anticipado'][:, None], n - k - 1, n - k) / n
+    fraccion = np.where(con_vencimiento[:, None], fraccion, 1)
+    capital = np.where(con_vencimiento, saldo / restantes, 0)
+    montos = capital[:, None] + (saldo * tasa)[:, None] * fraccion
+
+    # Cuota del vencimiento
+    final = vencimiento
+    final_valida = con_vencimiento & (final < fin)
+    monto_final = capital + np.where(columnas['anticipado'], 0, saldo * tasa / restantes)
+
+    filas = np.broadcast_to(np.arange(len(saldo))[:, None], fechas.shape)
+    return (
+        np.concatenate([(fechas - hoy).astype(np.int64)[validas], (final - hoy).astype(np.int64)[final_valida]]),
+        np.concatenate([montos[validas], monto_final[final_valida]]),
+        np.concatenate([filas[validas], np.flatnonzero(final_valida)]),
+    )
+
+
+def _agrupar(diario, hoy, agrupacion):
+    """[(fecha, monto)] por día, o por semana (de lunes a domingo)"""
+    if agrupacion == 'dia':
+        return [(hoy + timedelta(days=i), monto) for i, monto in enumerate(diario)]
+    relleno = hoy.weekday()
+    semanas = np.concatenate([np.zeros(relleno), diario])
+    semanas = np.pad(semanas, (0, -len(semanas) % 7)).reshape(-1, 7).sum(axis=1)
+    lunes = hoy - timedelta(days=relleno)
+    return [(max(lunes + timedelta(weeks=i), hoy), monto) for i, monto in enumerate(semanas)]
+
+
+def calcular(prestamista, hoy, dias, agrupacion='semana', ponderado=True, meses=6):
+    """Pronóstico de `dias` días desde `hoy`, sin caché"""
+    columnas = cargar(prestamista)
+    dia, monto, fila = cronograma(columnas, hoy, dias)
+    if ponderado:
+        ponderados = monto * probabilidades(prestamista, columnas, hoy, meses)[fila]
+    else:
+        ponderados = monto
+    vencido = dia < 0
+    al_dia = ~vencido
+    programado = np.bincount(dia[al_dia], weights=monto[al_dia], minlength=dias)
+    esperado = np.bincount(dia[al_dia], weights=ponderados[al_dia], minlength=dias)
+
+    filas = [
+        {'fecha': fecha, 'programado': float(p), 'esperado': float(e)}
+        for (fecha, p), (_, e) in zip(_agrupar(programado, hoy, agrupacion), _agrupar(esperado, hoy, agrupacion))
+    ]
+    return {
+        'hoy': hoy,
+        'dias': dias,
+        'hasta': hoy + timedelta(days=dias - 1),
+        'agrupacion': agrupacion,
+        'ponderado': ponderado,
+        'prestamos': len(columnas['id']),
+        'filas': filas,
+        'maximo': max((f['programado'] for f in filas), default=0),
+        'total_programado': float(programado.sum()),
+        'total_esperado': float(esperado.sum()),
+        'vencido_programado': float(monto[vencido].sum()),
+        'vencido_esperado': float(ponderados[vencido].sum()),
+    }
+
+
+def _segundos_hasta_manana():
+    ahora = timezone.localtime()
+    manana = datetime.combine(ahora.date() + timedelta(days=1), time.min, tzinfo=ahora.tzinfo)
+    return max(int((manana - ahora).total_seconds()), 1)
+
+
+def pronostico(prestamista, agrupacion='semana', dias=None):
+    """Pronóstico de cobros del prestamista desde hoy, en caché hasta el final del día"""
+    config = configuracion()
+    dias = min(max(dias or config['HORIZON_DAYS'], 1), MAX_DIAS)
+    hoy = timezone.now().date()
+    clave = f'pronostico:{prestamista.pk}:{hoy.isoformat()}:{agrupacion}:{dias}'
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular(
+            prestamista, hoy, dias, agrupacion,
+            ponderado=config['PROBABILITY_WEIGHTS'], meses=config['HISTORY_MONTHS'],
+        )
+        cache.set(clave, resultado, _segundos_hasta_manana())
+    return resultado
@@ -0,0 +1,179 @@
+"""
+Recordatorios de pago por SMS/WhatsApp.
+
+``enviar_recordatorios`` corre en dos pasos:
+
+1. ``preparar``: una consulta (índice estado + vencimiento) trae los
+   préstamos abiertos que vencen en los próximos ``DAYS_AHEAD`` días o
+   llevan hasta ``MAX_OVERDUE_DAYS`` vencidos, sin recordatorio hoy, y
+   guarda un ``Recordatorio`` pendiente por cada uno (``bulk_create``).
+   La restricción única (préstamo, fecha) garantiza un solo recordatorio
+   por préstamo y día aunque el proceso corra varias veces.
+2. ``despachar``: envía los pendientes del día en paralelo
+   (``CONCURRENCY`` hilos) a través del backend configurado
+   (loans/mensajeria.py), sin pasar de ``RATE_PER_SECOND`` mensajes por
+   segundo y reintentando los errores transitorios.
+
+Si el proceso se cae a mitad de un lote, la siguiente corrida reenvía los
+que quedaron pendientes (entrega al menos una vez).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from users.models import ESTADOS_ABIERTOS
+from .mensajeria import ErrorEnvio
+from .models import Prestamo, Recordatorio
+
+
+def configuracion():
+    config = {
+        'BACKEND': 'loans.mensajeria.ConsolaBackend',
+        'OPTIONS': {},
+        'DAYS_AHEAD': 3,
+        'MAX_OVERDUE_DAYS': 60,
+        'CONCURRENCY': 4,
+        'RATE_PER_SECOND': 5,
+        'MAX_RETRIES': 3,
+        'RETRY_BACKOFF': 1.0,
+        'MESSAGE_DUE': (
+            'Hola {nombre}, le recordamos que su préstamo {codigo} vence el '
+            '{vencimiento:%d/%m/%Y}. Saldo: ${saldo:,.0f}.'
+        ),
+        'MESSAGE_OVERDUE': (
+            'Hola {nombre}, su préstamo {codigo} tiene {dias} días de vencido. '
+            'Saldo: ${saldo:,.0f}. Comuníquese con nosotros para ponerse al día.'
+        ),
+    }
+    config.update(getattr(settings, 'LOAN_SETTINGS', {}).get('REMINDERS', {}))
+    return config
+
+
+def obtener_backend(config=None):
+    config = config or configuracion()
+    return import_string(config['BACKEND'])(**config['OPTIONS'])
+
+
+class LimitadorTasa:
+    """Cubeta de fichas compartida por los hilos de envío"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0
+        self.siguiente = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(self.siguiente, ahora)
+            self.siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def redactar(config, nombre, codigo, saldo, vencimiento, hoy):
+    dias = (hoy - vencimiento).days
+    plantilla = config['MESSAGE_OVERDUE'] if dias > 0 else config['MESSAGE_DUE']
+    return plantilla.format(nombre=nombre, codigo=codigo, saldo=saldo, vencimiento=vencimiento, dias=dias)
+
+
+def preparar(hoy, prestamista_id=None, chunk=2000, config=None):
+    """Crea los recordatorios pendientes del día. Devuelve cuántos se crearon."""
+    config = config or configuracion()
+    canal = obtener_backend(config).canal
+    prestamos = Prestamo.objects.filter(
+        estado__in=ESTADOS_ABIERTOS,
+        fecha_vencimiento__gte=hoy - timedelta(days=config['MAX_OVERDUE_DAYS']),
+        fecha_vencimiento__lte=hoy + timedelta(days=config['DAYS_AHEAD']),
+        saldo_actual__gt=0,
+    ).exclude(
+        Exists(Recordatorio.objects.filter(prestamo=OuterRef('pk'), fecha=hoy))
+    )
+    if prestamista_id:
+        prestamos = prestamos.filter(prestamista_id=prestamista_id)
+    filas = prestamos.order_by('id').values_list(
+        'id', 'codigo', 'saldo_actual', 'fecha_vencimiento',
+        'cliente__nombre', 'cliente__celular', 'cliente__celular_alternativo',
+    )
+
+    creados = 0
+    lote = []
+    for pk, codigo, saldo, vencimiento, nombre, celular, alternativo in filas.iterator(chunk_size=chunk):
+        numero = (celular or alternativo or '').strip()
+        if not numero:
+            continue
+        lote.append(Recordatorio(
+            prestamo_id=pk, fecha=hoy, canal=canal, numero=numero,
+            mensaje=redactar(config, nombre, codigo, saldo, vencimiento, hoy),
+        ))
+        if len(lote) >= chunk:
+            creados += len(Recordatorio.objects.bulk_create(lote, ignore_conflicts=True))
+            lote = []
+    if lote:
+        creados += len(Recordatorio.objects.bulk_create(lote, ignore_conflicts=True))
+    return creados
+
+
+def _enviar(backend, limitador, recordatorio, config):
+    for intento in range(1, config['MAX_RETRIES'] + 1):
+        limitador.esperar()
+        recordatorio.intentos += 1
+        try:
+            backend.enviar(recordatorio.numero, recordatorio.mensaje)
+        except ErrorEnvio as error:
+            recordatorio.error = str(error)[:255]
+            if not error.reintentable or intento == config['MAX_RETRIES']:
+                recordatorio.estado = 'FALLIDO'
+                return recordatorio
+            time.sleep(config['RETRY_BACKOFF'] * 2 ** (intento - 1))
+        else:
+            recordatorio.estado = 'ENVIADO'
+            recordatorio.enviado_en = timezone.now()
+            recordatorio.error = ''
+            return recordatorio
+    return recordatorio
+
+
+def despachar(hoy, prestamista_id=None, chunk=500, config=None):
+    """Envía los recordatorios pendientes del día. Devuelve (enviados, fallidos)."""
+    config = config or configuracion()
+    backend = obtener_backend(config)
+    limitador = LimitadorTasa(config['RATE_PER_SECOND'])
+    pendientes = Recordatorio.objects.filter(fecha=hoy, estado='PENDIENTE').order_by('id')
+    if prestamista_id:
+        pendientes = pendientes.filter(prestamo__prestamista_id=prestamista_id)
+
+    enviados = fallidos = 0
+    ultimo_id = 0
+    try:
+        with ThreadPoolExecutor(max_workers=config['CONCURRENCY'], thread_name_prefix='recordatorio') as pool:
+            while True:
+                lote = list(pendientes.filter(id__gt=ultimo_id)[:chunk])
+                if not lote:
+                    break
+                ultimo_id = lote[-1].pk
+                resultado = list(pool.map(lambda r: _enviar(backend, limitador, r, config), lote))
+                Recordatorio.objects.bulk_update(resultado, ['estado', 'intentos', 'error', 'enviado_en'])
+                enviados += sum(r.estado == 'ENVIADO' for r in resultado)
+                fallidos += sum(r.estado == 'FALLIDO' for r in resultado)
+    finally:
+        backend.cerrar()
+    return enviados, fallidos
+
+
+def enviar_recordatorios(hoy=None, prestamista_id=None):
+    """Prepara y envía los recordatorios del día. Devuelve (preparados, enviados, fallidos)."""
+    hoy = hoy or timezone.now().date()
+    config = configuracion()
+    preparados = preparar(hoy, prestamista_id, config=config)
+    enviados, fallidos = despachar(hoy, prestamista_id, config=config)
+    return preparados, enviados, fallidos
@@ -0,0 +1,77 @@
+"""
+Tareas de préstamos para la cola (tasks/cola.py)
+"""
+
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from tasks.cola import tarea
+from .causacion import causar_intereses
+from .fotos import tomar_foto
+from .models import Prestamo
+from .penalidades import calcular_penalidades
+from .recordatorios import enviar_recordatorios
+
+
+LADO_MAXIMO_LETRA = 1600  # píxeles
+
+
+@tarea
+def optimizar_letras(prestamo_id):
+    """Reduce las fotos de la letra a LADO_MAXIMO_LETRA px en JPEG"""
+    prestamo = Prestamo.objects.filter(pk=prestamo_id).first()
+    if prestamo is None:
+        return
+    cambiados = []
+    for campo in ('letra_foto', 'letra_foto_reverso'):
+        archivo = getattr(prestamo, campo)
+        if not archivo:
+            continue
+        with archivo.open('rb'), Image.open(archivo) as imagen:
+            if max(imagen.size) <= LADO_MAXIMO_LETRA and imagen.format == 'JPEG':
+                continue
+            imagen = ImageOps.exif_transpose(imagen).convert('RGB')
+            imagen.thumbnail((LADO_MAXIMO_LETRA, LADO_MAXIMO_LETRA))
+            salida = BytesIO()
+            imagen.save(salida, 'JPEG', quality=85, optimize=True)
+        anterior = archivo.name
+        nombre = os.path.splitext(os.path.basename(anterior))[0] + '.jpg'
+        archivo.save(nombre, ContentFile(salida.getvalue()), save=False)
+        if archivo.name != anterior:
+            archivo.storage.delete(anterior)
+        cambiados.append(campo)
+    if cambiados:
+        prestamo.save(update_fields=cambiados)
+
+
+@tarea
+def calcular_penalidades_dia():
+    calcular_penalidades(timezone.now().date())
+
+
+@tarea
+def causar_intereses_mes():
+    """
+    Cierra el mes anterior (interés vencido y préstamos que faltaron) y abre
+    el actual (interés anticipado). Corre el día 1.
+    """
+    hoy = timezone.now().date()
+    causar_intereses(hoy.replace(day=1) - timedelta(days=1), hoy=hoy)
+    causar_intereses(hoy, hoy=hoy)
+
+
+@tarea
+def foto_cartera_mes():
+    """Foto de cierre del mes anterior"""
+    tomar_foto(timezone.now().date().replace(day=1) - timedelta(days=1))
+
+
+@tarea(max_intentos=2)
+def enviar_recordatorios_dia(prestamista_id=None):
+    """Recordatorios de pago del día (de un prestamista o de todos)"""
+    enviar_recordatorios(prestamista_id=prestamista_id)
@@ -1,3 +1,664 @@
-from django.test import TestCase
+import csv
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from loans import causacion, dinero, estado_cuenta, fotos, libro, panels, penalidades, pronostico, recordatorios
+from loans.mensajeria import BackendMensajes, ErrorEnvio
+from loans.models import (
+    CausacionInteres, CheckpointLote, Cliente, FotoCartera, FotoPrestamista, Movimiento, Penalidad, Prestamo,
+    Recordatorio, SaldoCheckpoint,
+)
+from loans.hotpaths import HOTPATHS
+from payments import archivo, distribucion
+from prestamosjl.perf import RoutePerformanceMixin
+from prestamosjl.pruebas import (
+    auditoria_sincrona, crear_cliente, crear_pago, crear_prestamista, crear_prestamo, crear_usuario,
+)
+from users.tenencia import usar_prestamista
+
+
+class LoansRoutesPerformanceTest(RoutePerformanceMixin, TestCase):
+    """Presupuesto de consultas para todas las rutas de loans.urls"""
+
+    urls_module = 'loans.urls'
+    namespace = 'loans'
+    routes = {
+        'loans:dashboard': ('GET', None, None),
+        'loans:dashboard_panel[estadisticas]': ('GET', {'nombre': 'estadisticas'}, None),
+        'loans:dashboard_panel[recientes]': ('GET', {'nombre': 'recientes'}, None),
+        'loans:dashboard_panel[por_vencer]': ('GET', {'nombre': 'por_vencer'}, None),
+        'loans:dashboard_panel[mora]': ('GET', {'nombre': 'mora'}, None),
+        'loans:dashboard_panel[deudores]': ('GET', {'nombre': 'deudores'}, None),
+        'loans:dashboard_panel[pagos_hoy]': ('GET', {'nombre': 'pagos_hoy'}, None),
+        'loans:cliente_lista': ('GET', None, None),
+        'loans:cliente_crear': ('GET', None, None),
+        'loans:cliente_autocompletar': ('GET', None, {'q': 'ma'}),
+        'loans:cliente_detalle': ('GET', lambda t: {'pk': t.cliente.pk}, None),
+        'loans:cliente_editar': ('GET', lambda t: {'pk': t.cliente.pk}, None),
+        'loans:cliente_eliminar': ('GET', lambda t: {'pk': t.cliente.pk}, None),
+        'loans:cliente_estado_cuenta': ('GET', lambda t: {'pk': t.cliente.pk}, None),
+        'loans:cliente_estado_cuenta_csv': ('GET', lambda t: {'pk': t.cliente.pk}, None),
+        'loans:codeudor_crear': ('GET', lambda t: {'cliente_pk': t.cliente.pk}, None),
+        'loans:prestamo_lista': ('GET', None, None),
+        'loans:prestamo_crear': ('GET', None, None),
+        'loans:prestamo_autocompletar': ('GET', None, {'q': 'ma'}),
+        'loans:prestamo_detalle': ('GET', lambda t: {'pk': t.prestamo.pk}, None),
+        'loans:prestamo_editar': ('GET', lambda t: {'pk': t.prestamo.pk}, None),
+        'loans:prestamo_simular': ('GET', None, None),
+        'loans:prestamo_penalidad': ('GET', lambda t: {'pk': t.prestamo.pk}, {'fecha': '2100-01-01'}),
+        'loans:prestamo_simular[POST]': ('POST', None, {'valor': '1000000', 'tasa': '4', 'plazo': '12'}),
+        'loans:reportes': ('GET', None, {'fecha_desde': '2000-01-01', 'fecha_hasta': '2100-01-01'}),
+        'loans:prestamos_mora': ('GET', None, None),
+        'loans:prestamos_vencer': ('GET', None, {'dias': '365'}),
+        'loans:recordatorios_enviar[POST]': ('POST', None, None),
+        'loans:reporte_historico': ('GET', None, {'corte': '2100-01-31'}),
+        'loans:pronostico_cobros': ('GET', None, {'agrupar': 'dia'}),
+    }
+
+
+class HotpathsTest(TestCase):
+    """Los hot paths son las consultas de las vistas: solo la cartera en curso"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.now().date()
+        cls.a, cls.b = crear_prestamista(), crear_prestamista()
+        for prestamista in (cls.a, cls.b):
+            prestamo = crear_prestamo(crear_cliente(prestamista), fecha_prestamo=hoy, fecha_vencimiento=hoy)
+            crear_pago(prestamo, 100000, fecha_pago=hoy, referencia='TRX-000000')
+
+    def test_solo_filas_del_prestamista_en_curso(self):
+        hoy = timezone.now().date()
+        with usar_prestamista(self.a):
+            filas = {nombre: list(consulta(hoy)) for nombre, consulta in HOTPATHS.items()}
+        for nombre in ('loans:dashboard/pagos_hoy', 'loans:prestamo_lista/estado', 'payments:pago_lista/referencia'):
+            self.assertEqual(len(filas[nombre]), 1, nombre)
+        for nombre, objetos in filas.items():
+            self.assertEqual({o.prestamista_id for o in objetos} - {self.a.pk}, set(), nombre)
+
+    def test_sin_prestamista_no_devuelven_nada(self):
+        hoy = timezone.now().date()
+        for nombre, consulta in HOTPATHS.items():
+            self.assertEqual(list(consulta(hoy)), [], nombre)
+
+
+@auditoria_sincrona
+class PanelesTest(TestCase):
+    """La caché de un panel por prestamista solo cae con cambios de su cartera"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = crear_prestamista(), crear_prestamista()
+        cls.cliente_a = crear_cliente(cls.a)
+        cls.cliente_b = crear_cliente(cls.b)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalida_solo_al_dueno(self):
+        claves = {p: panels.clave_panel('recientes', p) for p in (self.a, self.b)}
+        html_b = panels.renderizar_panel('recientes', self.b)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prestamo = crear_prestamo(self.cliente_a)
+
+        self.assertNotEqual(panels.clave_panel('recientes', self.a), claves[self.a])
+        self.assertEqual(panels.clave_panel('recientes', self.b), claves[self.b])
+        self.assertIn(prestamo.codigo, panels.renderizar_panel('recientes', self.a))
+        self.assertEqual(panels.renderizar_panel('recientes', self.b), html_b)
+
+    def test_pago_refresca_estadisticas(self):
+        prestamo = crear_prestamo(self.cliente_a, valor=1000000)
+        antes = panels.renderizar_panel('estadisticas', self.a)
+        self.assertIn('1000000', antes)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pago = crear_pago(prestamo, 1000000, valor_capital=1000000)
+        despues = panels.renderizar_panel('estadisticas', self.a)
+        self.assertNotEqual(despues, antes)
+        self.assertEqual(panels.estadisticas(self.a)['stats']['prestamos_pagados'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pago.anular('Prueba')
+        self.assertEqual(panels.renderizar_panel('estadisticas', self.a), antes)
+
+    def test_cambio_de_prestamista_invalida_a_ambos(self):
+        prestamo = crear_prestamo(self.cliente_a)
+        prestamo = type(prestamo).objects.get(pk=prestamo.pk)
+        claves = {p: panels.clave_panel('recientes', p) for p in (self.a, self.b)}
+
+        prestamo.prestamista, prestamo.cliente = self.b, self.cliente_b
+        with self.captureOnCommitCallbacks(execute=True):
+            prestamo.save()
+
+        for p in (self.a, self.b):
+            self.assertNotEqual(panels.clave_panel('recientes', p), claves[p])
+
+
+class PenalidadesTest(TestCase):
+    """Cargo de mora: días desde el vencimiento más la gracia, con tope"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamo = crear_prestamo(
+            crear_cliente(crear_prestamista()), valor=1000000,
+            fecha_prestamo=date(2024, 12, 1), fecha_vencimiento=date(2025, 1, 1),
+        )
+
+    def test_calcula_desde_la_gracia(self):
+        # Gracia de 3 días: cobra del 4 al 14 de enero, 0,1 % diario
+        self.assertEqual(penalidades.calcular_penalidades(date(2025, 1, 14)), (1, 10000))
+        penalidad = Penalidad.objects.get(prestamo=self.prestamo)
+        self.assertEqual((penalidad.desde, penalidad.hasta, penalidad.dias), (date(2025, 1, 4), date(2025, 1, 14), 10))
+
+    def test_repetir_el_corte_no_carga_mas(self):
+        penalidades.calcular_penalidades(date(2025, 1, 14))
+        self.assertEqual(penalidades.calcular_penalidades(date(2025, 1, 14)), (0, 0))
+        # El siguiente corte sigue desde el último cargo
+        self.assertEqual(penalidades.calcular_penalidades(date(2025, 1, 24)), (1, 10000))
+
+    def test_tope_acumulado(self):
+        penalidades.calcular_penalidades(date(2025, 1, 14))
+        penalidades.calcular_penalidades(date(2026, 1, 1))
+        # MAX_PERCENT = 20: nunca más del 20 % del saldo
+        self.assertEqual(sum(p.valor for p in self.prestamo.penalidades.all()), 200000)
+        self.assertEqual(penalidades.calcular_penalidades(date(2026, 6, 1)), (0, 0))
+
+    def test_cotizar_no_guarda(self):
+        cotizacion = penalidades.cotizar(self.prestamo, date(2025, 1, 14))
+        self.assertEqual((cotizacion['pendiente'], cotizacion['por_cargar']), (0, 10000))
+        self.assertFalse(Penalidad.objects.exists())
+
+
+class CausacionTest(TestCase):
+    """Causación mensual: idempotente y consumida por los pagos en orden"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamo = crear_prestamo(
+            crear_cliente(crear_prestamista()), valor=1000000, fecha_prestamo=date(2024, 12, 1),
+        )
+
+    def causar(self):
+        causacion.causar_intereses(date(2024, 12, 1))
+        causacion.causar_intereses(date(2025, 1, 1))
+
+    def pendientes(self):
+        return [c.valor - c.valor_pagado for c in self.prestamo.causaciones.order_by('periodo')]
+
+    def test_causa_el_periodo(self):
+        checkpoint = causacion.causar_intereses(date(2024, 12, 1))
+        self.assertEqual(checkpoint.estado, 'COMPLETADO')
+        fila = CausacionInteres.objects.get(prestamo=self.prestamo)
+        self.assertEqual((fila.fecha_causacion, fila.valor), (date(2024, 12, 31), 50000))
+        self.assertEqual(libro.saldo(self.prestamo.pk, 'INTERES_POR_COBRAR'), 50000)
+
+    def test_vencido_se_causa_al_cierre(self):
+        causacion.causar_intereses(date(2025, 1, 1), hoy=date(2025, 1, 1))
+        self.assertFalse(CausacionInteres.objects.exists())
+        # El día 1 siguiente se cierra el mes, sin fechas futuras
+        causacion.causar_intereses(date(2025, 1, 1), hoy=date(2025, 2, 1))
+        self.assertEqual(CausacionInteres.objects.get().fecha_causacion, date(2025, 1, 31))
+
+    def test_repetir_completado_causa_los_que_faltan(self):
+        causacion.causar_intereses(date(2024, 12, 1))
+        # Desembolsado en diciembre pero registrado después de la corrida
+        tarde = crear_prestamo(self.prestamo.cliente, valor=500000, fecha_prestamo=date(2024, 12, 20))
+        causacion.causar_intereses(date(2024, 12, 1))
+        self.assertEqual(
+            dict(CausacionInteres.objects.values_list('prestamo_id', 'valor')),
+            {self.prestamo.pk: 50000, tarde.pk: 25000},
+        )
+        self.assertEqual(libro.saldo(tarde.pk, 'INTERES_POR_COBRAR'), 25000)
+
+    def test_repetir_no_duplica(self):
+        causacion.causar_intereses(date(2024, 12, 1))
+        causacion.causar_intereses(date(2024, 12, 1))
+        # Una corrida caída a medias retoma sin duplicar lo ya causado
+        CheckpointLote.objects.filter(proceso=causacion.PROCESO).update(estado='EN_CURSO', ultimo_id=0)
+        causacion.causar_intereses(date(2024, 12, 1))
+        self.assertEqual(CausacionInteres.objects.filter(prestamo=self.prestamo).count(), 1)
+
+    def test_pago_consume_el_periodo_mas_antiguo(self):
+        self.causar()
+        crear_pago(self.prestamo, 70000, valor_interes=70000, fecha_pago=date(2025, 1, 20))
+        self.assertEqual(self.pendientes(), [0, 30000])
+        self.assertEqual(libro.saldo(self.prestamo.pk, 'INTERES_POR_COBRAR'), 30000)
+
+    def test_anular_devuelve_el_periodo_mas_reciente(self):
+        self.causar()
+        crear_pago(self.prestamo, 30000, valor_interes=30000, fecha_pago=date(2025, 1, 20))
+        pago = crear_pago(self.prestamo, 40000, valor_interes=40000, fecha_pago=date(2025, 1, 20))
+        pago.anular('Prueba')
+        self.assertEqual(self.pendientes(), [20000, 50000])
+        self.assertEqual(libro.saldo(self.prestamo.pk, 'INTERES_POR_COBRAR'), 70000)
+
+    def test_pago_sin_causacion_causa_su_periodo(self):
+        self.assertEqual(
+            distribucion.cotizar(self.prestamo, Decimal(100000), fecha=date(2025, 1, 20)), (0, 50000, 50000),
+        )
+        pago = crear_pago(self.prestamo, 100000, valor_interes=50000, fecha_pago=date(2025, 1, 20))
+        self.assertEqual((pago.valor_interes, pago.valor_capital), (50000, 50000))
+        fila = CausacionInteres.objects.get(prestamo=self.prestamo)
+        self.assertEqual((fila.periodo, fila.fecha_causacion, fila.valor), (date(2025, 1, 1), date(2025, 1, 20), 50000))
+        self.assertEqual(libro.saldo(self.prestamo.pk, 'INGRESO_INTERES'), 50000)
+        self.assertEqual(libro.saldo(self.prestamo.pk, 'INTERES_POR_COBRAR'), 0)
+        # El cierre del mes lo encuentra causado
+        causacion.causar_intereses(date(2025, 1, 1))
+        self.assertEqual(self.prestamo.causaciones.count(), 1)
+
+
+class ModoDineroTest(TestCase):
+    """loans.E001: las columnas de dinero siguen el modo configurado"""
+
+    def test_base_en_el_modo_configurado(self):
+        self.assertEqual(dinero.revisar_modo(None, databases=['default']), [])
+
+    def test_cambiar_el_modo_sin_convertir(self):
+        otro_modo = {**settings.LOAN_SETTINGS, 'MONEY': {'INTEGER_PESOS': not dinero.pesos_enteros()}}
+        with override_settings(LOAN_SETTINGS=otro_modo):
+            errores = dinero.revisar_modo(None, databases=['default'])
+        self.assertEqual([e.id for e in errores], ['loans.E001'])
+        self.assertIn('loans.Prestamo', errores[0].msg)
+        # Sin base de datos (manage.py check) no revisa
+        with override_settings(LOAN_SETTINGS=otro_modo):
+            self.assertEqual(dinero.revisar_modo(None), [])
+
+
+class ResumenClienteTest(TestCase):
+    """deuda_total, prestamos_activos_count y ultimo_pago siguen a préstamos y pagos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamista = crear_prestamista()
+
+    def setUp(self):
+        self.cliente = crear_cliente(self.prestamista)
+        self.prestamo = crear_prestamo(self.cliente, valor=1000000)
+        crear_prestamo(self.cliente, valor=500000)
+
+    def resumen(self, cliente=None):
+        cliente = Cliente.objects.get(pk=(cliente or self.cliente).pk)
+        return cliente.deuda_total, cliente.prestamos_activos_count, cliente.ultimo_pago
+
+    def test_prestamos_nuevos(self):
+        self.assertEqual(self.resumen(), (1500000, 2, None))
+
+    def test_pago_y_anulacion(self):
+        pago = crear_pago(self.prestamo, 200000, valor_capital=200000, fecha_pago=date(2025, 2, 1))
+        self.assertEqual(self.resumen(), (1300000, 2, date(2025, 2, 1)))
+        pago.anular('Prueba')
+        self.assertEqual(self.resumen(), (1500000, 2, None))
+
+    def test_prestamo_pagado_no_cuenta(self):
+        crear_pago(self.prestamo, 1000000, valor_capital=1000000, fecha_pago=date(2025, 2, 1))
+        self.assertEqual(self.resumen(), (500000, 1, date(2025, 2, 1)))
+
+    def test_cambio_de_cliente_y_cancelacion(self):
+        otro = crear_cliente(self.prestamista)
+        self.prestamo.cliente = otro
+        self.prestamo.save()
+        self.assertEqual(self.resumen(), (500000, 1, None))
+        self.assertEqual(self.resumen(otro), (1000000, 1, None))
+        self.prestamo.estado = 'CANCELADO'
+        self.prestamo.save()
+        self.assertEqual(self.resumen(otro), (0, 0, None))
+
+
+class CedulaClienteTest(TestCase):
+    """La cédula es única dentro de cada cartera, no entre prestamistas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = crear_prestamista(), crear_prestamista()
+        cls.existente = crear_cliente(cls.a, cedula='1234567890')
+
+    def crear(self, prestamista, cedula='1234567890'):
+        self.client.force_login(crear_usuario(f'usuario{prestamista.pk}', prestamista))
+        return self.client.post(reverse('loans:cliente_crear'), {
+            'nombre': 'Ana', 'apellido': 'Pérez', 'cedula': cedula,
+            'direccion_principal': 'Calle 1', 'celular': '3000000000', 'activo': 'on',
+        })
+
+    def test_otra_cartera_puede_repetirla(self):
+        respuesta = self.crear(self.b)
+        cliente = Cliente.objects.get(prestamista=self.b)
+        self.assertRedirects(respuesta, reverse('loans:cliente_detalle', args=[cliente.pk]))
+        self.assertEqual(cliente.cedula, self.existente.cedula)
+
+    def test_repetida_en_la_misma_cartera(self):
+        respuesta = self.crear(self.a)
+        self.assertFormError(respuesta.context['form'], 'cedula', 'Ya existe un cliente con esta cédula')
+        self.assertEqual(Cliente.objects.filter(cedula='1234567890').count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            crear_cliente(self.a, cedula='1234567890')
+
+
+class EstadoCuentaTest(TestCase):
+    """Saldos acumulados por ventana, paginados del más reciente al más antiguo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = crear_cliente(crear_prestamista())
+        cls.a = crear_prestamo(cls.cliente, valor=1000000)
+        cls.b = crear_prestamo(cls.cliente, valor=500000)
+        crear_pago(cls.a, 100000, valor_capital=100000, fecha_pago=date(2025, 2, 1))
+        crear_pago(cls.b, 500000, valor_capital=500000, fecha_pago=date(2025, 2, 2))
+        crear_pago(cls.a, 200000, valor_capital=200000, fecha_pago=date(2025, 2, 3))
+        crear_pago(cls.a, 10000, valor_capital=10000, fecha_pago=date(2025, 2, 4)).anular('Prueba')
+
+    def filas(self, movimientos):
+        return [(p.prestamo_id, p.saldo_prestamo, p.pagado_acumulado) for p in movimientos]
+
+    def recorrer(self):
+        primera, cursor = estado_cuenta.pagina(self.cliente, tamano=2)
+        segunda, fin = estado_cuenta.pagina(self.cliente, estado_cuenta.leer_cursor(cursor), tamano=2)
+        self.assertIsNone(fin)
+        return self.filas(primera), self.filas(segunda)
+
+    def test_paginas_con_acumulados(self):
+        self.assertEqual(self.recorrer(), (
+            [(self.a.pk, 700000, 800000), (self.b.pk, 0, 600000)],
+            [(self.a.pk, 900000, 100000)],
+        ))
+
+    def test_con_prestamo_archivado(self):
+        esperado = self.recorrer()
+        self.b.refresh_from_db()
+        archivo.archivar(meses=12, hoy=self.b.fecha_pago_completo + timedelta(days=400))
+        self.assertEqual(self.recorrer(), esperado)
+
+    def test_csv_en_orden_cronologico(self):
+        filas = list(csv.reader(estado_cuenta.lineas_csv(self.cliente)))
+        self.assertEqual([fila[0] for fila in filas[1:]], ['2025-02-01', '2025-02-02', '2025-02-03'])
+        self.assertEqual([Decimal(valor) for valor in filas[-1][-2:]], [700000, 800000])
+
+
+class LibroTest(TestCase):
+    """Libro de partida doble: cuadra, no se reescribe y sus checkpoints no cambian los saldos"""
+
+    def setUp(self):
+        self.prestamo = crear_prestamo(
+            crear_cliente(crear_prestamista()), valor=1000000,
+            fecha_prestamo=date(2024, 12, 1), fecha_vencimiento=date(2025, 1, 1),
+        )
+        causacion.causar_intereses(date(2024, 12, 1))
+        penalidades.calcular_penalidades(date(2025, 1, 14))
+        # Mora 10.000, interés 50.000 (diciembre), capital 40.000; febrero se causa al pagar
+        self.pago = crear_pago(self.prestamo, 100000, valor_interes=50000, fecha_pago=date(2025, 2, 1))
+
+    def saldos(self, fecha=date(2025, 2, 1)):
+        return {cuenta: valor for cuenta, valor in libro.saldos(self.prestamo.pk, fecha).items() if valor}
+
+    def test_cuadra_y_saldos(self):
+        totales = Movimiento.objects.aggregate(debito=Sum('debito'), credito=Sum('credito'))
+        self.assertEqual(totales['debito'], totales['credito'])
+        self.assertEqual(self.saldos(), {
+            'CAJA': -900000, 'CARTERA': 960000, 'INTERES_POR_COBRAR': 50000,
+            'INGRESO_INTERES': 100000, 'INGRESO_MORA': 10000,
+        })
+
+    def test_anular_agrega_el_reverso(self):
+        antes = self.saldos()
+        self.pago.anular('Prueba')
+        # La historia no cambia; el reverso queda con la fecha de la anulación
+        self.assertEqual(self.saldos(), antes)
+        self.assertEqual(self.saldos(timezone.now().date()), {
+            'CAJA': -1000000, 'CARTERA': 1000000, 'INTERES_POR_COBRAR': 100000, 'MORA_POR_COBRAR': 10000,
+            'INGRESO_INTERES': 100000, 'INGRESO_MORA': 10000,
+        })
+
+    def test_checkpoint(self):
+        esperado = self.saldos()
+        self.assertEqual(libro.tomar_checkpoint(date(2025, 1, 31)), 1)
+        self.assertEqual(libro.tomar_checkpoint(date(2025, 1, 31)), 0)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.saldos(), esperado)
+        # Un movimiento anterior al checkpoint lo invalida
+        crear_pago(self.prestamo, 10000, valor_capital=10000, fecha_pago=date(2025, 1, 20))
+        self.assertFalse(SaldoCheckpoint.objects.exists())
+        self.assertEqual(self.saldos()['CARTERA'], 950000)
+
+    def test_solo_agregar(self):
+        with self.assertRaises(TypeError):
+            Movimiento.objects.update(debito=0)
+        with self.assertRaises(TypeError):
+            Movimiento.objects.first().delete()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            libro.registrar(*libro.pago(self.pago))
+
+    def test_abrir_libro_sin_desembolso(self):
+        # Cargado con bulk_create (sin desembolso) y con su interés ya asentado
+        Prestamo.objects.bulk_create([Prestamo(
+            cliente=self.prestamo.cliente, prestamista=self.prestamo.prestamista, codigo='PR999999',
+            valor_inicial=500000, saldo_actual=500000, porcentaje_interes=5, fecha_prestamo=date(2024, 12, 1),
+        )])
+        cargado = Prestamo.objects.get(codigo='PR999999')
+        causacion.causar_intereses(date(2024, 12, 1))
+        self.assertEqual(libro.abrir_libro(), 1)
+        saldos = {cuenta: valor for cuenta, valor in libro.saldos(cargado.pk).items() if valor}
+        self.assertEqual(saldos, {
+            'CAJA': -500000, 'CARTERA': 500000, 'INTERES_POR_COBRAR': 25000, 'INGRESO_INTERES': 25000,
+        })
+        self.assertEqual(libro.abrir_libro(), 0)
+
+
+class FotosTest(TestCase):
+    """Fotos de fin de mes: saldos del libro al corte y edades de la cartera"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamista = crear_prestamista()
+        cliente = crear_cliente(cls.prestamista)
+        cls.al_dia = crear_prestamo(
+            cliente, valor=1000000, fecha_prestamo=date(2024, 12, 1), fecha_vencimiento=date(2025, 3, 1),
+        )
+        cls.vencido = crear_prestamo(
+            cliente, valor=500000, estado='MORA',
+            fecha_prestamo=date(2024, 12, 1), fecha_vencimiento=date(2025, 1, 1),
+        )
+        # 5.000 de mora (10 días al 0,1 % de 500.000)
+        penalidades.calcular_penalidades(date(2025, 1, 14))
+
+    def foto(self, corte):
+        return FotoPrestamista.objects.get(prestamista=self.prestamista, corte=corte)
+
+    def test_totales_y_edades(self):
+        self.assertEqual(fotos.tomar_foto(date(2025, 1, 31)), 2)
+        foto = self.foto(date(2025, 1, 31))
+        self.assertEqual(
+            (foto.prestamos_abiertos, foto.prestamos_mora, foto.saldo_total, foto.mora_pendiente),
+            (2, 1, 1500000, 5000),
+        )
+        self.assertEqual((foto.saldo_al_dia, foto.saldo_1_30, foto.saldo_31_60), (1000000, 500000, 0))
+        self.assertEqual(FotoCartera.objects.get(prestamo=self.vencido, corte=date(2025, 1, 31)).dias_mora, 30)
+
+    def test_corte_no_ve_pagos_posteriores(self):
+        fotos.tomar_foto(date(2025, 1, 31))
+        crear_pago(self.al_dia, 100000, valor_capital=100000, fecha_pago=date(2025, 2, 10))
+        # Repetir el corte lo reemplaza con los saldos del libro a esa fecha
+        fotos.tomar_foto(date(2025, 1, 31))
+        self.assertEqual(self.foto(date(2025, 1, 31)).saldo_total, 1500000)
+        self.assertEqual(FotoCartera.objects.filter(corte=date(2025, 1, 31)).count(), 2)
+
+    def test_historial(self):
+        fotos.tomar_foto(date(2025, 1, 31))
+        crear_pago(self.al_dia, 100000, valor_capital=100000, fecha_pago=date(2025, 2, 10))
+        fotos.tomar_foto(date(2025, 2, 28))
+        febrero = self.foto(date(2025, 2, 28))
+        self.assertEqual((febrero.saldo_total, febrero.saldo_31_60), (1400000, 500000))
+        historial = fotos.historial(self.prestamista)
+        self.assertEqual([f.corte for f in historial], [date(2025, 1, 31), date(2025, 2, 28)])
+        self.assertEqual((historial[0].variacion_saldo, historial[1].variacion_saldo), (None, -100000))
+
+    def test_reporte_con_meses_invalidos(self):
+        fotos.tomar_foto(date(2025, 1, 31))
+        fotos.tomar_foto(date(2025, 2, 28))
+        self.client.force_login(crear_usuario('gerente', self.prestamista))
+        for meses, cortes in [('abc', 2), ('-3', 1), ('1', 1), ('99999999', 2)]:
+            respuesta = self.client.get(reverse('loans:reporte_historico'), {'meses': meses})
+            self.assertEqual(respuesta.status_code, 200, msg=meses)
+            self.assertEqual(len(respuesta.context['cortes']), cortes, msg=meses)
+
+
+class BackendPrueba(BackendMensajes):
+    """Anota los envíos; 3000000001 es un número inválido y 3000000002 falla una vez"""
+
+    enviados = []
+    fallos = set()
+
+    def enviar(self, numero, texto):
+        if numero == '3000000001':
+            raise ErrorEnvio('Número inválido', reintentable=False)
+        if numero == '3000000002' and numero not in self.fallos:
+            self.fallos.add(numero)
+            raise ErrorEnvio('Pasarela ocupada')
+        self.enviados.append((numero, texto))
+
+
+@override_settings(LOAN_SETTINGS={**settings.LOAN_SETTINGS, 'REMINDERS': {
+    'BACKEND': 'loans.tests.BackendPrueba', 'OPTIONS': {'CHANNEL': 'WHATSAPP'},
+    'RATE_PER_SECOND': 0, 'RETRY_BACKOFF': 0,
+}})
+class RecordatoriosTest(TestCase):
+    """Un recordatorio por préstamo y día, enviado con reintentos por el backend configurado"""
+
+    hoy = date(2025, 3, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        prestamista = crear_prestamista()
+
+        def prestamo(vence, celular='3000000000', **campos):
+            cliente = crear_cliente(prestamista, nombre=f'Vence{vence}', celular=celular)
+            return crear_prestamo(cliente, fecha_vencimiento=cls.hoy + timedelta(days=vence), **campos)
+
+        cls.por_vencer = prestamo(2)
+        cls.vencido = prestamo(-10)
+        prestamo(10)
+        prestamo(-90)
+        prestamo(1, estado='PAGADO')
+        prestamo(1, celular='')
+        cls.invalido = prestamo(0, celular='3000000001')
+        cls.ocupado = prestamo(0, celular='3000000002')
+
+    def setUp(self):
+        BackendPrueba.enviados = []
+        BackendPrueba.fallos = set()
+
+    def test_preparar_una_vez_por_dia(self):
+        self.assertEqual(recordatorios.preparar(self.hoy), 4)
+        self.assertEqual(recordatorios.preparar(self.hoy), 0)
+        mensajes = dict(Recordatorio.objects.values_list('prestamo_id', 'mensaje'))
+        self.assertEqual(set(mensajes), {self.por_vencer.pk, self.vencido.pk, self.invalido.pk, self.ocupado.pk})
+        self.assertIn('vence el 12/03/2025', mensajes[self.por_vencer.pk])
+        self.assertIn('10 días de vencido', mensajes[self.vencido.pk])
+        self.assertEqual(set(Recordatorio.objects.values_list('canal', flat=True)), {'WHATSAPP'})
+
+    def test_despachar_con_reintentos(self):
+        self.assertEqual(recordatorios.enviar_recordatorios(self.hoy), (4, 3, 1))
+        estados = {r.prestamo_id: (r.estado, r.intentos) for r in Recordatorio.objects.all()}
+        self.assertEqual(estados[self.ocupado.pk], ('ENVIADO', 2))
+        self.assertEqual(estados[self.invalido.pk], ('FALLIDO', 1))
+        self.assertEqual(len(BackendPrueba.enviados), 3)
+        # Otra corrida del día no reenvía
+        self.assertEqual(recordatorios.enviar_recordatorios(self.hoy), (0, 0, 0))
+
+
+class AutocompletarTest(TestCase):
+    """Autocompletar por prefijo, solo en la cartera abierta del prestamista"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamista = crear_prestamista()
+        cls.ana = crear_cliente(cls.prestamista, nombre='Ana', apellido='Gómez', cedula='52000001')
+        cls.andres = crear_cliente(cls.prestamista, nombre='Andrés', apellido='Pérez', cedula='52000002')
+        crear_cliente(cls.prestamista, nombre='Anabel', apellido='Ruiz', activo=False)
+        crear_cliente(crear_prestamista(), nombre='Ana', apellido='Otra')
+        cls.prestamo = crear_prestamo(cls.ana, codigo='PR000123')
+        crear_prestamo(cls.andres, estado='PAGADO')
+        cls.usuario = crear_usuario('cajero', cls.prestamista)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def ids(self, ruta, q):
+        respuesta = self.client.get(reverse(ruta), {'q': q})
+        return [fila['id'] for fila in respuesta.json()['resultados']]
+
+    def test_clientes(self):
+        self.assertEqual(self.ids('loans:cliente_autocompletar', 'an'), [self.ana.pk, self.andres.pk])
+        self.assertEqual(self.ids('loans:cliente_autocompletar', 'GÓM'), [self.ana.pk])
+        self.assertEqual(self.ids('loans:cliente_autocompletar', 'gómez an'), [self.ana.pk])
+        self.assertEqual(self.ids('loans:cliente_autocompletar', '5200000'), [self.ana.pk, self.andres.pk])
+        self.assertEqual(self.ids('loans:cliente_autocompletar', 'a'), [])
+
+    def test_prestamos_abiertos(self):
+        self.assertEqual(self.ids('loans:prestamo_autocompletar', 'pr0001'), [self.prestamo.pk])
+        self.assertEqual(self.ids('loans:prestamo_autocompletar', '123'), [self.prestamo.pk])
+        # El préstamo pagado de Andrés no aparece
+        self.assertEqual(self.ids('loans:prestamo_autocompletar', 'an'), [self.prestamo.pk])
+
+
+class PronosticoTest(TestCase):
+    """Cronograma vectorizado: cuotas iguales de capital e interés sobre el saldo del periodo"""
+
+    hoy = date(2025, 1, 20)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamista = crear_prestamista()
+        cls.cliente = crear_cliente(cls.prestamista)
+        crear_prestamo(crear_cliente(crear_prestamista()), fecha_vencimiento=date(2025, 2, 1))
+
+    def prestamo(self, **campos):
+        datos = {'valor': 1200000, 'fecha_prestamo': date(2025, 1, 15), 'fecha_vencimiento': date(2025, 4, 15)}
+        datos.update(campos)
+        return crear_prestamo(self.cliente, **datos)
+
+    def cuotas(self, resultado):
+        return {fila['fecha']: fila['programado'] for fila in resultado['filas'] if fila['programado']}
+
+    def calcular(self, agrupacion='dia', ponderado=False):
+        return pronostico.calcular(self.prestamista, self.hoy, 91, agrupacion, ponderado=ponderado)
+
+    def test_interes_vencido(self):
+        self.prestamo(tipo_interes='VENCIDO')
+        # Capital 400.000 por cuota; interés del 5 % sobre 1.200.000, 800.000 y 400.000 al cierre
+        self.assertEqual(self.cuotas(self.calcular()), {
+            date(2025, 2, 15): 460000, date(2025, 3, 15): 440000, date(2025, 4, 15): 420000,
+        })
+
+    def test_interes_anticipado(self):
+        self.prestamo(tipo_interes='ANTICIPADO')
+        # El interés de cada periodo va en la cuota que lo abre; la última es solo capital
+        self.assertEqual(self.cuotas(self.calcular()), {
+            date(2025, 2, 15): 440000, date(2025, 3, 15): 420000, date(2025, 4, 15): 400000,
+        })
+
+    def test_vencido_aparte_y_semanas(self):
+        self.prestamo(tipo_interes='VENCIDO')
+        self.prestamo(
+            valor=500000, tipo_interes='VENCIDO',
+            fecha_prestamo=date(2024, 12, 10), fecha_vencimiento=date(2025, 1, 10),
+        )
+        diario, semanal = self.calcular(), self.calcular('semana')
+        self.assertEqual((diario['prestamos'], diario['vencido_programado']), (2, 525000))
+        self.assertEqual(diario['total_programado'], 1320000)
+        self.assertEqual(semanal['total_programado'], 1320000)
+        self.assertEqual(semanal['filas'][0]['fecha'], self.hoy)
+        self.assertEqual(semanal['filas'][1]['fecha'].weekday(), 0)
+
+    def test_pesos_por_historia_de_pagos(self):
+        # Siete meses sin pagos: (0 + 1) / (6 + 1)
+        self.prestamo(fecha_prestamo=date(2024, 6, 15))
+        resultado = self.calcular(ponderado=True)
+        self.assertAlmostEqual(resultado['total_esperado'], resultado['total_programado'] / 7)
@@ -10,13 +10,17 @@ app_name = 'loans'
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('paneles/<slug:nombre>/', views.dashboard_panel, name='dashboard_panel'),
     
     # Clientes
     path('clientes/', views.cliente_lista, name='cliente_lista'),
     path('clientes/crear/', views.cliente_crear, name='cliente_crear'),
+    path('clientes/autocompletar/', views.cliente_autocompletar, name='cliente_autocompletar'),
     path('clientes/<int:pk>/', views.cliente_detalle, name='cliente_detalle'),
     path('clientes/<int:pk>/editar/', views.cliente_editar, name='cliente_editar'),
     path('clientes/<int:pk>/eliminar/', views.cliente_eliminar, name='cliente_eliminar'),
+    path('clientes/<int:pk>/estado-cuenta/', views.cliente_estado_cuenta, name='cliente_estado_cuenta'),
+    path('clientes/<int:pk>/estado-cuenta/csv/', views.cliente_estado_cuenta_csv, name='cliente_estado_cuenta_csv'),
     
     # Co-deudores
     path('clientes/<int:cliente_pk>/codeudor/crear/', views.codeudor_crear, name='codeudor_crear'),
@@ -24,14 +28,19 @@ urlpatterns = [
     # Préstamos
     path('prestamos/', views.prestamo_lista, name='prestamo_lista'),
     path('prestamos/crear/', views.prestamo_crear, name='prestamo_crear'),
+    path('prestamos/autocompletar/', views.prestamo_autocompletar, name='prestamo_autocompletar'),
     path('prestamos/<int:pk>/', views.prestamo_detalle, name='prestamo_detalle'),
     path('prestamos/<int:pk>/editar/', views.prestamo_editar, name='prestamo_editar'),
     path('prestamos/simular/', views.prestamo_simular, name='prestamo_simular'),
+    path('prestamos/<int:pk>/penalidad/', views.prestamo_penalidad, name='prestamo_penalidad'),
     
     # Reportes
     path('reportes/', views.reportes, name='reportes'),
     path('reportes/mora/', views.prestamos_mora, name='prestamos_mora'),
     path('reportes/vencer/', views.prestamos_vencer, name='prestamos_vencer'),
+    path('reportes/vencer/recordatorios/', views.recordatorios_enviar, name='recordatorios_enviar'),
+    path('reportes/historico/', views.reporte_historico, name='reporte_historico'),
+    path('reportes/pronostico/', views.pronostico_cobros, name='pronostico_cobros'),
 ]
 
 
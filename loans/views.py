@@ -1,130 +1,63 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum, Count
+from django.db.models import Sum
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
-from datetime import timedelta, datetime
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from datetime import datetime
 from decimal import Decimal
 
-from .models import Cliente, Prestamo, CoDeudor
+from . import busqueda, consultas, dinero, estado_cuenta, fotos, panels, penalidades, pronostico
+from .tareas import enviar_recordatorios_dia, optimizar_letras
+from .models import Cliente, Prestamo, CoDeudor, FotoCartera
 from .forms import ClienteForm, PrestamoForm, CoDeudorForm, PagoRapidoForm
-from users.models import Prestamista
+from audit.registro import historial
+from tasks.cola import encolar
+from payments import archivo
 from payments.models import Pago
+from prestamosjl.db_router import usar_replica
+from users.identidad import prestamista_requerido
 
 
 @login_required
 def dashboard(request):
-    """Dashboard principal con estadísticas"""
-    
-    # Obtener prestamista del usuario logueado
-    try:
-        prestamista = request.user.profile.prestamista
-    except ValueError:
-        prestamista = Prestamista.objects.first()
-    
-    # Estadísticas generales
-    prestamos = Prestamo.objects.filter(prestamista=prestamista)
-    from django.db.models import Sum
-    print("prestamos_activos:", Prestamo.objects.filter(estado='ACTIVO').count())
-    print("prestamos_recientes:", Prestamo.objects.all().order_by('-created_at')[:5])
-
-    stats = {
-        'total_prestamos': Prestamo.objects.all().count(), #prestamos.count(),
-        'prestamos_activos': Prestamo.objects.filter(estado='ACTIVO').count(),
-        'prestamos_mora': Prestamo.objects.filter(estado='MORA').count(),
-        'prestamos_vencidos': Prestamo.objects.filter(estado='VENCIDO').count(),
-        'prestamos_pagados': Prestamo.objects.filter(estado='PAGADO').count(),
-
-        'total_prestado': sum(Prestamo.objects.all().values_list('saldo_actual', flat=True)), #prestamos.aggregate(Sum('saldo_actual'))['saldo_actual__sum'] or 0,
-        'saldo_pendiente': sum(Prestamo.objects.filter(
-            estado__in=['ACTIVO', 'VENCIDO', 'MORA']
-        ).values_list('saldo_actual', flat=True)), #prestamos.filter(
-        #    estado__in=['ACTIVO', 'VENCIDO', 'MORA']   
-        'total_clientes': Cliente.objects.filter(activo=True).count(),
-    }
-    
-    # Préstamos recientes
-    prestamos_recientes = Prestamo.objects.all().order_by('-created_at')[:5]   #prestamos.order_by('-created_at')[:5]
-    
-    # Préstamos por vencer (próximos 7 días)
-    fecha_limite = timezone.now().date() + timedelta(days=7)
-    prestamos_vencer = Prestamo.objects.filter(
-        fecha_vencimiento__lte=fecha_limite,
-        fecha_vencimiento__gte=timezone.now().date(),
-        estado='ACTIVO'
-    ).order_by('fecha_vencimiento')[:5]
-    
-    # Préstamos en mora
-    prestamos_mora = prestamos.filter(estado='MORA').order_by('-fecha_prestamo')[:5]
-    
-    # Clientes con más deuda
-    from django.db.models import Sum
-    clientes_deuda = Cliente.objects.annotate(
-        deuda=Sum('prestamos__saldo_actual',
-                 filter=Q(prestamos__estado__in=['ACTIVO', 'VENCIDO', 'MORA']))
-    ).filter(deuda__gt=0).order_by('-deuda')[:5]
-    
-    # Pagos recientes (hoy)
-    pagos_hoy = Pago.objects.filter(
-        fecha_pago=timezone.now().date(),
-        anulado=False
-    ).order_by('-created_at')[:5]
+    """Dashboard principal: la página se pinta de inmediato y cada panel
+    se carga (y refresca) por separado desde ``dashboard_panel``"""
     
     context = {
-        'stats': stats,
-        'prestamos_recientes': prestamos_recientes,
-        'prestamos_vencer': prestamos_vencer,
-        'prestamos_mora': prestamos_mora,
-        'clientes_deuda': clientes_deuda,
-        'pagos_hoy': pagos_hoy,
-        'prestamista': prestamista,
+        'paneles': {nombre: panels.ttl_panel(nombre) for nombre in panels.PANELES},
     }
-    print(context)
     return render(request, 'loans/dashboard.html', context)
 
 
+@login_required
+@prestamista_requerido
+async def dashboard_panel(request, nombre):
+    """Fragmento HTML de un panel del dashboard (cacheado por panel)"""
+    
+    if nombre not in panels.PANELES:
+        raise Http404('Panel desconocido')
+    
+    prestamista = await request.aprestamista()
+    html = await panels.ejecutar(panels.renderizar_panel, nombre, prestamista)
+    
+    response = HttpResponse(html)
+    patch_cache_control(response, private=True, max_age=panels.ttl_panel(nombre))
+    return response
+
+
 # ============= CLIENTES =============
 
 @login_required
+@usar_replica
 def cliente_lista(request):
-    clientes = (
-        Cliente.objects.all()
-        .order_by('apellido', 'nombre')
-        .annotate(
-            total_prestamos_activos=Count(
-                'prestamos',
-                filter=Q(prestamos__estado='ACTIVO')
-            ),
-            deuda_total=Sum(
-                'prestamos__saldo_actual',
-                filter=Q(prestamos__estado='ACTIVO')
-            )
-        )
-    )
-    
-    # Búsqueda
     search = request.GET.get('search', '')
-    if search:
-        clientes = clientes.filter(
-            Q(nombre__icontains=search) |
-            Q(apellido__icontains=search) |
-            Q(cedula__icontains=search) |
-            Q(celular__icontains=search)
-        )
-    
-    # Filtro de estado
     estado = request.GET.get('estado', '')
-    if estado == 'activos':
-        clientes = clientes.filter(activo=True)
-    elif estado == 'inactivos':
-        clientes = clientes.filter(activo=False)
-
-    # Para depuración:
-    if clientes:
-        print("Cliente:", clientes[0])
-        print("Prestamos activos:", clientes[0].total_prestamos_activos)
-        print("Deuda total:", clientes[0].deuda_total)
+    clientes = consultas.clientes(search=search, estado=estado)
 
     context = {
         'clientes': clientes,
@@ -139,7 +72,7 @@ def cliente_lista(request):
 def cliente_detalle(request, pk):
     """Detalle de un cliente con sus préstamos"""
     
-    cliente = get_object_or_404(Cliente, pk=pk)
+    cliente = get_object_or_404(Cliente.del_prestamista, pk=pk)
     prestamos = cliente.prestamos.all().order_by('-fecha_prestamo')
     codeudores = cliente.codeudores.all()
     
@@ -158,19 +91,52 @@ def cliente_detalle(request, pk):
         'prestamos': prestamos,
         'codeudores': codeudores,
         'stats': stats,
+        'historial': historial(cliente, relacionados={CoDeudor: codeudores.values('id')}),
     }
     
     return render(request, 'loans/cliente_detalle.html', context)
 
 
 @login_required
+@usar_replica
+def cliente_estado_cuenta(request, pk):
+    """Estado de cuenta del cliente con saldos acumulados, paginado por fecha"""
+    
+    cliente = get_object_or_404(Cliente.del_prestamista, pk=pk)
+    cursor = estado_cuenta.leer_cursor(request.GET.get('antes'))
+    movimientos, siguiente = estado_cuenta.pagina(cliente, cursor)
+    
+    context = {
+        'cliente': cliente,
+        'movimientos': movimientos,
+        'siguiente': siguiente,
+        'es_primera_pagina': cursor is None,
+    }
+    return render(request, 'loans/cliente_estado_cuenta.html', context)
+
+
+@login_required
+@usar_replica
+def cliente_estado_cuenta_csv(request, pk):
+    """Exportar el estado de cuenta completo a CSV (en streaming)"""
+    
+    cliente = get_object_or_404(Cliente.del_prestamista, pk=pk)
+    response = StreamingHttpResponse(estado_cuenta.lineas_csv(cliente), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="estado_cuenta_{cliente.cedula}.csv"'
+    return response
+
+
+@login_required
+@prestamista_requerido
 def cliente_crear(request):
     """Crear nuevo cliente"""
     
     if request.method == 'POST':
         form = ClienteForm(request.POST)
         if form.is_valid():
-            cliente = form.save()
+            cliente = form.save(commit=False)
+            cliente.prestamista = request.prestamista
+            cliente.save()
             messages.success(request, f'Cliente {cliente.nombre_completo} creado exitosamente')
             return redirect('loans:cliente_detalle', pk=cliente.pk)
     else:
@@ -184,7 +150,7 @@ def cliente_crear(request):
 def cliente_editar(request, pk):
     """Editar cliente existente"""
     
-    cliente = get_object_or_404(Cliente, pk=pk)
+    cliente = get_object_or_404(Cliente.del_prestamista, pk=pk)
     
     if request.method == 'POST':
         form = ClienteForm(request.POST, instance=cliente)
@@ -203,7 +169,7 @@ def cliente_editar(request, pk):
 def cliente_eliminar(request, pk):
     """Eliminar/Desactivar cliente"""
     
-    cliente = get_object_or_404(Cliente, pk=pk)
+    cliente = get_object_or_404(Cliente.del_prestamista, pk=pk)
     
     if request.method == 'POST':
         # No eliminar, solo desactivar
@@ -220,7 +186,7 @@ def cliente_eliminar(request, pk):
 def codeudor_crear(request, cliente_pk):
     """Agregar co-deudor a un cliente"""
     
-    cliente = get_object_or_404(Cliente, pk=cliente_pk)
+    cliente = get_object_or_404(Cliente.del_prestamista, pk=cliente_pk)
     
     if request.method == 'POST':
         form = CoDeudorForm(request.POST)
@@ -240,35 +206,15 @@ def codeudor_crear(request, cliente_pk):
 # ============= PRÉSTAMOS =============
 
 @login_required
+@usar_replica
 def prestamo_lista(request):
     """Lista de préstamos con filtros"""
     
-    #try:
-    #    prestamista = request.user.profile.prestamista
-    #except:
-    #    prestamista = Prestamista.objects.first()
-    
-    #prestamos = Prestamo.objects.filter(prestamista=prestamista).select_related('cliente')
-    prestamos = Prestamo.objects.all()
-    
-    # Filtros
     estado = request.GET.get('estado', '')
-    if estado:
-        prestamos = prestamos.filter(estado=estado)
-    
     search = request.GET.get('search', '')
-    if search:
-        prestamos = prestamos.filter(
-            Q(codigo__icontains=search) |
-            Q(cliente__nombre__icontains=search) |
-            Q(cliente__apellido__icontains=search) |
-            Q(cliente__cedula__icontains=search)
-        )
-    
-    # Ordenar
     orden = request.GET.get('orden', '-fecha_prestamo')
-    prestamos = prestamos.order_by(orden)
-    print(f"prestamos: {prestamos}")
+    prestamos = consultas.prestamos(estado=estado, search=search, orden=orden)
+
     context = {
         'prestamos': prestamos,
         'estado': estado,
@@ -284,12 +230,12 @@ def prestamo_detalle(request, pk):
     """Detalle de un préstamo"""
     
     prestamo = get_object_or_404(
-        Prestamo.objects.select_related('cliente', 'prestamista', 'codeudor'),
+        Prestamo.del_prestamista.select_related('cliente', 'prestamista', 'codeudor'),
         pk=pk
     )
     
-    # Pagos del préstamo
-    pagos = prestamo.pagos.filter(anulado=False).order_by('-fecha_pago')
+    # Pagos del préstamo (de la tabla de archivo si está archivado)
+    pagos = archivo.pagos_de(prestamo).filter(anulado=False).order_by('-fecha_pago')
     
     # Calcular totales
     totales = {
@@ -302,12 +248,14 @@ def prestamo_detalle(request, pk):
         'prestamo': prestamo,
         'pagos': pagos,
         'totales': totales,
+        'historial': historial(prestamo, relacionados={Pago: archivo.pagos_de(prestamo).values('id')}),
     }
     
     return render(request, 'loans/prestamo_detalle.html', context)
 
 
 @login_required
+@prestamista_requerido
 def prestamo_crear(request):
     """Crear nuevo préstamo"""
     
@@ -315,37 +263,35 @@ def prestamo_crear(request):
         form = PrestamoForm(request.POST, request.FILES)
         if form.is_valid():
             prestamo = form.save(commit=False)
-            
-            # Asignar prestamista del usuario logueado
-            #try:
-            #    prestamo.prestamista = request.user.profile.prestamista
-            #except:
-            #    prestamo.prestamista = Prestamista.objects.first()
-            
+            prestamo.prestamista = request.prestamista
             prestamo.save()
+            _optimizar_letras(form, prestamo)
             messages.success(request, f'Préstamo {prestamo.codigo} creado exitosamente')
             return redirect('loans:prestamo_detalle', pk=prestamo.pk)
     else:
-        try:
-            prestamista = request.user.profile.prestamista
-            form = PrestamoForm(initial={'prestamista': prestamista})
-        except:
-            form = PrestamoForm()
+        form = PrestamoForm()
     
     context = {'form': form, 'titulo': 'Crear Préstamo'}
     return render(request, 'loans/prestamo_form.html', context)
 
 
+def _optimizar_letras(form, prestamo):
+    """Las fotos de la letra se reducen en segundo plano (tasks.cola)"""
+    if {'letra_foto', 'letra_foto_reverso'} & set(form.changed_data):
+        encolar(optimizar_letras, clave=f'letras:{prestamo.pk}', prestamo_id=prestamo.pk)
+
+
 @login_required
 def prestamo_editar(request, pk):
     """Editar préstamo existente"""
     
-    prestamo = get_object_or_404(Prestamo, pk=pk)
+    prestamo = get_object_or_404(Prestamo.del_prestamista, pk=pk)
     
     if request.method == 'POST':
         form = PrestamoForm(request.POST, request.FILES, instance=prestamo)
         if form.is_valid():
             prestamo = form.save()
+            _optimizar_letras(form, prestamo)
             messages.success(request, f'Préstamo {prestamo.codigo} actualizado')
             return redirect('loans:prestamo_detalle', pk=prestamo.pk)
     else:
@@ -362,29 +308,29 @@ def prestamo_simular(request):
     resultado = None
     
     if request.method == 'POST':
-        valor = Decimal(request.POST.get('valor', 0))
+        valor = dinero.redondear(Decimal(request.POST.get('valor', 0)))
         tasa = Decimal(request.POST.get('tasa', 4))
         plazo = int(request.POST.get('plazo', 12))
         
-        # Calcular cuotas
-        interes_mensual = valor * tasa / 100
-        cuota_capital = valor / plazo
+        # Calcular cuotas: interés redondeado una vez por mes (loans/dinero.py)
+        # y capital en cuotas iguales; la última absorbe el redondeo
+        interes_mensual = dinero.porcentaje(valor, tasa)
+        cuota_capital = dinero.redondear(Decimal(valor) / plazo)
         
         plan = []
         saldo = valor
         
         for mes in range(1, plazo + 1):
-            interes = saldo * tasa / 100
-            capital = cuota_capital
-            cuota_total = interes + capital
+            interes = dinero.porcentaje(saldo, tasa)
+            capital = min(cuota_capital, saldo) if mes < plazo else saldo
             saldo -= capital
             
             plan.append({
                 'mes': mes,
-                'cuota': round(cuota_total, 2),
-                'interes': round(interes, 2),
-                'capital': round(capital, 2),
-                'saldo': round(max(0, saldo), 2)
+                'cuota': interes + capital,
+                'interes': interes,
+                'capital': capital,
+                'saldo': saldo,
             })
         
         total_intereses = sum(p['interes'] for p in plan)
@@ -393,9 +339,9 @@ def prestamo_simular(request):
             'valor': valor,
             'tasa': tasa,
             'plazo': plazo,
-            'interes_mensual': round(interes_mensual, 2),
-            'total_intereses': round(total_intereses, 2),
-            'total_pagar': round(valor + total_intereses, 2),
+            'interes_mensual': interes_mensual,
+            'total_intereses': total_intereses,
+            'total_pagar': valor + total_intereses,
             'plan': plan
         }
     
@@ -403,40 +349,75 @@ def prestamo_simular(request):
     return render(request, 'loans/prestamo_simular.html', context)
 
 
+@login_required
+def cliente_autocompletar(request):
+    """Clientes activos que empiezan por ?q= (cédula, nombre o apellido), en JSON"""
+    
+    resultados = [
+        {'id': cliente.pk, 'texto': busqueda.etiqueta_cliente(cliente)}
+        for cliente in busqueda.buscar_clientes(request.GET.get('q'))
+    ]
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+def prestamo_autocompletar(request):
+    """Préstamos abiertos que empiezan por ?q= (código o cliente), en JSON"""
+    
+    resultados = [
+        {'id': prestamo.pk, 'texto': busqueda.etiqueta_prestamo(prestamo)}
+        for prestamo in busqueda.buscar_prestamos(request.GET.get('q'))
+    ]
+    return JsonResponse({'resultados': resultados})
+
+
+@login_required
+def prestamo_penalidad(request, pk):
+    """Cotización de la mora de un préstamo a una fecha (?fecha=AAAA-MM-DD)"""
+    
+    prestamo = get_object_or_404(Prestamo.del_prestamista, pk=pk)
+    fecha = timezone.now().date()
+    if request.GET.get('fecha'):
+        try:
+            fecha = datetime.strptime(request.GET['fecha'], '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'error': 'Fecha inválida, use AAAA-MM-DD'}, status=400)
+    
+    cotizacion = penalidades.cotizar(prestamo, fecha)
+    return JsonResponse({
+        'prestamo': prestamo.codigo,
+        'fecha': cotizacion['fecha'].isoformat(),
+        'dias_mora': cotizacion['dias_mora'],
+        'tasa_diaria': float(cotizacion['tasa_diaria']),
+        'cargado': float(cotizacion['cargado']),
+        'pendiente': float(cotizacion['pendiente']),
+        'por_cargar': float(cotizacion['por_cargar']),
+        'total': float(cotizacion['total']),
+    })
+
+
 # ============= REPORTES =============
 
 @login_required
-def reportes(request):
+@usar_replica
+async def reportes(request):
     """Página de reportes"""
     
-    try:
-        prestamista = request.user.profile.prestamista
-    except:
-        prestamista = Prestamista.objects.first()
+    # Resolverlo antes: Prestamo.del_prestamista lo lee de forma síncrona
+    await request.aprestamista()
     
     # Reporte por fechas
     fecha_desde = request.GET.get('fecha_desde', '')
     fecha_hasta = request.GET.get('fecha_hasta', '')
     
     if fecha_desde and fecha_hasta:
-        prestamos = Prestamo.objects.filter(
-            prestamista=prestamista,
-            fecha_prestamo__gte=fecha_desde,
-            fecha_prestamo__lte=fecha_hasta
-        )
+        prestamos = consultas.prestamos_por_fecha(fecha_desde, fecha_hasta)
         
-        reporte = {
-            'fecha_desde': fecha_desde,
-            'fecha_hasta': fecha_hasta,
-            'total_prestamos': prestamos.count(),
-            'monto_total': prestamos.aggregate(Sum('valor_inicial'))['valor_inicial__sum'] or 0,
-            'por_estado': {}
-        }
-        
-        for estado, _ in Prestamo.ESTADO_CHOICES:
-            count = prestamos.filter(estado=estado).count()
-            monto = prestamos.filter(estado=estado).aggregate(Sum('valor_inicial'))['valor_inicial__sum'] or 0
-            reporte['por_estado'][estado] = {'cantidad': count, 'monto': monto}
+        reporte, prestamos = await asyncio.gather(
+            panels.ejecutar(panels.resumen_prestamos, prestamos),
+            panels.ejecutar(panels.evaluar, prestamos),
+        )
+        reporte.update({'fecha_desde': fecha_desde, 'fecha_hasta': fecha_hasta})
     else:
         reporte = None
         prestamos = []
@@ -448,47 +429,98 @@ def reportes(request):
         'fecha_hasta': fecha_hasta,
     }
     
-    return render(request, 'loans/reportes.html', context)
+    return await sync_to_async(render)(request, 'loans/reportes.html', context)
 
 
 @login_required
+@usar_replica
 def prestamos_mora(request):
     """Lista de préstamos en mora"""
     
-    try:
-        prestamista = request.user.profile.prestamista
-    except:
-        prestamista = Prestamista.objects.first()
-    
-    prestamos = Prestamo.objects.filter(
-        prestamista=prestamista,
-        estado='MORA'
-    ).select_related('cliente').order_by('-fecha_vencimiento')
+    prestamos = consultas.prestamos_en_mora()
     
     context = {'prestamos': prestamos}
     return render(request, 'loans/prestamos_mora.html', context)
 
 
 @login_required
+@usar_replica
 def prestamos_vencer(request):
     """Préstamos próximos a vencer"""
     
-    try:
-        prestamista = request.user.profile.prestamista
-    except:
-        prestamista = Prestamista.objects.first()
-    
     dias = int(request.GET.get('dias', 7))
-    fecha_limite = timezone.now().date() + timedelta(days=dias)
-    
-    prestamos = Prestamo.objects.filter(
-        prestamista=prestamista,
-        fecha_vencimiento__lte=fecha_limite,
-        fecha_vencimiento__gte=timezone.now().date(),
-        estado='ACTIVO'
-    ).select_related('cliente').order_by('fecha_vencimiento')
+    prestamos = consultas.prestamos_por_vencer(timezone.now().date(), dias)
     
     context = {'prestamos': prestamos, 'dias': dias}
     return render(request, 'loans/prestamos_vencer.html', context)
 
+
+@login_required
+@prestamista_requerido
+def recordatorios_enviar(request):
+    """Encola los recordatorios de pago de hoy del prestamista"""
+    
+    if request.method == 'POST':
+        prestamista = request.prestamista
+        hoy = timezone.now().date()
+        encolar(
+            enviar_recordatorios_dia,
+            clave=f'recordatorios:{prestamista.pk}:{hoy.isoformat()}',
+            prestamista_id=prestamista.pk,
+        )
+        messages.success(request, 'Los recordatorios de hoy se están enviando')
+    return redirect('loans:prestamos_vencer')
+
+
+@login_required
+@prestamista_requerido
+@usar_replica
+def reporte_historico(request):
+    """Evolución mensual de la cartera, leída de las fotos de cierre de mes"""
+    
+    try:
+        meses = int(request.GET.get('meses', 0))
+    except ValueError:
+        meses = 0
+    cortes = fotos.historial(request.prestamista, meses=meses)
+    
+    # Préstamos en mora de un corte (?corte=AAAA-MM-DD)
+    corte = None
+    morosos = []
+    if request.GET.get('corte'):
+        try:
+            corte = datetime.strptime(request.GET['corte'], '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, 'Fecha de corte inválida')
+        else:
+            morosos = FotoCartera.objects.filter(
+                prestamista=request.prestamista, corte=corte, dias_mora__gt=0
+            ).select_related('prestamo__cliente').order_by('-dias_mora')[:100]
+    
+    context = {
+        'cortes': cortes,
+        'ultimo': cortes[-1] if cortes else None,
+        'corte': corte,
+        'morosos': morosos,
+    }
+    return render(request, 'loans/reporte_historico.html', context)
+
+
+@login_required
+@prestamista_requerido
+@usar_replica
+def pronostico_cobros(request):
+    """Cobros esperados por día o por semana en los próximos meses"""
+    
+    agrupacion = request.GET.get('agrupar', 'semana')
+    if agrupacion not in pronostico.AGRUPACIONES:
+        agrupacion = 'semana'
+    try:
+        dias = int(request.GET.get('dias', 0))
+    except ValueError:
+        dias = 0
+    
+    context = pronostico.pronostico(request.prestamista, agrupacion=agrupacion, dias=dias)
+    return render(request, 'loans/pronostico_cobros.html', context)
+
 # Create your views here.
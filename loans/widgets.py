@@ -0,0 +1,50 @@
+"""
+Widgets de formularios
+"""
+
+from django import forms
+from django.forms.utils import flatatt
+from django.urls import reverse
+from django.utils.html import format_html
+
+
+class AutocompletarWidget(forms.TextInput):
+    """
+    Reemplaza el <select> de un ModelChoiceField: una caja de texto que
+    consulta el endpoint `url` (nombre de la URL) mientras se escribe y un
+    campo oculto con el id elegido. No lista opciones: la etiqueta del valor
+    actual sale de una consulta por pk sobre el queryset del campo, que
+    también valida el envío con un solo ``get``.
+
+    El endpoint responde ``{"resultados": [{"id": ..., "texto": ...}]}``.
+    """
+
+    class Media:
+        js = ['js/autocompletar.js']
+
+    def __init__(self, url, etiqueta=str, attrs=None):
+        self.url = url
+        self.etiqueta = etiqueta
+        super().__init__(attrs)
+
+    def texto(self, value):
+        """Etiqueta del valor actual (una consulta por pk)"""
+        if value in (None, '') or not str(value).isdigit():
+            return ''
+        queryset = getattr(self.choices, 'queryset', None)
+        objeto = queryset.filter(pk=value).first() if queryset is not None else None
+        return self.etiqueta(objeto) if objeto else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        id_ = attrs.pop('id', f'id_{name}')
+        value = self.format_value(value) or ''
+        return format_html(
+            '<input type="hidden" name="{}" id="{}_valor" value="{}">'
+            '<input type="text" id="{}" list="{}_opciones" value="{}" autocomplete="off"'
+            ' data-autocompletar="{}" data-destino="{}_valor"{}>'
+            '<datalist id="{}_opciones"></datalist>',
+            name, id_, value,
+            id_, id_, self.texto(value), reverse(self.url), id_, flatatt(attrs),
+            id_,
+        )
@@ -0,0 +1,127 @@
+"""
+Archivo de préstamos cerrados.
+
+Los préstamos ``PAGADO`` / ``CANCELADO`` cerrados hace más de
+``AFTER_MONTHS`` meses pasan sus pagos y su plan a ``PagoArchivado`` y
+``PlanPagoArchivado`` (mismas columnas, mismos ids), y quedan marcados con
+``Prestamo.archivado_en``. Así ``Pago`` y ``PlanPago`` conservan solo la
+cartera de trabajo y sus índices no crecen con la historia.
+
+La fila del préstamo se queda en ``Prestamo``: la referencian el libro
+contable (solo de agregar), las fotos de cartera y la auditoría.
+
+Configuración en ``LOAN_SETTINGS['ARCHIVE']``::
+
+    'ARCHIVE': {
+        'AFTER_MONTHS': 12,  # meses desde el cierre
+        'BATCH_SIZE': 200,   # préstamos por transacción
+    }
+
+Lectura: ``pagos_de`` / ``plan_de`` devuelven la tabla que corresponde al
+préstamo; el detalle de un pago busca en el archivo si no está en ``Pago``
+y el estado de cuenta del cliente (loans/estado_cuenta.py) lee las dos.
+"""
+
+import calendar
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from loans.models import Prestamo
+from .models import ClaveIdempotencia, Pago, PagoArchivado, PlanPago, PlanPagoArchivado
+
+
+ESTADOS_CERRADOS = ['PAGADO', 'CANCELADO']
+
+
+def configuracion():
+    config = {'AFTER_MONTHS': 12, 'BATCH_SIZE': 200}
+    config.update(getattr(settings, 'LOAN_SETTINGS', {}).get('ARCHIVE', {}))
+    return config
+
+
+def restar_meses(fecha, meses):
+    total = fecha.year * 12 + fecha.month - 1 - meses
+    anio, mes = divmod(total, 12)
+    dia = min(fecha.day, calendar.monthrange(anio, mes + 1)[1])
+    return fecha.replace(year=anio, month=mes + 1, day=dia)
+
+
+def archivables(antes):
+    """Préstamos cerrados antes de `antes` que aún no se archivan"""
+    return Prestamo.objects.filter(
+        estado__in=ESTADOS_CERRADOS, archivado_en__isnull=True,
+    ).alias(
+        cerrado=Coalesce('fecha_pago_completo', 'updated_at'),
+    ).filter(cerrado__lt=antes)
+
+
+def _copiar(origen, destino, prestamo_ids):
+    """Copia las filas de los préstamos a la tabla de archivo (mismas columnas)"""
+    campos = [campo.attname for campo in destino._meta.concrete_fields]
+    filas = origen.objects.filter(prestamo_id__in=prestamo_ids).values(*campos)
+    return len(destino.objects.bulk_create(
+        [destino(**fila) for fila in filas.iterator(chunk_size=2000)], batch_size=500,
+    ))
+
+
+def _mover(origen, destino, prestamo_ids):
+    copiadas = _copiar(origen, destino, prestamo_ids)
+    # Sin señales: no es un borrado (auditoría, paneles del dashboard)
+    origen.objects.filter(prestamo_id__in=prestamo_ids)._raw_delete(router.db_for_write(origen))
+    return copiadas
+
+
+def archivar_lote(prestamo_ids, antes):
+    """
+    Archiva los préstamos del lote en una transacción. Vuelve a filtrar
+    dentro de ella: uno reabierto mientras tanto no se archiva.
+    Devuelve (préstamos, pagos, cuotas).
+    """
+    with transaction.atomic():
+        ids = list(archivables(antes).filter(pk__in=prestamo_ids).values_list('id', flat=True))
+        if not ids:
+            return 0, 0, 0
+        # Las claves de idempotencia solo sirven para reenvíos recientes
+        ClaveIdempotencia.objects.filter(pago__prestamo_id__in=ids).delete()
+        pagos = _mover(Pago, PagoArchivado, ids)
+        cuotas = _mover(PlanPago, PlanPagoArchivado, ids)
+        Prestamo.objects.filter(pk__in=ids).update(archivado_en=timezone.now())
+    return len(ids), pagos, cuotas
+
+
+def archivar(meses=None, lote=None, hoy=None, progreso=None):
+    """
+    Archiva todos los préstamos cerrados hace más de `meses`, de a `lote`
+    por transacción. Devuelve (préstamos, pagos, cuotas).
+    """
+    config = configuracion()
+    meses = config['AFTER_MONTHS'] if meses is None else meses
+    lote = lote or config['BATCH_SIZE']
+    hoy = hoy or timezone.now()
+    antes = restar_meses(hoy, meses)
+
+    pendientes = archivables(antes).order_by('id').values_list('id', flat=True)
+    totales = [0, 0, 0]
+    ids = list(pendientes[:lote])
+    while ids:
+        for i, cantidad in enumerate(archivar_lote(ids, antes)):
+            totales[i] += cantidad
+        if progreso:
+            progreso(ids[-1], *totales)
+        ids = list(pendientes.filter(id__gt=ids[-1])[:lote])
+    return tuple(totales)
+
+
+# ============= LECTURA =============
+
+def pagos_de(prestamo):
+    """Pagos del préstamo, de la tabla activa o del archivo"""
+    return prestamo.pagos_archivados.all() if prestamo.archivado_en else prestamo.pagos.all()
+
+
+def plan_de(prestamo):
+    """Plan de pagos del préstamo, de la tabla activa o del archivo"""
+    return prestamo.plan_pagos_archivados.all() if prestamo.archivado_en else prestamo.plan_pagos.all()
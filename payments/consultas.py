@@ -0,0 +1,40 @@
+"""
+Consultas de las vistas de payments sobre la cartera del prestamista en
+curso (managers ``del_prestamista``); ver loans/consultas.py.
+"""
+
+from django.db.models import Q
+
+from .models import Pago
+
+
+def pagos(search='', metodo='', fecha_desde='', fecha_hasta='', referencia=''):
+    """Lista de pagos vigentes (payments:pago_lista)"""
+    queryset = Pago.del_prestamista.select_related(
+        'prestamo', 'prestamo__cliente', 'created_by'
+    ).filter(anulado=False).order_by('-fecha_pago', '-created_at')
+    if search:
+        queryset = queryset.filter(
+            Q(recibo_numero__icontains=search) |
+            Q(prestamo__codigo__icontains=search) |
+            Q(prestamo__cliente__nombre__icontains=search) |
+            Q(prestamo__cliente__apellido__icontains=search)
+        )
+    if referencia:
+        # Exacta: índice pago_prest_referencia_idx
+        queryset = queryset.filter(referencia=referencia)
+    if metodo:
+        queryset = queryset.filter(metodo_pago=metodo)
+    if fecha_desde:
+        queryset = queryset.filter(fecha_pago__gte=fecha_desde)
+    if fecha_hasta:
+        queryset = queryset.filter(fecha_pago__lte=fecha_hasta)
+    return queryset
+
+
+def pagos_del_dia(fecha, orden='created_at'):
+    """Pagos vigentes de una fecha con su préstamo y cliente"""
+    return Pago.del_prestamista.filter(
+        fecha_pago=fecha,
+        anulado=False
+    ).select_related('prestamo', 'prestamo__cliente').order_by(orden)
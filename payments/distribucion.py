@@ -0,0 +1,135 @@
+"""
+Reparto de un pago entre mora, interés y capital, en ese orden.
+
+``aplicar`` reparte un pago nuevo dentro de la transacción que lo guarda
+(``Pago.save``), así todo pago pasa por aquí, venga de la vista rápida, del
+formulario o de ``Pago.objects.create``: bloquea el préstamo, consume
+primero las penalidades pendientes (loans/penalidades.py), luego el
+interés causado pendiente (loans/causacion.py) y valida el resto contra lo
+que de verdad se aplicó. Si el préstamo aún no tiene causado el periodo de
+la fecha del pago, se causa ahí mismo (``causacion.causar_prestamo``), así
+el pago de un préstamo recién desembolsado cubre su interés del mes. El capital se descuenta de ``saldo_actual`` con
+``F()`` en esa misma transacción, la del asiento del libro, así la cuenta
+CARTERA (loans/libro.py) y el saldo del préstamo no se separan; el préstamo
+que queda en cero pasa a PAGADO con su ``fecha_pago_completo``, desde la que
+cuenta el archivo (payments/archivo.py). Ese ``update()`` no emite señales:
+al confirmar se invalidan aquí los paneles del dashboard que dependen del
+préstamo (loans/panels.py). ``revertir`` lo deshace al anular o borrar
+el pago. ``cotizar`` es la vista previa para los formularios; no guarda nada.
+
+Reglas del resto (total menos mora):
+
+* Sin interés ni capital: interés causado pendiente primero, lo demás a capital.
+* Solo interés: el resto a capital.
+* Solo capital: el resto a interés.
+* Ambos: deben sumar el resto.
+
+El interés nunca supera el causado pendiente (el libro no cobra interés
+que no se causó) y el capital nunca supera el saldo del préstamo.
+"""
+
+from decimal import Decimal
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from loans import causacion, penalidades
+from loans.models import Prestamo
+
+
+CERO = Decimal('0')
+
+
+def repartir(valor_total, mora, interes_pendiente, saldo, valor_interes=CERO, valor_capital=CERO):
+    """(mora, interés, capital) del pago, con la mora ya aplicada"""
+    restante = valor_total - mora
+    if valor_interes and valor_capital:
+        if valor_interes + valor_capital != restante:
+            raise ValidationError(
+                f'La suma de interés (${valor_interes:,.0f}) y capital (${valor_capital:,.0f}) '
+                f'debe ser igual al total menos la mora (${restante:,.0f})'
+            )
+        interes = valor_interes
+    elif valor_interes:
+        interes = valor_interes
+    elif valor_capital:
+        interes = restante - valor_capital
+    else:
+        interes = min(interes_pendiente, restante)
+    if interes < 0 or interes > restante:
+        raise ValidationError(
+            f'El interés y el capital no caben en el total menos la mora (${restante:,.0f})'
+        )
+    if interes > interes_pendiente:
+        raise ValidationError(
+            f'El interés (${interes:,.0f}) excede el causado pendiente (${interes_pendiente:,.0f})'
+        )
+    capital = restante - interes
+    if capital > saldo:
+        raise ValidationError(
+            f'El pago de capital (${capital:,.0f}) excede el saldo (${saldo:,.0f})'
+        )
+    return mora, interes, capital
+
+
+def aplicar(pago):
+    """
+    Reparte y aplica un pago nuevo. Llamar dentro de la transacción que lo
+    guarda: un ValidationError la revierte con lo que ya se consumió.
+    """
+    prestamo = Prestamo.objects.select_for_update().get(pk=pago.prestamo_id)
+    causacion.causar_prestamo(prestamo, pago._meta.get_field('fecha_pago').to_python(pago.fecha_pago))
+    mora = penalidades.aplicar_pago(prestamo.pk, pago.valor_total)
+    pago.valor_mora, pago.valor_interes, pago.valor_capital = repartir(
+        pago.valor_total, mora, prestamo.interes_causado_pendiente, prestamo.saldo_actual,
+        pago.valor_interes, pago.valor_capital,
+    )
+    if pago.valor_interes:
+        causacion.aplicar_pago(prestamo.pk, pago.valor_interes)
+    if pago.valor_capital:
+        cambios = {'saldo_actual': F('saldo_actual') - pago.valor_capital}
+        if pago.valor_capital == prestamo.saldo_actual:
+            cambios.update(estado='PAGADO', fecha_pago_completo=timezone.now())
+        Prestamo.objects.filter(pk=prestamo.pk).update(**cambios)
+        _invalidar_paneles(prestamo.prestamista_id)
+
+
+def revertir(pago):
+    """
+    Devuelve a pendientes la mora y el interés que cubrió el pago y su
+    capital al saldo (al anularlo o borrarlo); reabre el préstamo PAGADO.
+    """
+    if pago.valor_mora:
+        penalidades.revertir_pago(pago.prestamo_id, pago.valor_mora)
+    if pago.valor_interes:
+        causacion.revertir_pago(pago.prestamo_id, pago.valor_interes)
+    if pago.valor_capital:
+        Prestamo.objects.filter(pk=pago.prestamo_id).update(
+            saldo_actual=F('saldo_actual') + pago.valor_capital,
+            estado=Case(When(estado='PAGADO', then=Value('ACTIVO')), default=F('estado')),
+            fecha_pago_completo=Case(
+                When(estado='PAGADO', then=Value(None)), default=F('fecha_pago_completo'),
+            ),
+        )
+        _invalidar_paneles(pago.prestamista_id)
+
+
+def _invalidar_paneles(prestamista_id):
+    """Saldo y estado del préstamo cambiaron sin post_save: paneles de su cartera, al confirmar"""
+    from loans.panels import invalidar_paneles
+    transaction.on_commit(partial(invalidar_paneles, 'prestamo', prestamista_id))
+
+
+def cotizar(prestamo, valor_total, valor_interes=CERO, valor_capital=CERO, fecha=None):
+    """Vista previa de ``aplicar`` (no guarda nada); ValidationError si no cabe"""
+    fecha = fecha or timezone.now().date()
+    pendiente = penalidades.cotizar(prestamo, fecha)['pendiente']
+    por_causar = causacion.por_causar(prestamo, fecha)
+    interes_pendiente = prestamo.interes_causado_pendiente + (por_causar.valor if por_causar else CERO)
+    return repartir(
+        valor_total, min(pendiente, valor_total), interes_pendiente, prestamo.saldo_actual,
+        valor_interes or CERO, valor_capital or CERO,
+    )
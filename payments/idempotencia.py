@@ -0,0 +1,81 @@
+"""
+Idempotencia de los formularios de pago.
+
+Cada formulario de pago lleva una clave nueva (``nueva_clave``) en el campo
+oculto ``clave_idempotencia``. Un reenvío de ese mismo formulario (doble
+clic, reintento del navegador) trae la misma clave:
+
+* ``buscar`` lo resuelve antes de hacer nada, con una consulta por el
+  índice único de la clave, y devuelve el pago original.
+* Si dos envíos llegan a la vez, ``reclamar`` inserta la clave como primer
+  paso de la transacción del pago; la restricción única hace fallar al
+  segundo ahí (``ClaveUsada``), antes de tocar el préstamo.
+
+Las claves se conservan ``LOAN_SETTINGS['IDEMPOTENCY_TTL']`` segundos y
+``purgar`` (tarea programada en payments/tareas.py) borra las más viejas.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ClaveIdempotencia
+
+
+CAMPO = 'clave_idempotencia'
+
+
+class ClaveUsada(Exception):
+    """Otra petición ya registró (o está registrando) el pago de esta clave"""
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'LOAN_SETTINGS', {}).get('IDEMPOTENCY_TTL', 24 * 3600))
+
+
+def nueva_clave():
+    return uuid.uuid4().hex
+
+
+def clave_de(request):
+    """Clave enviada con el formulario, o None si no trae"""
+    return request.POST.get(CAMPO, '').strip()[:64] or None
+
+
+def buscar(clave):
+    """``{'pago_id', 'recibo_numero'}`` del pago registrado con `clave`, o None"""
+    if not clave:
+        return None
+    return ClaveIdempotencia.objects.filter(clave=clave).values(
+        'pago_id', recibo_numero=F('pago__recibo_numero'),
+    ).first()
+
+
+def reclamar(clave, usuario):
+    """
+    Inserta la clave. Llamar al inicio de la transacción del pago: si ya
+    existe lanza ``ClaveUsada`` y la transacción se revierte entera.
+    """
+    if not clave:
+        return None
+    try:
+        return ClaveIdempotencia.objects.create(clave=clave, usuario=usuario)
+    except IntegrityError as e:
+        raise ClaveUsada(clave) from e
+
+
+def asociar(registro, pago):
+    """Apunta la clave reclamada al pago que se registró con ella"""
+    if registro is not None:
+        registro.pago = pago
+        registro.save(update_fields=['pago'])
+
+
+def purgar(antes=None):
+    """Borra las claves creadas antes de `antes` (por defecto, hace un TTL)"""
+    antes = antes or timezone.now() - ttl()
+    return ClaveIdempotencia.objects.filter(created_at__lt=antes).delete()[0]
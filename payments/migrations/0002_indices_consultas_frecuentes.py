@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_indices_consultas_frecuentes'),
+        ('payments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pago',
+            name='payments_pa_fecha_p_340cfb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha_pago', 'anulado', 'metodo_pago'], name='pago_fecha_anulado_metodo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['referencia'], name='pago_referencia_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:37
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pago',
+            name='valor_mora',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Valor destinado a penalidades por mora (se cobran primero)', max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0'))]),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_prestamista(apps, schema_editor):
+    """Copia en cada pago el prestamista de su préstamo"""
+    Pago = apps.get_model('payments', 'Pago')
+    Prestamo = apps.get_model('loans', 'Prestamo')
+    Pago.objects.update(prestamista=Subquery(
+        Prestamo.objects.filter(pk=OuterRef('prestamo_id')).values('prestamista')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0010_cartera_por_prestamista'),
+        ('payments', '0004_claves_idempotencia'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pago',
+            name='payments_pa_created_d5e6c4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pago',
+            name='pago_fecha_anulado_metodo_idx',
+        ),
+        migrations.AddField(
+            model_name='pago',
+            name='prestamista',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='pagos', to='users.prestamista'),
+        ),
+        migrations.RunPython(copiar_prestamista, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pago',
+            name='prestamista',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='pagos', to='users.prestamista'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['prestamista', 'fecha_pago', 'anulado', 'metodo_pago'], name='pago_prest_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['prestamista', '-fecha_pago', '-created_at'], name='pago_prest_lista_idx'),
+        ),
+    ]
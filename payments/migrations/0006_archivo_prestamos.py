@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0011_archivo_prestamos'),
+        ('payments', '0005_cartera_por_prestamista'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PagoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('recibo_numero', models.CharField(max_length=20, unique=True)),
+                ('valor_total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_interes', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_capital', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_mora', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('tipo', models.CharField(choices=[('INTERES', 'Solo Interés'), ('CAPITAL', 'Solo Capital'), ('MIXTO', 'Interés + Capital'), ('COMPLETO', 'Pago Completo')], max_length=10)),
+                ('metodo_pago', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TRANSFERENCIA', 'Transferencia'), ('CONSIGNACION', 'Consignación'), ('CHEQUE', 'Cheque'), ('OTRO', 'Otro')], max_length=15)),
+                ('fecha_pago', models.DateField()),
+                ('referencia', models.CharField(blank=True, max_length=100)),
+                ('observaciones', models.TextField(blank=True)),
+                ('comprobante', models.FileField(blank=True, null=True, upload_to='pagos/comprobantes/')),
+                ('recibo_impreso', models.BooleanField(default=False)),
+                ('anulado', models.BooleanField(default=False)),
+                ('fecha_anulacion', models.DateTimeField(blank=True, null=True)),
+                ('motivo_anulacion', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('prestamista', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='users.prestamista')),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pagos_archivados', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Pago archivado',
+                'verbose_name_plural': 'Pagos archivados',
+                'ordering': ['-fecha_pago', '-created_at'],
+                'indexes': [models.Index(fields=['prestamo', 'anulado'], name='pago_arch_prestamo_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanPagoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('numero_cuota', models.PositiveIntegerField()),
+                ('fecha_vencimiento', models.DateField()),
+                ('valor_cuota', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_interes', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('valor_capital', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('saldo_pendiente', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('pagado', models.BooleanField(default=False)),
+                ('fecha_pago', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('prestamo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='plan_pagos_archivados', to='loans.prestamo')),
+            ],
+            options={
+                'verbose_name': 'Plan de Pago archivado',
+                'verbose_name_plural': 'Planes de Pago archivados',
+                'ordering': ['prestamo', 'numero_cuota'],
+                'unique_together': {('prestamo', 'numero_cuota')},
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:20
+
+import django.core.validators
+import loans.dinero
+from decimal import Decimal
+from django.db import migrations
+from django.db.models.functions import Round
+
+
+# Montos que pasan a DineroField (loans/dinero.py)
+MONTOS = {
+    'pago': ['valor_capital', 'valor_interes', 'valor_mora', 'valor_total'],
+    'pagoarchivado': ['valor_capital', 'valor_interes', 'valor_mora', 'valor_total'],
+    'planpago': ['saldo_pendiente', 'valor_capital', 'valor_cuota', 'valor_interes'],
+    'planpagoarchivado': ['saldo_pendiente', 'valor_capital', 'valor_cuota', 'valor_interes'],
+}
+
+
+def redondear_a_pesos(apps, schema_editor):
+    """En modo pesos enteros, redondea los montos (mitad hacia arriba) antes de pasar las columnas a BIGINT"""
+    if not loans.dinero.pesos_enteros():
+        return
+    for modelo, campos in MONTOS.items():
+        apps.get_model('payments', modelo)._base_manager.update(
+            **{campo: Round(campo) for campo in campos}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_archivo_prestamos'),
+    ]
+
+    operations = [
+        migrations.RunPython(redondear_a_pesos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pago',
+            name='valor_capital',
+            field=loans.dinero.DineroField(decimal_places=2, default=Decimal('0'), help_text='Valor destinado a capital', max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0'))]),
+        ),
+        migrations.AlterField(
+            model_name='pago',
+            name='valor_interes',
+            field=loans.dinero.DineroField(decimal_places=2, default=Decimal('0'), help_text='Valor destinado a intereses', max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0'))]),
+        ),
+        migrations.AlterField(
+            model_name='pago',
+            name='valor_mora',
+            field=loans.dinero.DineroField(decimal_places=2, default=Decimal('0'), help_text='Valor destinado a penalidades por mora (se cobran primero)', max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0'))]),
+        ),
+        migrations.AlterField(
+            model_name='pago',
+            name='valor_total',
+            field=loans.dinero.DineroField(decimal_places=2, help_text='Valor total del pago', max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))]),
+        ),
+        migrations.AlterField(
+            model_name='pagoarchivado',
+            name='valor_capital',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pagoarchivado',
+            name='valor_interes',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pagoarchivado',
+            name='valor_mora',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='pagoarchivado',
+            name='valor_total',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpago',
+            name='saldo_pendiente',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpago',
+            name='valor_capital',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpago',
+            name='valor_cuota',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpago',
+            name='valor_interes',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpagoarchivado',
+            name='saldo_pendiente',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpagoarchivado',
+            name='valor_capital',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpagoarchivado',
+            name='valor_cuota',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='planpagoarchivado',
+            name='valor_interes',
+            field=loans.dinero.DineroField(decimal_places=2, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_dinero'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pago',
+            name='pago_referencia_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['prestamista', 'referencia'], name='pago_prest_referencia_idx'),
+        ),
+    ]
@@ -2,14 +2,20 @@
 Modelos para el sistema de pagos
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from decimal import Decimal
-from loans.models import Prestamo
+from audit.models import AuditableMixin
+from loans import libro
+from loans.dinero import DineroField
+from loans.models import Cliente, Prestamo
+from . import distribucion
+from users.models import Prestamista
+from users.tenencia import DelPrestamistaManager
 
 
-class Pago(models.Model):
+class Pago(AuditableMixin, models.Model):
     """Registro de pago realizado a un préstamo"""
     
     TIPO_PAGO_CHOICES = [
@@ -41,28 +47,35 @@ class Pago(models.Model):
         on_delete=models.PROTECT,
         related_name='pagos'
     )
+    # Copia de prestamo.prestamista para filtrar y ordenar por cartera
+    # sin JOIN (users/tenencia.py); se asigna al crear el pago
+    prestamista = models.ForeignKey(
+        Prestamista,
+        on_delete=models.PROTECT,
+        related_name='pagos',
+        editable=False
+    )
     
     # Montos
-    valor_total = models.DecimalField(
-        max_digits=12,
-        decimal_places=2,
+    valor_total = DineroField(
         validators=[MinValueValidator(Decimal('0.01'))],
         help_text="Valor total del pago"
     )
-    valor_interes = models.DecimalField(
-        max_digits=12,
-        decimal_places=2,
+    valor_interes = DineroField(
         default=Decimal('0'),
         validators=[MinValueValidator(Decimal('0'))],
         help_text="Valor destinado a intereses"
     )
-    valor_capital = models.DecimalField(
-        max_digits=12,
-        decimal_places=2,
+    valor_capital = DineroField(
         default=Decimal('0'),
         validators=[MinValueValidator(Decimal('0'))],
         help_text="Valor destinado a capital"
     )
+    valor_mora = DineroField(
+        default=Decimal('0'),
+        validators=[MinValueValidator(Decimal('0'))],
+        help_text="Valor destinado a penalidades por mora (se cobran primero)"
+    )
     
     # Información del pago
     tipo = models.CharField(
@@ -107,15 +120,23 @@ class Pago(models.Model):
         related_name='pagos_registrados'
     )
     
+    objects = models.Manager()
+    del_prestamista = DelPrestamistaManager()
+    
+    # Los de préstamos archivados son PagoArchivado (solo lectura)
+    archivado = False
+    
     class Meta:
         verbose_name = "Pago"
         verbose_name_plural = "Pagos"
         ordering = ['-fecha_pago', '-created_at']
         indexes = [
             models.Index(fields=['recibo_numero']),
-            models.Index(fields=['fecha_pago']),
-            models.Index(fields=['-created_at']),
+            # Cartera de un prestamista: pagos del día / por rango y la lista
+            models.Index(fields=['prestamista', 'fecha_pago', 'anulado', 'metodo_pago'], name='pago_prest_fecha_idx'),
+            models.Index(fields=['prestamista', '-fecha_pago', '-created_at'], name='pago_prest_lista_idx'),
             models.Index(fields=['prestamo', 'anulado']),
+            models.Index(fields=['prestamista', 'referencia'], name='pago_prest_referencia_idx'),
         ]
     
     def __str__(self):
@@ -125,41 +146,57 @@ class Pago(models.Model):
         # Generar número de recibo si es nuevo
         if not self.recibo_numero:
             self.recibo_numero = self.generar_recibo()
+        if self.prestamista_id is None:
+            self.prestamista_id = self.prestamo.prestamista_id
+        
+        is_new = self._state.adding
         
-        # Validar que la suma de interés y capital no exceda el total
-        if self.valor_interes + self.valor_capital != self.valor_total:
-            # Auto-ajustar si no están definidos
-            if self.valor_interes == 0 and self.valor_capital == 0:
-                # Por defecto, todo va a capital si no se especifica
-                self.valor_capital = self.valor_total
+        with transaction.atomic():
+            if is_new and not self.anulado:
+                # Mora, interés y capital según lo que de verdad se aplica
+                distribucion.aplicar(self)
+            
+            # Determinar tipo de pago automáticamente
+            if self.valor_interes > 0 and self.valor_capital > 0:
+                self.tipo = 'MIXTO'
             elif self.valor_interes > 0 and self.valor_capital == 0:
-                self.valor_capital = self.valor_total - self.valor_interes
+                self.tipo = 'INTERES'
             elif self.valor_capital > 0 and self.valor_interes == 0:
-                self.valor_interes = self.valor_total - self.valor_capital
-        
-        # Determinar tipo de pago automáticamente
-        if self.valor_interes > 0 and self.valor_capital > 0:
-            self.tipo = 'MIXTO'
-        elif self.valor_interes > 0 and self.valor_capital == 0:
-            self.tipo = 'INTERES'
-        elif self.valor_capital > 0 and self.valor_interes == 0:
-            self.tipo = 'CAPITAL'
-        
-        #is_new = not self.pk
-        
-        super().save(*args, **kwargs)
+                self.tipo = 'CAPITAL'
+            
+            super().save(*args, **kwargs)
+            if is_new and not self.anulado:
+                libro.registrar(*libro.pago(self))
+            self.actualizar_resumen_cliente()
         
         # Aplicar el pago al préstamo (solo si no está anulado y es nuevo)
         #if is_new and not self.anulado:
         #    self.prestamo.aplicar_pago(self.valor_interes, self.valor_capital)
     
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self.anulado:
+                distribucion.revertir(self)
+                # El libro no se borra: queda el pago y su reverso
+                libro.registrar(*libro.reverso_pago(self))
+            resultado = super().delete(*args, **kwargs)
+            self.actualizar_resumen_cliente()
+        return resultado
+    
+    def actualizar_resumen_cliente(self):
+        """Último pago (y deuda) del cliente del préstamo"""
+        Cliente.objects.filter(prestamos=self.prestamo_id).actualizar_resumen()
+    
     def generar_recibo(self):
         """Genera un número único de recibo"""
         from django.conf import settings
         prefix = getattr(settings, 'LOAN_SETTINGS', {}).get('RECEIPT_PREFIX', 'REC')
         
-        # Obtener el último recibo
-        ultimo_pago = Pago.objects.all().order_by('-id').first()
+        # Obtener el último recibo (si se archivaron todos, el del archivo)
+        ultimo_pago = (
+            Pago.objects.all().order_by('-id').first()
+            or PagoArchivado.objects.all().order_by('-id').first()
+        )
         if ultimo_pago and ultimo_pago.recibo_numero:
             try:
                 ultimo_num = int(ultimo_pago.recibo_numero.replace(prefix, ''))
@@ -179,11 +216,13 @@ class Pago(models.Model):
         self.anulado = True
         self.fecha_anulacion = timezone.now()
         self.motivo_anulacion = motivo
-        self.save()
-        
-        # Revertir el pago en el préstamo
-        self.prestamo.saldo_actual += self.valor_capital
-        self.prestamo.actualizar_estado()
+        with transaction.atomic():
+            # Lo que cubría el pago (mora, interés, capital) vuelve al préstamo
+            # antes de guardar, que actualiza la deuda del cliente
+            distribucion.revertir(self)
+            self.save()
+            # Revertir el pago en el libro del préstamo
+            libro.registrar(*libro.reverso_pago(self))
         
         return True
     
@@ -204,10 +243,10 @@ class PlanPago(models.Model):
     numero_cuota = models.PositiveIntegerField()
     fecha_vencimiento = models.DateField()
     
-    valor_cuota = models.DecimalField(max_digits=12, decimal_places=2)
-    valor_interes = models.DecimalField(max_digits=12, decimal_places=2)
-    valor_capital = models.DecimalField(max_digits=12, decimal_places=2)
-    saldo_pendiente = models.DecimalField(max_digits=12, decimal_places=2)
+    valor_cuota = DineroField()
+    valor_interes = DineroField()
+    valor_capital = DineroField()
+    saldo_pendiente = DineroField()
     
     pagado = models.BooleanField(default=False)
     fecha_pago = models.DateField(null=True, blank=True)
@@ -229,3 +268,101 @@ class PlanPago(models.Model):
         if not self.pagado:
             return timezone.now().date() > self.fecha_vencimiento
         return False
+
+
+# ============= ARCHIVO =============
+# Pagos y plan de los préstamos cerrados hace tiempo (ver payments/archivo.py).
+# Mismas columnas y mismos ids que Pago y PlanPago: se copian tal cual.
+
+class PagoArchivado(models.Model):
+    """Pago de un préstamo archivado (solo lectura)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    recibo_numero = models.CharField(max_length=20, unique=True)
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.PROTECT, related_name='pagos_archivados')
+    prestamista = models.ForeignKey(Prestamista, on_delete=models.PROTECT, related_name='+')
+    
+    valor_total = DineroField()
+    valor_interes = DineroField()
+    valor_capital = DineroField()
+    valor_mora = DineroField()
+    tipo = models.CharField(max_length=10, choices=Pago.TIPO_PAGO_CHOICES)
+    metodo_pago = models.CharField(max_length=15, choices=Pago.METODO_PAGO_CHOICES)
+    fecha_pago = models.DateField()
+    referencia = models.CharField(max_length=100, blank=True)
+    observaciones = models.TextField(blank=True)
+    comprobante = models.FileField(upload_to='pagos/comprobantes/', blank=True, null=True)
+    
+    recibo_impreso = models.BooleanField(default=False)
+    anulado = models.BooleanField(default=False)
+    fecha_anulacion = models.DateTimeField(null=True, blank=True)
+    motivo_anulacion = models.TextField(blank=True)
+    
+    # Sin auto_now: conservan las fechas del pago original
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, related_name='+')
+    
+    objects = models.Manager()
+    del_prestamista = DelPrestamistaManager()
+    
+    archivado = True
+    
+    class Meta:
+        verbose_name = "Pago archivado"
+        verbose_name_plural = "Pagos archivados"
+        ordering = ['-fecha_pago', '-created_at']
+        indexes = [
+            models.Index(fields=['prestamo', 'anulado'], name='pago_arch_prestamo_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recibo_numero} - {self.prestamo.codigo} - ${self.valor_total}"
+
+
+class PlanPagoArchivado(models.Model):
+    """Cuota del plan de un préstamo archivado (solo lectura)"""
+    
+    id = models.BigIntegerField(primary_key=True)
+    prestamo = models.ForeignKey(Prestamo, on_delete=models.PROTECT, related_name='plan_pagos_archivados')
+    numero_cuota = models.PositiveIntegerField()
+    fecha_vencimiento = models.DateField()
+    
+    valor_cuota = DineroField()
+    valor_interes = DineroField()
+    valor_capital = DineroField()
+    saldo_pendiente = DineroField()
+    
+    pagado = models.BooleanField(default=False)
+    fecha_pago = models.DateField(null=True, blank=True)
+    
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Plan de Pago archivado"
+        verbose_name_plural = "Planes de Pago archivados"
+        ordering = ['prestamo', 'numero_cuota']
+        unique_together = ['prestamo', 'numero_cuota']
+    
+    def __str__(self):
+        return f"{self.prestamo.codigo} - Cuota {self.numero_cuota}"
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Clave de un solo uso de los formularios de pago (payments/idempotencia.py).
+    Se inserta en la misma transacción que el pago: un reenvío con la misma
+    clave encuentra el pago original en vez de registrar otro.
+    """
+    
+    clave = models.CharField(max_length=64, unique=True)
+    pago = models.ForeignKey(Pago, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    usuario = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+    
+    def __str__(self):
+        return self.clave
@@ -0,0 +1,18 @@
+"""
+Tareas de pagos para la cola (tasks/cola.py)
+"""
+
+from tasks.cola import tarea
+from . import archivo, idempotencia
+
+
+@tarea
+def purgar_claves_idempotencia():
+    """Borra las claves de idempotencia vencidas"""
+    idempotencia.purgar()
+
+
+@tarea
+def archivar_prestamos_mes():
+    """Archiva los préstamos cerrados hace más de LOAN_SETTINGS['ARCHIVE']['AFTER_MONTHS'] meses"""
+    archivo.archivar()
@@ -1,3 +1,247 @@
+import uuid
+from datetime import date, timedelta
+
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from loans import causacion, libro, penalidades
+from loans.models import Cliente
+from payments import archivo, idempotencia
+from payments.models import ClaveIdempotencia, Pago, PagoArchivado
+from prestamosjl.perf import RoutePerformanceMixin
+from prestamosjl.pruebas import crear_cliente, crear_pago, crear_prestamista, crear_prestamo, crear_usuario
+
+
+class PaymentsRoutesPerformanceTest(RoutePerformanceMixin, TestCase):
+    """Presupuesto de consultas para todas las rutas de payments.urls"""
+
+    urls_module = 'payments.urls'
+    namespace = 'payments'
+    routes = {
+        'payments:pago_lista': ('GET', None, None),
+        'payments:pago_crear': ('GET', None, None),
+        'payments:pago_detalle': ('GET', lambda t: {'pk': t.pago.pk}, None),
+        'payments:pago_anular': ('GET', lambda t: {'pk': t.pago.pk}, None),
+        'payments:pago_rapido': ('GET', None, None),
+        'payments:pago_rapido[POST]': ('POST', None, lambda t: {
+            'prestamo_id': t.prestamo.pk, 'valor_total': '1000', 'metodo_pago': 'EFECTIVO',
+            'clave_idempotencia': uuid.uuid4().hex,
+        }),
+        'payments:reporte_diario': ('GET', None, None),
+    }
+
+
+class DistribucionTest(TestCase):
+    """Todo pago cubre primero la mora, luego el interés y el resto va a capital"""
+
+    def setUp(self):
+        self.prestamo = crear_prestamo(
+            crear_cliente(crear_prestamista()), valor=1000000,
+            fecha_prestamo=date(2024, 12, 1), fecha_vencimiento=date(2025, 1, 1),
+        )
+        # Dos cargos de mora de 10.000 y dos meses de interés causado de 50.000 (5 %)
+        penalidades.calcular_penalidades(date(2025, 1, 14))
+        penalidades.calcular_penalidades(date(2025, 1, 24))
+        causacion.causar_intereses(date(2024, 12, 1))
+        causacion.causar_intereses(date(2025, 1, 1))
+
+    def pagar(self, valor, **kwargs):
+        # En enero, periodo ya causado: el pago no causa uno nuevo
+        return crear_pago(self.prestamo, valor, fecha_pago=date(2025, 1, 25), **kwargs)
+
+    def pendientes(self):
+        return [p.pendiente for p in self.prestamo.penalidades.order_by('hasta')]
+
+    def intereses_pendientes(self):
+        return [c.valor - c.valor_pagado for c in self.prestamo.causaciones.order_by('periodo')]
+
+    def test_mora_primero_de_la_mas_antigua(self):
+        pago = self.pagar(15000)
+        self.assertEqual((pago.valor_mora, pago.valor_interes, pago.valor_capital), (15000, 0, 0))
+        self.assertEqual(self.pendientes(), [0, 5000])
+
+    def test_reparto_completo(self):
+        pago = self.pagar(150000)
+        # Mora 20.000, interés causado 100.000, capital el resto
+        self.assertEqual((pago.valor_mora, pago.valor_interes, pago.valor_capital), (20000, 100000, 30000))
+        self.assertEqual(pago.tipo, 'MIXTO')
+        self.assertEqual(self.intereses_pendientes(), [0, 0])
+
+    def test_interes_del_periodo_mas_antiguo(self):
+        self.pagar(80000)
+        self.assertEqual(self.intereses_pendientes(), [0, 40000])
+
+    def test_interes_no_supera_el_causado(self):
+        with self.assertRaises(ValidationError):
+            self.pagar(200000, valor_interes=120000)
+        self.assertEqual(self.intereses_pendientes(), [50000, 50000])
+
+    def test_interes_indicado(self):
+        pago = self.pagar(100000, valor_interes=10000)
+        self.assertEqual((pago.valor_mora, pago.valor_interes, pago.valor_capital), (20000, 10000, 70000))
+
+    def test_interes_y_capital_deben_sumar_el_total_menos_la_mora(self):
+        with self.assertRaises(ValidationError):
+            self.pagar(100000, valor_interes=50000, valor_capital=50000)
+        self.assertEqual(self.pendientes(), [10000, 10000])
+
+    def test_capital_mayor_al_saldo_no_aplica_nada(self):
+        with self.assertRaises(ValidationError):
+            self.pagar(2000000)
+        self.assertEqual(self.pendientes(), [10000, 10000])
+        self.assertFalse(Pago.objects.exists())
+
+    def test_anular_devuelve_la_mora_y_el_interes(self):
+        pago = self.pagar(80000)
+        pago.anular('Prueba')
+        self.assertEqual(self.pendientes(), [10000, 10000])
+        self.assertEqual(self.intereses_pendientes(), [50000, 50000])
+
+    def test_borrar_devuelve_la_mora(self):
+        self.pagar(15000).delete()
+        self.assertEqual(self.pendientes(), [10000, 10000])
+
+    def test_vistas_reparten_igual(self):
+        self.client.force_login(crear_usuario('cajero', self.prestamo.prestamista))
+        self.client.post(reverse('payments:pago_crear'), {
+            'prestamo': self.prestamo.pk, 'valor_total': '15000', 'valor_interes': '0', 'valor_capital': '0',
+            'metodo_pago': 'EFECTIVO', 'fecha_pago': '2025-01-25', 'clave_idempotencia': uuid.uuid4().hex,
+        })
+        self.client.post(reverse('payments:pago_rapido'), {
+            'prestamo_id': self.prestamo.pk, 'valor_total': '5000', 'metodo_pago': 'EFECTIVO',
+            'clave_idempotencia': uuid.uuid4().hex,
+        })
+        self.assertEqual(list(Pago.objects.order_by('id').values_list('valor_mora', flat=True)), [15000, 5000])
+        self.assertEqual(self.pendientes(), [0, 0])
+
+
+class SaldoPrestamoTest(TestCase):
+    """saldo_actual y la cuenta CARTERA del libro se mueven juntos"""
+
+    def setUp(self):
+        self.prestamo = crear_prestamo(crear_cliente(crear_prestamista()), valor=1000000)
+
+    def assertSaldo(self, esperado, estado='ACTIVO'):
+        self.prestamo.refresh_from_db()
+        self.assertEqual(self.prestamo.saldo_actual, esperado)
+        self.assertEqual(libro.saldo(self.prestamo.pk, 'CARTERA'), esperado)
+        self.assertEqual(self.prestamo.estado, estado)
+        self.assertEqual(Cliente.objects.get().deuda_total, esperado)
+
+    def test_pago_y_anulacion(self):
+        pago = crear_pago(self.prestamo, 300000, valor_capital=300000)
+        self.assertSaldo(700000)
+        pago.anular('Prueba')
+        self.assertSaldo(1000000)
+
+    def test_pago_total_cierra_y_anular_reabre(self):
+        pago = crear_pago(self.prestamo, 1000000, valor_capital=1000000)
+        self.assertSaldo(0, 'PAGADO')
+        self.assertIsNotNone(self.prestamo.fecha_pago_completo)
+        pago.anular('Prueba')
+        self.assertSaldo(1000000)
+        self.assertIsNone(self.prestamo.fecha_pago_completo)
+
+    def test_borrar_devuelve_el_capital(self):
+        crear_pago(self.prestamo, 400000, valor_capital=400000).delete()
+        self.assertSaldo(1000000)
+
+    def test_capital_mayor_al_saldo(self):
+        with self.assertRaises(ValidationError):
+            crear_pago(self.prestamo, 1000001, valor_capital=1000001)
+        self.assertSaldo(1000000)
+
+
+class ArchivoTest(TestCase):
+    """Los préstamos cerrados pasan sus pagos al archivo desde su fecha de pago completo"""
+
+    def setUp(self):
+        self.prestamo = crear_prestamo(crear_cliente(crear_prestamista()), valor=1000000)
+        crear_pago(self.prestamo, 400000, valor_capital=400000)
+        crear_pago(self.prestamo, 600000, valor_capital=600000)
+        self.prestamo.refresh_from_db()
+
+    def test_no_archiva_lo_recien_cerrado(self):
+        self.assertEqual(archivo.archivar(meses=12), (0, 0, 0))
+
+    def test_ida_y_lectura(self):
+        pagos = list(Pago.objects.order_by('id').values_list('id', 'recibo_numero', 'valor_capital'))
+        en_un_anio = self.prestamo.fecha_pago_completo + timedelta(days=400)
+        self.assertEqual(archivo.archivar(meses=12, hoy=en_un_anio), (1, 2, 0))
+
+        self.prestamo.refresh_from_db()
+        self.assertIsNotNone(self.prestamo.archivado_en)
+        self.assertFalse(Pago.objects.exists())
+        self.assertEqual(
+            list(archivo.pagos_de(self.prestamo).order_by('id').values_list('id', 'recibo_numero', 'valor_capital')),
+            pagos,
+        )
+        # Los recibos siguen la numeración del archivo
+        siguiente = crear_pago(crear_prestamo(self.prestamo.cliente), 1000)
+        self.assertGreater(siguiente.recibo_numero, pagos[-1][1])
+        # Archivar otra vez no mueve nada
+        self.assertEqual(archivo.archivar(meses=12, hoy=en_un_anio), (0, 0, 0))
+        self.assertEqual(PagoArchivado.objects.count(), 2)
+
+    def test_reabierto_no_se_archiva(self):
+        Pago.objects.order_by('id').last().anular('Prueba')
+        self.assertEqual(archivo.archivar(meses=12, hoy=timezone.now() + timedelta(days=400)), (0, 0, 0))
+
+
+class IdempotenciaTest(TestCase):
+    """Un reenvío del mismo formulario de pago no registra otro pago"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamo = crear_prestamo(crear_cliente(crear_prestamista()), valor=1000000)
+        cls.usuario = crear_usuario('cajero', cls.prestamo.prestamista)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.clave = uuid.uuid4().hex
+
+    def pago_rapido(self, valor='100000'):
+        return self.client.post(reverse('payments:pago_rapido'), {
+            'prestamo_id': self.prestamo.pk, 'valor_total': valor, 'metodo_pago': 'EFECTIVO',
+            'clave_idempotencia': self.clave,
+        })
+
+    def test_doble_envio_un_pago(self):
+        self.pago_rapido()
+        respuesta = self.pago_rapido()
+        pago = Pago.objects.get()
+        self.assertEqual(ClaveIdempotencia.objects.get(clave=self.clave).pago, pago)
+        self.assertRedirects(respuesta, reverse('payments:pago_rapido'))
+        self.prestamo.refresh_from_db()
+        # 50.000 al interés del mes, causado al pagar; el resto a capital
+        self.assertEqual(self.prestamo.saldo_actual, 950000)
+
+    def test_doble_envio_formulario_completo(self):
+        datos = {
+            'prestamo': self.prestamo.pk, 'valor_total': '100000', 'valor_interes': '0', 'valor_capital': '0',
+            'metodo_pago': 'EFECTIVO', 'fecha_pago': '2025-02-01', 'clave_idempotencia': self.clave,
+        }
+        primera = self.client.post(reverse('payments:pago_crear'), datos)
+        segunda = self.client.post(reverse('payments:pago_crear'), datos)
+        pago = Pago.objects.get()
+        self.assertRedirects(primera, reverse('payments:pago_detalle', args=[pago.pk]))
+        self.assertRedirects(segunda, reverse('payments:pago_detalle', args=[pago.pk]))
+
+    def test_envio_en_curso(self):
+        # Otra petición reclamó la clave y aún no confirma su pago
+        ClaveIdempotencia.objects.create(clave=self.clave, usuario=self.usuario)
+        self.assertRedirects(self.pago_rapido(), reverse('payments:pago_lista'))
+        self.assertFalse(Pago.objects.exists())
+
+    def test_pago_rechazado_libera_la_clave(self):
+        self.pago_rapido(valor='2000000')
+        self.assertFalse(ClaveIdempotencia.objects.exists())
+        self.pago_rapido()
+        self.assertEqual(Pago.objects.count(), 1)
 
-# Create your tests here.
+    def test_purgar(self):
+        self.pago_rapido()
+        self.assertEqual(idempotencia.purgar(timezone.now() - timedelta(hours=1)), 0)
+        self.assertEqual(idempotencia.purgar(timezone.now() + timedelta(seconds=1)), 1)
@@ -2,18 +2,26 @@
 Vistas del sistema de pagos
 """
 
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
 from django.http import HttpResponse
 from datetime import timedelta, datetime
 from decimal import Decimal
 
-from .models import Pago, PlanPago
+from . import consultas, idempotencia
+from .models import Pago, PagoArchivado, PlanPago
 from loans.models import Prestamo
+from loans import dinero, panels
 from loans.forms import PagoRapidoForm
+from prestamosjl.db_router import usar_replica
 
 # Para generar PDFs
 """from reportlab.lib.pagesizes import letter
@@ -25,34 +33,19 @@ from io import BytesIO"""
 
 
 @login_required
+@usar_replica
 def pago_lista(request):
     """Lista de pagos con filtros"""
     
-    pagos = Pago.objects.select_related(
-        'prestamo', 'prestamo__cliente', 'created_by'
-    ).filter(anulado=False).order_by('-fecha_pago', '-created_at')
-    
-    # Filtros
     search = request.GET.get('search', '')
-    if search:
-        pagos = pagos.filter(
-            Q(recibo_numero__icontains=search) |
-            Q(prestamo__codigo__icontains=search) |
-            Q(prestamo__cliente__nombre__icontains=search) |
-            Q(prestamo__cliente__apellido__icontains=search)
-        )
-    
+    referencia = request.GET.get('referencia', '').strip()
     metodo = request.GET.get('metodo', '')
-    if metodo:
-        pagos = pagos.filter(metodo_pago=metodo)
-    
     fecha_desde = request.GET.get('fecha_desde', '')
     fecha_hasta = request.GET.get('fecha_hasta', '')
-    
-    if fecha_desde:
-        pagos = pagos.filter(fecha_pago__gte=fecha_desde)
-    if fecha_hasta:
-        pagos = pagos.filter(fecha_pago__lte=fecha_hasta)
+    pagos = consultas.pagos(
+        search=search, metodo=metodo, fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta, referencia=referencia,
+    )
     
     # Totales
     totales = pagos.aggregate(
@@ -64,6 +57,7 @@ def pago_lista(request):
     context = {
         'pagos': pagos[:50],  # Limitar a 50 para performance
         'search': search,
+        'referencia': referencia,
         'metodo': metodo,
         'fecha_desde': fecha_desde,
         'fecha_hasta': fecha_hasta,
@@ -78,10 +72,11 @@ def pago_lista(request):
 def pago_detalle(request, pk):
     """Detalle de un pago"""
     
-    pago = get_object_or_404(
-        Pago.objects.select_related('prestamo', 'prestamo__cliente', 'created_by'),
-        pk=pk
-    )
+    relacionados = ('prestamo', 'prestamo__cliente', 'created_by')
+    pago = Pago.del_prestamista.select_related(*relacionados).filter(pk=pk).first()
+    if pago is None:
+        # Pago de un préstamo archivado (payments/archivo.py): mismo id
+        pago = get_object_or_404(PagoArchivado.del_prestamista.select_related(*relacionados), pk=pk)
     
     context = {'pago': pago}
     return render(request, 'payments/pago_detalle.html', context)
@@ -91,25 +86,43 @@ def pago_detalle(request, pk):
 def pago_crear(request):
     """Crear nuevo pago (vista completa)"""
     
+    clave = None
     if request.method == 'POST':
+        # Reenvío del mismo formulario: mostrar el pago original
+        clave = idempotencia.clave_de(request)
+        original = idempotencia.buscar(clave)
+        if original:
+            return _pago_repetido(request, original, 'payments:pago_detalle')
+        
         form = PagoRapidoForm(request.POST, request.FILES)
         if form.is_valid():
-            pago = form.save(commit=False)
-            pago.created_by = request.user
-            pago.save()
-            
-            messages.success(
-                request, 
-                f'Pago {pago.recibo_numero} registrado exitosamente'
-            )
-            return redirect('payments:pago_detalle', pk=pago.pk)
+            try:
+                with transaction.atomic():
+                    registro = idempotencia.reclamar(clave, request.user)
+                    pago = form.save(commit=False)
+                    pago.created_by = request.user
+                    pago.save()
+                    idempotencia.asociar(registro, pago)
+            except idempotencia.ClaveUsada:
+                return _pago_repetido(request, idempotencia.buscar(clave), 'payments:pago_detalle')
+            except ValidationError as e:
+                # El reparto con el préstamo bloqueado ya no cabe (cambió desde la vista previa)
+                form.add_error(None, e)
+            else:
+                messages.success(
+                    request, 
+                    f'Pago {pago.recibo_numero} registrado exitosamente'
+                )
+                return redirect('payments:pago_detalle', pk=pago.pk)
     else:
         # Pre-llenar fecha actual
         form = PagoRapidoForm(initial={'fecha_pago': timezone.now().date()})
     
     context = {
         'form': form,
-        'titulo': 'Registrar Pago'
+        'titulo': 'Registrar Pago',
+        # Se conserva si el formulario vuelve con errores: aún no registró nada
+        'clave_idempotencia': clave or idempotencia.nueva_clave(),
     }
     return render(request, 'payments/pago_form.html', context)
 
@@ -119,6 +132,12 @@ def pago_rapido(request):
     """Interfaz de pago rápido optimizada"""
     
     if request.method == 'POST':
+        # Reenvío del mismo formulario: no se vuelve a tocar el préstamo
+        clave = idempotencia.clave_de(request)
+        original = idempotencia.buscar(clave)
+        if original:
+            return _pago_repetido(request, original, 'payments:pago_rapido')
+        
         prestamo_id = request.POST.get('prestamo_id')
         valor_total = request.POST.get('valor_total')
         metodo_pago = request.POST.get('metodo_pago', 'EFECTIVO')
@@ -128,39 +147,21 @@ def pago_rapido(request):
             return redirect('payments:pago_rapido')
         
         try:
-            prestamo = Prestamo.objects.get(id=prestamo_id)
-            valor_total = Decimal(valor_total)
-            
-            # Calcular automáticamente interés y capital
-            interes_mensual = prestamo.interes_mensual
-            valor_interes = min(interes_mensual, valor_total)
-            valor_capital = valor_total - valor_interes
+            prestamo = Prestamo.del_prestamista.get(id=prestamo_id)
+            valor_total = dinero.redondear(Decimal(valor_total))
             
-            # Validar que no exceda el saldo
-            if valor_capital > prestamo.saldo_actual:
-                messages.error(
-                    request,
-                    f'El pago de capital (${valor_capital:,.0f}) excede el saldo (${prestamo.saldo_actual:,.0f})'
+            # Pago.save reparte mora, interés y capital (en ese orden) y
+            # valida el capital contra el saldo (payments/distribucion.py)
+            with transaction.atomic():
+                registro = idempotencia.reclamar(clave, request.user)
+                pago = Pago.objects.create(
+                    prestamo=prestamo,
+                    valor_total=valor_total,
+                    metodo_pago=metodo_pago,
+                    fecha_pago=timezone.now().date(),
+                    created_by=request.user
                 )
-                return redirect('payments:pago_rapido')
-            
-            # Crear pago
-            pago = Pago.objects.create(
-                prestamo=prestamo,
-                valor_total=valor_total,
-                valor_interes=valor_interes,
-                valor_capital=valor_capital,
-                metodo_pago=metodo_pago,
-                fecha_pago=timezone.now().date(),
-                created_by=request.user
-            )
-            # Cerrar préstamo si quedó pagado
-            prestamo.refresh_from_db()
-
-            if prestamo.saldo_actual <= 0:
-                prestamo.saldo_actual = 0
-                prestamo.estado = "PAGADO"
-                prestamo.save(update_fields=["saldo_actual", "estado"])
+                idempotencia.asociar(registro, pago)
             
             messages.success(
                 request,
@@ -170,6 +171,10 @@ def pago_rapido(request):
             # Redirigir al recibo
             #return redirect('payments:pago_recibo_pdf', pk=pago.pk)
             
+        except idempotencia.ClaveUsada:
+            return _pago_repetido(request, idempotencia.buscar(clave), 'payments:pago_rapido')
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
         except Prestamo.DoesNotExist:
             messages.error(request, 'Préstamo no encontrado')
         except ValueError:
@@ -179,35 +184,39 @@ def pago_rapido(request):
         
         return redirect('payments:pago_rapido')
     
-    # GET - Mostrar formulario
-    prestamos_activos = Prestamo.objects.filter(
-        estado__in=['ACTIVO', 'VENCIDO', 'MORA']
-    ).select_related('cliente').order_by('-fecha_prestamo')[:20]
-    
+    # GET - Mostrar formulario (el préstamo se busca con loans:prestamo_autocompletar)
     # Pagos del día
-    pagos_hoy = Pago.objects.filter(
-        fecha_pago=timezone.now().date(),
-        anulado=False
-    ).select_related('prestamo', 'prestamo__cliente').order_by('-created_at')[:10]
+    pagos_hoy = consultas.pagos_del_dia(timezone.now().date(), orden='-created_at')[:10]
     
     # Total recaudado hoy
     total_hoy = pagos_hoy.aggregate(Sum('valor_total'))['valor_total__sum'] or 0
     
     context = {
-        'prestamos_activos': prestamos_activos,
         'pagos_hoy': pagos_hoy,
         'total_hoy': total_hoy,
         'metodos_pago': Pago.METODO_PAGO_CHOICES,
+        'clave_idempotencia': idempotencia.nueva_clave(),
     }
     
     return render(request, 'payments/pago_rapido.html', context)
 
 
+def _pago_repetido(request, original, destino):
+    """Respuesta a un reenvío: el pago ya quedó registrado con esa clave"""
+    if not original or not original['pago_id']:
+        messages.warning(request, 'El pago se está registrando; verifique en la lista de pagos')
+        return redirect('payments:pago_lista')
+    messages.info(request, f'El pago {original["recibo_numero"]} ya estaba registrado')
+    if destino == 'payments:pago_detalle':
+        return redirect(destino, pk=original['pago_id'])
+    return redirect(destino)
+
+
 @login_required
 def pago_anular(request, pk):
     """Anular un pago"""
     
-    pago = get_object_or_404(Pago, pk=pk)
+    pago = get_object_or_404(Pago.del_prestamista, pk=pk)
     
     if pago.anulado:
         messages.warning(request, 'Este pago ya está anulado')
@@ -238,7 +247,7 @@ def pago_recibo_pdf(request, pk):
     """Generar recibo de pago en PDF"""
     
     pago = get_object_or_404(
-        Pago.objects.select_related('prestamo', 'prestamo__cliente', 'prestamo__prestamista'),
+        Pago.del_prestamista.select_related('prestamo', 'prestamo__cliente', 'prestamo__prestamista'),
         pk=pk
     )
     
@@ -374,40 +383,27 @@ def pago_recibo_pdf(request, pk):
 '''
 
 @login_required
-def reporte_diario(request):
+@usar_replica
+async def reporte_diario(request):
     """Reporte de pagos del día"""
     
     # Fecha seleccionada o hoy
     fecha_str = request.GET.get('fecha', timezone.now().date().isoformat())
     try:
         fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
-    except:
+    except ValueError:
         fecha = timezone.now().date()
     
-    # Pagos del día
-    pagos = Pago.objects.filter(
-        fecha_pago=fecha,
-        anulado=False
-    ).select_related('prestamo', 'prestamo__cliente').order_by('created_at')
+    # Pagos del día (Pago.del_prestamista lee el prestamista de forma síncrona)
+    await request.aprestamista()
+    pagos = consultas.pagos_del_dia(fecha)
     
-    # Resumen
-    resumen = {
-        'fecha': fecha,
-        'total_pagos': pagos.count(),
-        'total_recaudado': pagos.aggregate(Sum('valor_total'))['valor_total__sum'] or 0,
-        'total_intereses': pagos.aggregate(Sum('valor_interes'))['valor_interes__sum'] or 0,
-        'total_capital': pagos.aggregate(Sum('valor_capital'))['valor_capital__sum'] or 0,
-        'por_metodo': {}
-    }
-    
-    # Agrupar por método de pago
-    for metodo, nombre in Pago.METODO_PAGO_CHOICES:
-        pagos_metodo = pagos.filter(metodo_pago=metodo)
-        if pagos_metodo.exists():
-            resumen['por_metodo'][nombre] = {
-                'cantidad': pagos_metodo.count(),
-                'monto': pagos_metodo.aggregate(Sum('valor_total'))['valor_total__sum'] or 0
-            }
+    # Resumen (agrupado por método de pago) y detalle en paralelo
+    resumen, pagos = await asyncio.gather(
+        panels.ejecutar(panels.resumen_pagos, pagos),
+        panels.ejecutar(panels.evaluar, pagos),
+    )
+    resumen['fecha'] = fecha
     
     context = {
         'fecha': fecha,
@@ -415,10 +411,11 @@ def reporte_diario(request):
         'resumen': resumen,
     }
     
-    return render(request, 'payments/reporte_diario.html', context)
+    return await sync_to_async(render)(request, 'payments/reporte_diario.html', context)
 
 
 @login_required
+@usar_replica
 def estadisticas_pagos(request):
     """Estadísticas generales de pagos"""
     
@@ -426,7 +423,7 @@ def estadisticas_pagos(request):
     fecha_desde = request.GET.get('fecha_desde', '')
     fecha_hasta = request.GET.get('fecha_hasta', '')
     
-    pagos = Pago.objects.filter(anulado=False)
+    pagos = Pago.del_prestamista.filter(anulado=False)
     
     if fecha_desde:
         pagos = pagos.filter(fecha_pago__gte=fecha_desde)
@@ -474,7 +471,7 @@ def obtener_info_prestamo(request, prestamo_id):
     from django.http import JsonResponse
     
     try:
-        prestamo = Prestamo.objects.get(id=prestamo_id)
+        prestamo = Prestamo.del_prestamista.get(id=prestamo_id)
         data = {
             'codigo': prestamo.codigo,
             'cliente': prestamo.cliente.nombre_completo,
@@ -3,6 +3,11 @@ ASGI config for prestamosjl project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las vistas async (dashboard, reportes, reporte_diario) ejecutan sus
+paneles en paralelo; para aprovecharlo, servir con un servidor ASGI:
+
+    uvicorn prestamosjl.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
@@ -0,0 +1,143 @@
+"""
+Backend SQLite afinado para varias cajas registrando pagos a la vez.
+
+Sobre el backend estándar de Django:
+
+* aplica WAL, ``synchronous=NORMAL``, ``mmap_size``, ``cache_size``,
+  ``temp_store`` y ``busy_timeout`` al abrir cada conexión;
+* inicia las transacciones con ``BEGIN IMMEDIATE`` (el bloqueo de escritura
+  se toma al inicio, en lugar de fallar al intentar pasar de lectura a
+  escritura) y reintenta con espera acotada si la base sigue bloqueada;
+* acumula métricas de espera por bloqueo (``lock_stats``).
+
+Uso en settings::
+
+    DATABASES = {'default': {
+        'ENGINE': 'prestamosjl.db_backends.sqlite3',
+        'NAME': 'prestamos',
+        'OPTIONS': {
+            'pragmas': {'cache_size': -32000},   # opcional, sobrescribe PRAGMAS
+            'lock_retries': 5,
+            'lock_backoff': 0.05,                # segundos, se duplica por intento
+        },
+    }}
+"""
+
+import logging
+import threading
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+
+logger = logging.getLogger('prestamosjl.db')
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,           # ms que SQLite espera por un bloqueo
+    'cache_size': -64000,           # negativo = KiB (64 MB)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05
+LOCK_BACKOFF_MAX = 1.0
+SLOW_LOCK_WAIT = 0.5
+
+
+class LockStats:
+    """Métricas de espera por el bloqueo de escritura (compartidas entre hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.transacciones = 0
+            self.esperas = 0
+            self.reintentos = 0
+            self.fallos = 0
+            self.espera_total = 0.0
+            self.espera_maxima = 0.0
+
+    def registrar(self, espera, reintentos, fallo=False):
+        with self._lock:
+            self.transacciones += 1
+            self.reintentos += reintentos
+            self.fallos += int(fallo)
+            if espera > 0.001:
+                self.esperas += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'transactions': self.transacciones,
+                'lock_waits': self.esperas,
+                'retries': self.reintentos,
+                'failures': self.fallos,
+                'wait_ms_total': round(self.espera_total * 1000, 1),
+                'wait_ms_max': round(self.espera_maxima * 1000, 1),
+            }
+
+
+lock_stats = LockStats()
+
+
+def es_bloqueo(error):
+    mensaje = str(error).lower()
+    return 'database is locked' in mensaje or 'database is busy' in mensaje
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**PRAGMAS, **options.get('pragmas', {})}
+        self.lock_retries = options.get('lock_retries', LOCK_RETRIES)
+        self.lock_backoff = options.get('lock_backoff', LOCK_BACKOFF)
+        self.lock_wait = 0.0
+
+        kwargs = super().get_connection_params()
+        for clave in ('pragmas', 'lock_retries', 'lock_backoff'):
+            kwargs.pop(clave, None)
+        if self.transaction_mode is None:
+            self.transaction_mode = 'IMMEDIATE'
+        # El busy handler de sqlite3.connect() usa segundos
+        kwargs.setdefault('timeout', self.pragmas['busy_timeout'] / 1000)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {pragma} = {valor}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        inicio = time.monotonic()
+        espera = self.lock_backoff
+        intento = 0
+        while True:
+            try:
+                super()._start_transaction_under_autocommit()
+                break
+            except OperationalError as error:
+                if not es_bloqueo(error) or intento >= self.lock_retries:
+                    lock_stats.registrar(time.monotonic() - inicio, intento, fallo=True)
+                    logger.error('BEGIN %s falló tras %s reintentos: %s', self.transaction_mode, intento, error)
+                    raise
+                intento += 1
+                time.sleep(espera)
+                espera = min(espera * 2, LOCK_BACKOFF_MAX)
+
+        duracion = time.monotonic() - inicio
+        self.lock_wait += duracion
+        lock_stats.registrar(duracion, intento)
+        if duracion > SLOW_LOCK_WAIT:
+            logger.warning(
+                'Espera por bloqueo de escritura: %.0f ms (%s reintentos)', duracion * 1000, intento
+            )
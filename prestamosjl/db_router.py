@@ -0,0 +1,139 @@
+"""
+Enrutamiento de lecturas pesadas (reportes y listas) a una réplica.
+
+Las vistas de solo lectura se marcan con ``@usar_replica``; el router
+``ReplicaRouter`` envía sus lecturas al alias configurado en
+``settings.REPLICA_SETTINGS['ALIAS']`` siempre que:
+
+* el alias exista en ``settings.DATABASES``,
+* la sesión no haya escrito hace poco (lee-lo-que-escribes, ver
+  ``ReplicaStickinessMiddleware``),
+* el retraso de la réplica no supere ``MAX_LAG`` segundos.
+
+En cualquier otro caso las lecturas van al primario. Las escrituras
+siempre van al primario.
+"""
+
+import contextvars
+import logging
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+logger = logging.getLogger('prestamosjl.db')
+
+SESSION_KEY = '_db_primario_hasta'
+SYNC_TABLE = '_replica_sync'
+
+_leer_de_replica = contextvars.ContextVar('leer_de_replica', default=False)
+_retraso_cache = {}
+
+
+def replica_settings():
+    config = {'ALIAS': 'replica', 'MAX_LAG': 30, 'STICKY_SECONDS': 15, 'LAG_CHECK_TTL': 5}
+    config.update(getattr(settings, 'REPLICA_SETTINGS', {}))
+    return config
+
+
+def retraso_replica(alias):
+    """Segundos de retraso de la réplica, o None si no se puede determinar"""
+    conn = connections[alias]
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            # Réplica local: archivo copiado con `manage.py sync_replica`
+            cursor.execute(f'SELECT synced_at FROM {SYNC_TABLE}')
+            fila = cursor.fetchone()
+            return time.time() - fila[0] if fila else None
+        if conn.vendor == 'mysql':
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except Exception:
+                cursor.execute('SHOW SLAVE STATUS')
+            fila = cursor.fetchone()
+            if not fila:
+                return None
+            columnas = [c[0] for c in cursor.description]
+            estado = dict(zip(columnas, fila))
+            return estado.get('Seconds_Behind_Source', estado.get('Seconds_Behind_Master'))
+        if conn.vendor == 'postgresql':
+            cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+            fila = cursor.fetchone()
+            return fila[0] if fila else None
+    return None
+
+
+def replica_disponible():
+    config = replica_settings()
+    alias = config['ALIAS']
+    if alias not in settings.DATABASES:
+        return False
+
+    ahora = time.monotonic()
+    revisado, retraso = _retraso_cache.get(alias, (None, None))
+    if revisado is None or ahora - revisado > config['LAG_CHECK_TTL']:
+        try:
+            retraso = retraso_replica(alias)
+        except Exception as error:
+            logger.warning('No se pudo medir el retraso de la réplica %s: %s', alias, error)
+            retraso = None
+        _retraso_cache[alias] = (ahora, retraso)
+
+    if retraso is None or retraso > config['MAX_LAG']:
+        return False
+    return True
+
+
+def sesion_fijada_al_primario(request):
+    session = getattr(request, 'session', None)
+    return bool(session) and session.get(SESSION_KEY, 0) > time.time()
+
+
+def usar_replica(view):
+    """Marca una vista de solo lectura para que sus consultas vayan a la réplica"""
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _wrapped(request, *args, **kwargs):
+            if await sync_to_async(sesion_fijada_al_primario)(request):
+                return await view(request, *args, **kwargs)
+            token = _leer_de_replica.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _leer_de_replica.reset(token)
+        return _wrapped
+
+    @wraps(view)
+    def _wrapped(request, *args, **kwargs):
+        if sesion_fijada_al_primario(request):
+            return view(request, *args, **kwargs)
+        token = _leer_de_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _leer_de_replica.reset(token)
+
+    return _wrapped
+
+
+class ReplicaRouter:
+    """Lecturas de vistas marcadas a la réplica; todo lo demás al primario"""
+
+    def db_for_read(self, model, **hints):
+        if _leer_de_replica.get() and replica_disponible():
+            return replica_settings()['ALIAS']
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica es una copia del primario: los objetos son compatibles
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != replica_settings()['ALIAS']
@@ -0,0 +1,235 @@
+"""
+Middleware del proyecto prestamosjl
+"""
+
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from audit.registro import _peticion as auditoria_peticion
+from prestamosjl.db_router import SESSION_KEY as REPLICA_SESSION_KEY, replica_settings
+from users.identidad import aobtener_prestamista, obtener_prestamista
+from users.tenencia import _prestamista as tenencia_prestamista
+
+
+logger = logging.getLogger('prestamosjl.sql')
+
+_RE_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_IN_LISTS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_RE_SPACES = re.compile(r'\s+')
+
+# Estadísticas de la petición en curso. Los hilos de los paneles
+# (loans/panels.py) heredan el contexto y cuentan ahí sus consultas
+_estadisticas = contextvars.ContextVar('sql_estadisticas', default=None)
+
+
+def normalizar_sql(sql):
+    """Reduce una sentencia SQL a su patrón (sin literales ni listas IN)"""
+    sql = _RE_STRINGS.sub('?', sql)
+    sql = _RE_NUMBERS.sub('?', sql)
+    sql = _RE_IN_LISTS.sub('(?)', sql)
+    return _RE_SPACES.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Acumula las consultas ejecutadas durante una petición"""
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo = 0.0
+        self.patrones = Counter()
+        self.espera_bloqueo = 0.0
+        # Los paneles concurrentes registran desde otros hilos
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            patron = normalizar_sql(sql)
+            with self._lock:
+                self.tiempo += duracion
+                self.total += 1
+                self.patrones[patron] += 1
+
+    def duplicadas(self, minimo=2):
+        """Patrones repetidos al menos `minimo` veces, del más repetido al menos"""
+        return [(sql, n) for sql, n in self.patrones.most_common() if n >= minimo]
+
+
+@contextmanager
+def instrumentar_conexiones():
+    """
+    Cuenta las consultas de las conexiones de este hilo en las estadísticas
+    de la petición en curso (si las hay). La usan el middleware y los
+    hilos de ``panels.ejecutar``.
+    """
+    stats = _estadisticas.get()
+    with ExitStack() as pila:
+        if stats is not None:
+            for conn in connections.all():
+                pila.enter_context(conn.execute_wrapper(stats))
+        yield stats
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Registra por vista el número de consultas, el tiempo total en base de datos
+    y los patrones SQL repetidos (posibles N+1).
+
+    Se configura con ``settings.SQL_INSTRUMENTATION``::
+
+        SQL_INSTRUMENTATION = {
+            'ENABLED': True,          # activa el registro
+            'N1_THRESHOLD': 5,        # repeticiones de un patrón para marcar N+1
+            'RESPONSE_HEADER': False, # expone X-SQL-Stats en la respuesta
+        }
+
+    Funciona con DEBUG=False: usa ``connection.execute_wrapper`` y no depende
+    de ``connection.queries``. Debe ir primero en ``MIDDLEWARE`` para contar
+    también las consultas de los demás middleware (identidad, auditoría).
+    Las consultas de los paneles en hilos propios se cuentan porque
+    ``panels.ejecutar`` instala el mismo contador en sus conexiones; la
+    espera por bloqueos solo se mide en el hilo de la petición.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, 'SQL_INSTRUMENTATION', {})
+        self.enabled = config.get('ENABLED', False)
+        self.n1_threshold = config.get('N1_THRESHOLD', 5)
+        self.response_header = config.get('RESPONSE_HEADER', False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = QueryStats()
+        espera_previa = self.espera_por_bloqueo()
+        inicio = time.perf_counter()
+        token = _estadisticas.set(stats)
+        try:
+            with instrumentar_conexiones():
+                response = self.get_response(request)
+        finally:
+            _estadisticas.reset(token)
+        duracion = time.perf_counter() - inicio
+        stats.espera_bloqueo = self.espera_por_bloqueo() - espera_previa
+
+        self.registrar(request, response, stats, duracion)
+        if self.response_header:
+            response['X-SQL-Stats'] = (
+                f'queries={stats.total}; db_ms={stats.tiempo * 1000:.1f}; '
+                f'total_ms={duracion * 1000:.1f}; '
+                f'lock_wait_ms={stats.espera_bloqueo * 1000:.1f}; '
+                f'duplicates={len(stats.duplicadas())}'
+            )
+        return response
+
+    @staticmethod
+    def espera_por_bloqueo():
+        """Segundos esperados por bloqueos de escritura (backend SQLite afinado)"""
+        return sum(getattr(conn, 'lock_wait', 0.0) for conn in connections.all())
+
+    def registrar(self, request, response, stats, duracion):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else request.path
+        n_mas_uno = [
+            {'sql': sql[:300], 'count': n}
+            for sql, n in stats.duplicadas(self.n1_threshold)
+        ]
+        registro = {
+            'view': vista,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': stats.total,
+            'db_ms': round(stats.tiempo * 1000, 1),
+            'total_ms': round(duracion * 1000, 1),
+            'lock_wait_ms': round(stats.espera_bloqueo * 1000, 1),
+            'duplicates': sum(n - 1 for _, n in stats.duplicadas()),
+            'n_plus_one': n_mas_uno,
+        }
+        nivel = logging.WARNING if n_mas_uno else logging.INFO
+        logger.log(nivel, json.dumps(registro, ensure_ascii=False))
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Tras una escritura exitosa (POST, PUT, PATCH, DELETE) fija la sesión al
+    primario durante ``REPLICA_SETTINGS['STICKY_SECONDS']``, para que el
+    usuario vea de inmediato lo que acaba de registrar aunque la réplica
+    vaya atrasada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        config = replica_settings()
+        if (
+            config['ALIAS'] in settings.DATABASES
+            and request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+            and response.status_code < 400
+            and hasattr(request, 'session')
+        ):
+            request.session[REPLICA_SESSION_KEY] = time.time() + config['STICKY_SECONDS']
+        return response
+
+
+class IdentidadMiddleware:
+    """
+    Expone ``request.prestamista`` (y ``request.aprestamista()`` para vistas
+    async): el prestamista del usuario autenticado, resuelto de forma
+    perezosa a partir de ``request.user``, que ya trae su perfil y
+    prestamista desde ``users.identidad.IdentidadBackend``. También lo fija
+    como prestamista en curso de los managers ``del_prestamista``
+    (users/tenencia.py).
+
+    Debe ir después de ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.prestamista = SimpleLazyObject(lambda: obtener_prestamista(request))
+        request.aprestamista = partial(aobtener_prestamista, request)
+        token = tenencia_prestamista.set(partial(obtener_prestamista, request))
+        try:
+            return self.get_response(request)
+        finally:
+            tenencia_prestamista.reset(token)
+
+
+class AuditoriaMiddleware:
+    """
+    Deja la petición en curso a disposición de ``audit.registro`` para
+    anotar el usuario de cada cambio auditado.
+
+    Debe ir después de ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = auditoria_peticion.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            auditoria_peticion.reset(token)
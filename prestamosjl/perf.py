@@ -0,0 +1,191 @@
+"""
+Utilidades de prueba compartidas: presupuesto de consultas y latencia por URL.
+
+Cada app declara sus rutas en un ``TestCase`` que hereda ``RoutePerformanceMixin``.
+Los resultados se comparan contra ``perf_baseline.json`` (en este paquete):
+
+    PERF_UPDATE_BASELINE=1 python manage.py test   # regraba la línea base
+    PERF_CHECK_TIME=1 python manage.py test        # falla si una vista es 3x más lenta
+    PERF_REPORT=/tmp/perf.json python manage.py test
+"""
+
+import json
+import os
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Max
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from users.models import Prestamista, Profile
+from loans.models import Cliente, Prestamo
+from payments.models import Pago
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'perf_baseline.json')
+TIME_TOLERANCE = 3.0
+
+
+def cargar_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_json(path, datos):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+class RoutePerformanceMixin:
+    """
+    Recorre todas las rutas de un módulo de URLs sobre una cartera sembrada
+    con ``seed_portfolio`` y verifica:
+
+    * que todas las rutas tengan un caso declarado,
+    * que ninguna supere su máximo de consultas de la línea base,
+    * que el número de consultas no crezca al aumentar las filas (O(n)).
+
+    ``routes`` mapea ``'app:nombre'`` a ``(metodo, kwargs, datos)``, donde
+    kwargs y datos pueden ser callables que reciben el caso de prueba.
+    """
+
+    urls_module = None
+    namespace = None
+    routes = {}
+    login = True
+
+    SEED = {'prestamistas': 3, 'clientes': 40, 'prestamos': 80, 'pagos': 400}
+    GROWTH = {'prestamistas': 1, 'clientes': 80, 'prestamos': 160, 'pagos': 800}
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_portfolio', seed=7, stdout=StringIO(), **cls.SEED)
+        cls.prestamista = Prestamista.objects.order_by('id').first()
+        cls.user = User.objects.create_user('cajero', password='cajero123')
+        Profile.objects.create(user=cls.user, prestamista=cls.prestamista)
+
+        # Objetos de detalle dentro de la cartera del cajero
+        cls.cliente = Cliente.objects.filter(prestamista=cls.prestamista).annotate(
+            n=Count('prestamos')
+        ).order_by('-n', 'id').first()
+        cls.prestamo = Prestamo.objects.filter(
+            prestamista=cls.prestamista, estado='ACTIVO'
+        ).annotate(n=Count('pagos')).order_by('-n', 'id').first()
+        cls.pago = Pago.objects.filter(prestamo=cls.prestamo, anulado=False).first()
+
+    def setUp(self):
+        # Paneles en el hilo de la prueba: los hilos extra no ven su transacción
+        paneles = self.settings(LOAN_SETTINGS={
+            **getattr(settings, 'LOAN_SETTINGS', {}), 'CONCURRENT_PANELS': False,
+        })
+        paneles.enable()
+        self.addCleanup(paneles.disable)
+        # Medir con la caché fría (paneles, identidad): no heredar de otras pruebas
+        cache.clear()
+        if self.login:
+            self.client.force_login(self.user)
+
+    # ---------- medición ----------
+
+    def resolver(self, valor):
+        return valor(self) if callable(valor) else (valor or {})
+
+    def medir(self, nombre):
+        metodo, kwargs, datos = self.routes[nombre]
+        url = reverse(nombre.split('[')[0], kwargs=self.resolver(kwargs))
+        peticion = self.client.post if metodo == 'POST' else self.client.get
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            response = peticion(url, self.resolver(datos))
+            duracion = (time.perf_counter() - inicio) * 1000
+        self.assertLess(response.status_code, 500, f'{nombre} respondió {response.status_code}')
+        return len(ctx.captured_queries), duracion
+
+    def medir_todas(self):
+        return {nombre: self.medir(nombre) for nombre in sorted(self.routes)}
+
+    def crecer_cartera(self):
+        """Siembra más filas y asigna parte de ellas a los objetos de detalle"""
+        ultimo_prestamo = Prestamo.objects.aggregate(m=Max('id'))['m']
+        ultimo_pago = Pago.objects.aggregate(m=Max('id'))['m']
+        call_command('seed_portfolio', seed=11, stdout=StringIO(), **self.GROWTH)
+
+        nuevos = list(
+            Prestamo.objects.filter(id__gt=ultimo_prestamo).order_by('id').values_list('id', flat=True)
+        )
+        Prestamo.objects.filter(id__in=nuevos[:20]).update(cliente=self.cliente, prestamista=self.prestamista)
+        Prestamo.objects.filter(id__in=nuevos[20:60]).update(prestamista=self.prestamista)
+        Cliente.objects.filter(prestamos__id__in=nuevos[20:60]).update(prestamista=self.prestamista)
+        Pago.objects.filter(prestamo_id__in=nuevos[:60]).update(prestamista=self.prestamista)
+        Pago.objects.filter(id__in=list(
+            Pago.objects.filter(id__gt=ultimo_pago).values_list('id', flat=True)[:50]
+        )).update(prestamo=self.prestamo, prestamista=self.prestamista)
+        Cliente.objects.actualizar_resumen()
+        # update() no dispara las señales que invalidan los paneles
+        cache.clear()
+
+    # ---------- pruebas ----------
+
+    def test_todas_las_rutas_tienen_caso(self):
+        resolver = get_resolver(self.urls_module)
+        nombres = {
+            f'{self.namespace}:{p.name}' for p in resolver.url_patterns if getattr(p, 'name', None)
+        }
+        declaradas = {nombre.split('[')[0] for nombre in self.routes}
+        self.assertEqual(nombres - declaradas, set(), 'Rutas sin presupuesto de consultas')
+
+    def test_presupuesto_de_consultas(self):
+        baseline = cargar_json(BASELINE_PATH)
+        resultados = self.medir_todas()
+
+        self.registrar(resultados)
+        if os.environ.get('PERF_UPDATE_BASELINE') == '1':
+            for nombre, (queries, ms) in resultados.items():
+                baseline[nombre] = {'max_queries': queries, 'wall_ms': round(ms, 1)}
+            guardar_json(BASELINE_PATH, baseline)
+            return
+
+        for nombre, (queries, ms) in resultados.items():
+            with self.subTest(ruta=nombre):
+                self.assertIn(nombre, baseline, 'Ruta sin línea base; ejecute con PERF_UPDATE_BASELINE=1')
+                esperado = baseline[nombre]
+                self.assertLessEqual(
+                    queries, esperado['max_queries'],
+                    f'{nombre}: {queries} consultas (máximo {esperado["max_queries"]})'
+                )
+                if os.environ.get('PERF_CHECK_TIME') == '1':
+                    self.assertLessEqual(
+                        ms, esperado['wall_ms'] * TIME_TOLERANCE,
+                        f'{nombre}: {ms:.1f} ms (línea base {esperado["wall_ms"]} ms)'
+                    )
+
+    def test_consultas_no_crecen_con_las_filas(self):
+        antes = self.medir_todas()
+        self.crecer_cartera()
+        despues = self.medir_todas()
+
+        for nombre in antes:
+            with self.subTest(ruta=nombre):
+                self.assertLessEqual(
+                    despues[nombre][0], antes[nombre][0],
+                    f'{nombre}: las consultas crecen con las filas '
+                    f'({antes[nombre][0]} -> {despues[nombre][0]})'
+                )
+
+    def registrar(self, resultados):
+        path = os.environ.get('PERF_REPORT')
+        if not path:
+            return
+        reporte = cargar_json(path)
+        for nombre, (queries, ms) in resultados.items():
+            reporte[nombre] = {'queries': queries, 'wall_ms': round(ms, 1)}
+        guardar_json(path, reporte)
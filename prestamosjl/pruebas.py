@@ -0,0 +1,77 @@
+"""
+Datos mínimos para las pruebas de comportamiento de las apps.
+
+Las pruebas de rendimiento siembran una cartera completa con
+``seed_portfolio`` (prestamosjl/perf.py); estas funciones crean solo las
+filas que cada prueba necesita, con valores por defecto válidos::
+
+    prestamista = crear_prestamista()
+    prestamo = crear_prestamo(crear_cliente(prestamista), valor=1000000)
+    pago = crear_pago(prestamo, 200000)
+"""
+
+from datetime import date
+from decimal import Decimal
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from loans.models import Cliente, Prestamo
+from payments.models import Pago
+from users.models import Prestamista, Profile
+
+
+_secuencia = count(1)
+
+# Para pruebas que ejecutan los on_commit: la auditoría se inserta en el hilo
+# de la prueba, el hilo del buffer (audit/buffer.py) no ve su transacción
+auditoria_sincrona = override_settings(AUDIT_SETTINGS={
+    **getattr(settings, 'AUDIT_SETTINGS', {}), 'FLUSH_INTERVAL': 0,
+})
+
+
+def crear_prestamista(**campos):
+    n = next(_secuencia)
+    datos = {'nombres': f'Prestamista {n}', 'apellidos': 'Prueba', 'cedula': f'9{n:08d}'}
+    datos.update(campos)
+    return Prestamista.objects.create(**datos)
+
+
+def crear_usuario(username, prestamista=None, perfil=True, password='clave123'):
+    """Usuario con perfil del `prestamista` (o sin perfil, con ``perfil=False``)"""
+    user = User.objects.create_user(username, password=password)
+    if perfil:
+        Profile.objects.create(user=user, prestamista=prestamista)
+    return user
+
+
+def crear_cliente(prestamista, **campos):
+    n = next(_secuencia)
+    datos = {
+        'prestamista': prestamista,
+        'nombre': f'Cliente{n}',
+        'apellido': 'Prueba',
+        'cedula': f'1{n:08d}',
+        'direccion_principal': 'Calle 1',
+        'celular': '3000000000',
+    }
+    datos.update(campos)
+    return Cliente.objects.create(**datos)
+
+
+def crear_prestamo(cliente, valor=1000000, **campos):
+    datos = {
+        'cliente': cliente,
+        'prestamista': cliente.prestamista,
+        'valor_inicial': Decimal(valor),
+        'porcentaje_interes': Decimal('5'),
+        'fecha_prestamo': date(2025, 1, 15),
+    }
+    datos.update(campos)
+    return Prestamo.objects.create(**datos)
+
+
+def crear_pago(prestamo, valor, **campos):
+    return Pago.objects.create(prestamo=prestamo, valor_total=Decimal(valor), **campos)
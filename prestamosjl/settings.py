@@ -45,15 +45,22 @@ INSTALLED_APPS = [
     'loans',
     'payments',
     'users.apps.UsersConfig',
+    'audit',
+    'tasks',
 ]
 
 MIDDLEWARE = [
+    # Primero: cuenta las consultas de todos los demás middleware
+    'prestamosjl.middleware.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'prestamosjl.middleware.IdentidadMiddleware',
+    'prestamosjl.middleware.AuditoriaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'prestamosjl.middleware.ReplicaStickinessMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -85,7 +92,7 @@ WSGI_APPLICATION = 'prestamosjl.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3', #'django.db.backends.mysql',
+        'ENGINE': 'prestamosjl.db_backends.sqlite3', #'django.db.backends.mysql',
         'NAME': 'prestamos',
         'USER': 'root',
         'PASSWORD': 'toor',
@@ -94,6 +101,25 @@ DATABASES = {
     }
 }
 
+# Réplica de lectura para reportes y listas (ver prestamosjl/db_router.py).
+# En local, DB_REPLICA apunta a una copia SQLite mantenida con
+# `python manage.py sync_replica --every 10`.
+if os.environ.get('DB_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DB_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['prestamosjl.db_router.ReplicaRouter']
+
+REPLICA_SETTINGS = {
+    'ALIAS': 'replica',
+    'MAX_LAG': 30,          # segundos; más atrasada, se lee del primario
+    'STICKY_SECONDS': 15,   # lecturas al primario tras una escritura de la sesión
+    'LAG_CHECK_TTL': 5,     # segundos entre mediciones del retraso
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -149,3 +175,128 @@ LOGOUT_REDIRECT_URL = LOGIN_URL
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+
+# Autenticación: usuario + perfil + prestamista en una consulta, en caché
+
+AUTHENTICATION_BACKENDS = ['users.identidad.IdentidadBackend']
+
+USER_SETTINGS = {
+    'IDENTITY_CACHE_TTL': 300,  # segundos; se invalida con señales
+}
+
+
+# Préstamos
+
+LOAN_SETTINGS = {
+    'RECEIPT_PREFIX': 'REC',
+    # Montos como pesos enteros (BIGINT) en vez de decimales (ver loans/dinero.py);
+    # cambiarlo en una base existente exige correr convertir_dinero
+    'MONEY': {
+        'INTEGER_PESOS': os.environ.get('MONEY_INTEGER_PESOS', '0') == '1',
+    },
+    # Segundos que se conservan las claves de idempotencia de los pagos (payments/idempotencia.py)
+    'IDEMPOTENCY_TTL': 24 * 3600,
+    # Paneles del dashboard y reportes en hilos paralelos (ver loans/panels.py)
+    'CONCURRENT_PANELS': True,
+    # TTL en segundos de cada fragmento del dashboard (por defecto, el del panel)
+    'DASHBOARD_PANEL_TTL': {},
+    # Movimientos por página en el estado de cuenta del cliente
+    'STATEMENT_PAGE_SIZE': 50,
+    # Penalidades por mora (loans/penalidades.py)
+    'PENALTY': {
+        'DAILY_RATE': 0.1,           # % diario sobre el saldo vencido
+        'GRACE_DAYS': 3,
+        'MAX_PERCENT': 20,           # tope acumulado, % del saldo
+        'MAX_AMOUNT': None,          # tope acumulado en pesos
+        'USURY_MONTHLY_RATE': None,  # tasa de usura mensual (interés + mora)
+    },
+    # Autocompletar de clientes y préstamos en los formularios (loans/busqueda.py)
+    'AUTOCOMPLETE': {
+        'MIN_CHARS': 2,
+        'LIMIT': 10,
+    },
+    # Recordatorios de pago (loans/recordatorios.py, backends en loans/mensajeria.py)
+    'REMINDERS': {
+        'BACKEND': 'loans.mensajeria.ConsolaBackend',
+        'OPTIONS': {'CHANNEL': 'SMS'},
+        'DAYS_AHEAD': 3,         # avisar desde N días antes del vencimiento
+        'MAX_OVERDUE_DAYS': 60,  # y hasta N días después
+        'CONCURRENCY': 4,        # envíos en paralelo
+        'RATE_PER_SECOND': 5,    # límite de la pasarela
+        'MAX_RETRIES': 3,
+    },
+    # Archivo de préstamos cerrados con sus pagos y plan (payments/archivo.py)
+    'ARCHIVE': {
+        'AFTER_MONTHS': 12,  # meses desde el cierre
+        'BATCH_SIZE': 200,   # préstamos por transacción
+    },
+    # Pronóstico de cobros de la cartera (loans/pronostico.py)
+    'FORECAST': {
+        'HORIZON_DAYS': 91,           # días hacia adelante
+        'HISTORY_MONTHS': 6,          # historia de pagos para la probabilidad de pago
+        'PROBABILITY_WEIGHTS': True,
+    },
+}
+
+
+# Auditoría de cambios (ver audit/registro.py y audit/buffer.py)
+
+AUDIT_SETTINGS = {
+    'MODELS': ['loans.Prestamo', 'loans.Cliente', 'loans.CoDeudor', 'payments.Pago'],
+    'FLUSH_INTERVAL': 2.0,  # segundos entre inserciones en lote; 0 = al confirmar
+    'BATCH_SIZE': 200,      # inserta antes si se juntan estos registros
+    'MAX_PENDING': 10000,   # máximo a retener si la base de datos falla
+}
+
+
+# Cola de tareas en la base de datos (ver tasks/cola.py y `manage.py run_worker`)
+
+TASK_SETTINGS = {
+    'CONCURRENCY': 4,       # tareas en paralelo por worker
+    'POLL_INTERVAL': 1.0,   # segundos entre consultas con la cola vacía
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF': 30,          # segundos antes del primer reintento; se duplica en cada uno
+    'BACKOFF_MAX': 3600,
+    'TIMEOUT': 600,         # una tarea en curso más tiempo se da por perdida
+    'RETENTION_DAYS': 7,    # tareas terminadas que se conservan
+    # Tareas programadas: expresión cron (minuto hora día mes día-semana)
+    'SCHEDULE': {
+        'penalidades_diarias': {'task': 'loans.tareas.calcular_penalidades_dia', 'cron': '30 0 * * *'},
+        'causacion_mensual': {'task': 'loans.tareas.causar_intereses_mes', 'cron': '0 1 1 * *'},
+        'foto_cartera_mensual': {'task': 'loans.tareas.foto_cartera_mes', 'cron': '0 2 1 * *'},
+        'recordatorios_diarios': {'task': 'loans.tareas.enviar_recordatorios_dia', 'cron': '0 9 * * *'},
+        'claves_idempotencia': {'task': 'payments.tareas.purgar_claves_idempotencia', 'cron': '15 3 * * *'},
+        'archivo_mensual': {'task': 'payments.tareas.archivar_prestamos_mes', 'cron': '0 4 2 * *'},
+    },
+}
+
+
+# Instrumentación SQL por petición (ver prestamosjl/middleware.py)
+
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('SQL_INSTRUMENTATION', '0') == '1',
+    'N1_THRESHOLD': 5,
+    'RESPONSE_HEADER': os.environ.get('SQL_INSTRUMENTATION_HEADER', '0') == '1',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'prestamosjl.sql': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'prestamosjl.db': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
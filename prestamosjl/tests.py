@@ -0,0 +1,76 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+
+from loans import panels
+from loans.models import Prestamo
+from prestamosjl.middleware import QueryStats, _estadisticas
+from prestamosjl.pruebas import crear_cliente, crear_prestamo
+from users.models import Prestamista, Profile
+
+
+INSTRUMENTACION = {'ENABLED': True, 'N1_THRESHOLD': 5, 'RESPONSE_HEADER': True}
+
+
+def clientes_uno_por_uno(request):
+    """N+1 a propósito: el cliente de cada préstamo en su propia consulta"""
+    nombres = [prestamo.cliente.nombre for prestamo in Prestamo.objects.order_by('id')]
+    return HttpResponse(', '.join(nombres))
+
+
+urlpatterns = [path('n-mas-uno/', clientes_uno_por_uno, name='n_mas_uno')]
+
+
+@override_settings(SQL_INSTRUMENTATION=INSTRUMENTACION)
+class SQLInstrumentationTest(TestCase):
+    """El contador de consultas cubre todo el stack y los hilos de los paneles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        prestamista = Prestamista.objects.create(nombres='Ana', apellidos='Ruiz', cedula='900')
+        cls.user = User.objects.create_user('cajero', password='cajero123')
+        Profile.objects.create(user=cls.user, prestamista=prestamista)
+        cls.prestamista = prestamista
+
+    def test_cuenta_consultas_de_los_demas_middleware(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('prestamosjl.sql'), CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('loans:cliente_lista'))
+        self.assertEqual(response.status_code, 200)
+        # Incluye sesión, usuario y prestamista, que resuelven los middleware
+        self.assertIn(f'queries={len(consultas)};', response['X-SQL-Stats'])
+
+    def test_cuenta_consultas_de_paneles_en_hilo_propio(self):
+        def panel():
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        stats = QueryStats()
+        token = _estadisticas.set(stats)
+        loan_settings = {**settings.LOAN_SETTINGS, 'CONCURRENT_PANELS': True}
+        try:
+            with override_settings(LOAN_SETTINGS=loan_settings):
+                async_to_sync(panels.ejecutar)(panel)
+        finally:
+            _estadisticas.reset(token)
+        self.assertEqual(stats.total, 1)
+
+    @override_settings(ROOT_URLCONF='prestamosjl.tests')
+    def test_detecta_n_mas_uno(self):
+        for _ in range(6):
+            crear_prestamo(crear_cliente(self.prestamista))
+        with self.assertLogs('prestamosjl.sql', 'WARNING') as logs:
+            self.client.get(reverse('n_mas_uno'))
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['view'], 'n_mas_uno')
+        repetidas = {fila['sql']: fila['count'] for fila in registro['n_plus_one']}
+        (sql, veces), = repetidas.items()
+        self.assertEqual(veces, 6)
+        self.assertTrue(sql.startswith('SELECT "loans_cliente"."id"'), sql)
@@ -0,0 +1,59 @@
+// Campos de autocompletar (loans/widgets.py): busca mientras se escribe y
+// guarda el id elegido en el campo oculto indicado en data-destino.
+(function () {
+    function iniciar(caja) {
+        var destino = document.getElementById(caja.dataset.destino);
+        var opciones = document.getElementById(caja.getAttribute('list'));
+        var ids = {};
+        var espera = null;
+        var ultima = null;
+
+        function buscar() {
+            var q = caja.value.trim();
+            if (q === ultima) { return; }
+            ultima = q;
+            fetch(caja.dataset.autocompletar + '?q=' + encodeURIComponent(q), {credentials: 'same-origin'})
+                .then(function (response) { return response.ok ? response.json() : {resultados: []}; })
+                .then(function (data) {
+                    if (caja.value.trim() !== q) { return; }
+                    ids = {};
+                    opciones.innerHTML = '';
+                    data.resultados.forEach(function (resultado) {
+                        ids[resultado.texto] = resultado.id;
+                        var opcion = document.createElement('option');
+                        opcion.value = resultado.texto;
+                        opciones.appendChild(opcion);
+                    });
+                    elegir();
+                })
+                .catch(function () {});
+        }
+
+        function elegir() {
+            if (ids.hasOwnProperty(caja.value)) {
+                destino.value = ids[caja.value];
+                caja.setCustomValidity('');
+            } else if (caja.value.trim() === '') {
+                destino.value = '';
+                caja.setCustomValidity('');
+            }
+        }
+
+        caja.addEventListener('input', function () {
+            // Un texto que no es una opción deja el campo sin elegir
+            if (!ids.hasOwnProperty(caja.value)) { destino.value = ''; }
+            elegir();
+            clearTimeout(espera);
+            espera = setTimeout(buscar, 250);
+        });
+
+        caja.addEventListener('change', function () {
+            elegir();
+            if (caja.value.trim() !== '' && destino.value === '') {
+                caja.setCustomValidity('Seleccione una opción de la lista');
+            }
+        });
+    }
+
+    document.querySelectorAll('[data-autocompletar]').forEach(iniciar);
+})();
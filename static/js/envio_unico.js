@@ -0,0 +1,12 @@
+// Formularios con data-envio-unico: el botón se desactiva al enviar para
+// evitar el doble clic (el servidor además descarta reenvíos por la clave
+// de idempotencia, ver payments/idempotencia.py).
+(function () {
+    document.querySelectorAll('form[data-envio-unico]').forEach(function (form) {
+        form.addEventListener('submit', function () {
+            form.querySelectorAll('button[type="submit"]').forEach(function (boton) {
+                boton.disabled = true;
+            });
+        });
+    });
+})();
@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from tasks.models import Programacion, Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    """Tareas encoladas"""
+
+    list_display = ('id', 'nombre', 'estado', 'intentos', 'ejecutar_desde', 'terminada_en')
+    list_filter = ('estado', 'nombre')
+    search_fields = ('nombre', 'clave')
+    readonly_fields = ('tomada_por', 'tomada_en', 'terminada_en', 'error', 'created_at')
+
+
+@admin.register(Programacion)
+class ProgramacionAdmin(admin.ModelAdmin):
+    """Tareas programadas"""
+
+    list_display = ('nombre', 'ultima')
@@ -0,0 +1,183 @@
+"""
+Cola de tareas sobre la base de datos, sin broker.
+
+Declarar una tarea en el módulo ``tareas.py`` de cualquier app::
+
+    @tarea(max_intentos=5)
+    def optimizar_letras(prestamo_id):
+        ...
+
+y encolarla desde una vista, que responde de inmediato::
+
+    encolar(optimizar_letras, prestamo_id=prestamo.pk, clave=f'letras:{prestamo.pk}')
+
+La tarea se guarda en la transacción en curso: si esta se revierte, la
+tarea no existe. ``clave`` deduplica: mientras haya una tarea activa
+(pendiente o en curso) con la misma clave, ``encolar`` devuelve esa.
+
+Los workers (``manage.py run_worker``) toman lotes con
+``SELECT ... FOR UPDATE SKIP LOCKED`` donde el motor lo soporta; en SQLite
+la toma es un único UPDATE, atómico por el bloqueo de escritura. Un
+fallo se reintenta con espera exponencial hasta ``max_intentos``; una
+tarea en curso más de ``TIMEOUT`` segundos (worker caído) se libera.
+"""
+
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .cron import Cron
+from .models import ESTADOS_ACTIVOS, Programacion, Tarea
+
+
+logger = logging.getLogger('tasks')
+
+REGISTRO = {}
+
+
+def configuracion():
+    config = {
+        'CONCURRENCY': 4, 'POLL_INTERVAL': 1.0, 'MAX_ATTEMPTS': 3,
+        'BACKOFF': 30, 'BACKOFF_MAX': 3600, 'TIMEOUT': 600,
+        'RETENTION_DAYS': 7, 'SCHEDULE': {},
+    }
+    config.update(getattr(settings, 'TASK_SETTINGS', {}))
+    return config
+
+
+def tarea(func=None, *, nombre=None, max_intentos=None, backoff=None):
+    """Registra una función como tarea (``@tarea`` o ``@tarea(...)``)"""
+    def decorador(func):
+        func.nombre_tarea = nombre or f'{func.__module__}.{func.__name__}'
+        func.max_intentos = max_intentos
+        func.backoff = backoff
+        REGISTRO[func.nombre_tarea] = func
+        return func
+    return decorador(func) if func else decorador
+
+
+def encolar(func, clave=None, ejecutar_en=None, **argumentos):
+    """Encola `func` (función registrada o su nombre) con `argumentos`. Devuelve la Tarea."""
+    nombre = getattr(func, 'nombre_tarea', func)
+    funcion = REGISTRO.get(nombre)
+    if funcion is None:
+        raise KeyError(f'Tarea no registrada: {nombre}')
+
+    tarea = Tarea(
+        nombre=nombre,
+        argumentos=argumentos,
+        clave=clave,
+        ejecutar_desde=ejecutar_en or timezone.now(),
+        max_intentos=funcion.max_intentos or configuracion()['MAX_ATTEMPTS'],
+    )
+    if clave is None:
+        tarea.save()
+        return tarea
+
+    activa = Tarea.objects.filter(clave=clave, estado__in=ESTADOS_ACTIVOS).first()
+    if activa:
+        return activa
+    try:
+        with transaction.atomic():
+            tarea.save()
+    except IntegrityError:
+        # Otro proceso la encoló entre la consulta y el INSERT
+        return Tarea.objects.get(clave=clave, estado__in=ESTADOS_ACTIVOS)
+    return tarea
+
+
+# ============= WORKER =============
+
+def tomar(worker, cantidad):
+    """Reserva hasta `cantidad` tareas vencidas para `worker`. Devuelve sus ids."""
+    ahora = timezone.now()
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    vencidas = Tarea.objects.filter(
+        estado='PENDIENTE', ejecutar_desde__lte=ahora
+    ).order_by('ejecutar_desde', 'id')
+    reserva = dict(estado='EN_CURSO', tomada_por=token, tomada_en=ahora, intentos=F('intentos') + 1)
+
+    conexion = connections[router.db_for_write(Tarea)]
+    if conexion.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(vencidas.select_for_update(skip_locked=True).values_list('id', flat=True)[:cantidad])
+            Tarea.objects.filter(id__in=ids).update(**reserva)
+        return ids
+
+    # SQLite: un solo UPDATE ... WHERE id IN (SELECT ... LIMIT n)
+    Tarea.objects.filter(
+        id__in=Subquery(vencidas.values('id')[:cantidad]), estado='PENDIENTE'
+    ).update(**reserva)
+    return list(Tarea.objects.filter(tomada_por=token, estado='EN_CURSO').values_list('id', flat=True))
+
+
+def espera(funcion, intentos):
+    config = configuracion()
+    base = funcion.backoff if funcion and funcion.backoff is not None else config['BACKOFF']
+    return min(base * 2 ** (intentos - 1), config['BACKOFF_MAX'])
+
+
+def ejecutar(tarea_id):
+    """Ejecuta una tarea ya reservada y guarda su resultado"""
+    tarea = Tarea.objects.get(pk=tarea_id)
+    reservada = Tarea.objects.filter(pk=tarea.pk, tomada_por=tarea.tomada_por, estado='EN_CURSO')
+    funcion = REGISTRO.get(tarea.nombre)
+    try:
+        if funcion is None:
+            raise KeyError(f'Tarea no registrada: {tarea.nombre}')
+        funcion(**tarea.argumentos)
+    except Exception:
+        error = traceback.format_exc()
+        if funcion is not None and tarea.intentos < tarea.max_intentos:
+            segundos = espera(funcion, tarea.intentos)
+            logger.warning('Tarea %s (%s) falló; reintento en %ss', tarea.pk, tarea.nombre, segundos)
+            reservada.update(
+                estado='PENDIENTE', tomada_por='', error=error,
+                ejecutar_desde=timezone.now() + timedelta(seconds=segundos),
+            )
+        else:
+            logger.error('Tarea %s (%s) falló definitivamente', tarea.pk, tarea.nombre)
+            reservada.update(estado='FALLIDA', terminada_en=timezone.now(), error=error)
+        return False
+    reservada.update(estado='COMPLETADA', terminada_en=timezone.now(), error='')
+    return True
+
+
+def liberar_vencidas():
+    """Devuelve a la cola las tareas de workers caídos; las agotadas, fallan"""
+    limite = timezone.now() - timedelta(seconds=configuracion()['TIMEOUT'])
+    colgadas = Tarea.objects.filter(estado='EN_CURSO', tomada_en__lt=limite)
+    fallidas = colgadas.filter(intentos__gte=F('max_intentos')).update(
+        estado='FALLIDA', terminada_en=timezone.now(), error='Tiempo agotado',
+    )
+    liberadas = colgadas.update(estado='PENDIENTE', tomada_por='', ejecutar_desde=timezone.now())
+    return liberadas, fallidas
+
+
+def purgar():
+    """Borra las tareas terminadas hace más de RETENTION_DAYS días"""
+    limite = timezone.now() - timedelta(days=configuracion()['RETENTION_DAYS'])
+    return Tarea.objects.filter(estado__in=['COMPLETADA', 'FALLIDA'], terminada_en__lt=limite).delete()[0]
+
+
+def programar(momento=None):
+    """
+    Encola las tareas de ``SCHEDULE`` cuya expresión cron coincide con el
+    minuto actual. Varios workers pueden llamarla: solo uno gana la franja.
+    """
+    franja = (momento or timezone.localtime()).replace(second=0, microsecond=0)
+    encoladas = []
+    for nombre, programa in configuracion()['SCHEDULE'].items():
+        if not Cron(programa['cron']).coincide(franja):
+            continue
+        Programacion.objects.get_or_create(nombre=nombre)
+        ganada = Programacion.objects.filter(nombre=nombre).exclude(ultima__gte=franja).update(ultima=franja)
+        if ganada:
+            encoladas.append(encolar(programa['task'], clave=f'cron:{nombre}', **programa.get('kwargs', {})))
+    return encoladas
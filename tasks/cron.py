@@ -0,0 +1,51 @@
+"""
+Expresiones cron de cinco campos: minuto hora día mes día-de-la-semana.
+
+Cada campo admite ``*``, ``*/n``, ``a``, ``a-b``, ``a-b/n`` y listas
+separadas por comas. El día de la semana va de 0 (domingo) a 6; 7 también
+es domingo. Como en cron, si se restringen el día del mes y el de la
+semana basta con que coincida uno de los dos.
+"""
+
+CAMPOS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _valores(campo, minimo, maximo):
+    valores = set()
+    for parte in campo.split(','):
+        rango, _, paso = parte.partition('/')
+        paso = int(paso) if paso else 1
+        if rango == '*':
+            inicio, fin = minimo, maximo
+        elif '-' in rango:
+            inicio, fin = (int(valor) for valor in rango.split('-'))
+        else:
+            inicio = fin = int(rango)
+        if not (minimo <= inicio <= fin <= maximo) or paso < 1:
+            raise ValueError(f'Campo cron fuera de rango: {campo}')
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class Cron:
+
+    def __init__(self, expresion):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f'Se esperaban 5 campos en la expresión cron: {expresion!r}')
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+            _valores(campo, minimo, maximo) for campo, (minimo, maximo) in zip(campos, CAMPOS)
+        )
+        self.dias_semana = {dia % 7 for dia in dias_semana}
+        self.todo_dia = campos[2] == '*'
+        self.toda_semana = campos[4] == '*'
+
+    def coincide(self, momento):
+        if momento.minute not in self.minutos or momento.hour not in self.horas or momento.month not in self.meses:
+            return False
+        dia = momento.day in self.dias
+        semana = (momento.weekday() + 1) % 7 in self.dias_semana
+        if self.todo_dia or self.toda_semana:
+            return dia and semana
+        return dia or semana
@@ -0,0 +1,40 @@
+"""
+Worker de la cola de tareas (tasks/cola.py). Se pueden correr varios a la
+vez, en una o varias máquinas: cada tarea la ejecuta uno solo.
+
+    python manage.py run_worker                      # hilos (TASK_SETTINGS['CONCURRENCY'])
+    python manage.py run_worker --concurrencia 8 --procesos
+    python manage.py run_worker --una-vez            # vacía la cola y termina
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas encoladas y las programadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, help='Tareas en paralelo')
+        parser.add_argument('--procesos', action='store_true', help='Pool de procesos en vez de hilos')
+        parser.add_argument('--intervalo', type=float, help='Segundos entre consultas a la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Termina cuando no quedan tareas vencidas')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrencia=options['concurrencia'],
+            procesos=options['procesos'],
+            intervalo=options['intervalo'],
+        )
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(senal, lambda *_: worker.detener.set())
+
+        modo = 'procesos' if worker.procesos else 'hilos'
+        self.stdout.write(f'Worker {worker.nombre}: {worker.concurrencia} {modo}')
+        worker.run(una_vez=options['una_vez'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{worker.ejecutadas} tareas ejecutadas, {worker.fallidas} con error'
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:53
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Programacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('ultima', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Programación',
+                'verbose_name_plural': 'Programaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('argumentos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=10)),
+                ('clave', models.CharField(blank=True, help_text='Deduplicación: solo una tarea activa por clave', max_length=150, null=True)),
+                ('ejecutar_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3)),
+                ('tomada_por', models.CharField(blank=True, max_length=80)),
+                ('tomada_en', models.DateTimeField(blank=True, null=True)),
+                ('terminada_en', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['ejecutar_desde'], name='tarea_pendiente_idx'), models.Index(fields=['tomada_por'], name='tarea_tomada_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado__in', ['PENDIENTE', 'EN_CURSO'])), fields=('clave',), name='tarea_clave_activa_uniq')],
+            },
+        ),
+    ]
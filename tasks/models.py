@@ -0,0 +1,75 @@
+"""
+Cola de tareas en la base de datos (ver tasks/cola.py)
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+ESTADOS_ACTIVOS = ['PENDIENTE', 'EN_CURSO']
+
+
+class Tarea(models.Model):
+    """Trabajo pendiente o ya ejecutado por un worker"""
+    
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADA', 'Completada'),
+        ('FALLIDA', 'Fallida'),
+    ]
+    
+    nombre = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='PENDIENTE')
+    clave = models.CharField(
+        max_length=150, null=True, blank=True,
+        help_text="Deduplicación: solo una tarea activa por clave"
+    )
+    ejecutar_desde = models.DateTimeField(default=timezone.now)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    tomada_por = models.CharField(max_length=80, blank=True)
+    tomada_en = models.DateTimeField(null=True, blank=True)
+    terminada_en = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=models.Q(estado__in=ESTADOS_ACTIVOS),
+                name='tarea_clave_activa_uniq',
+            ),
+        ]
+        indexes = [
+            # Lo que el worker busca en cada vuelta: pendientes ya vencidas
+            models.Index(
+                fields=['ejecutar_desde'],
+                name='tarea_pendiente_idx',
+                condition=models.Q(estado='PENDIENTE'),
+            ),
+            models.Index(fields=['tomada_por'], name='tarea_tomada_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.get_estado_display()})"
+
+
+class Programacion(models.Model):
+    """Última franja en que se encoló cada tarea programada (cron)"""
+    
+    nombre = models.CharField(max_length=100, unique=True)
+    ultima = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Programación"
+        verbose_name_plural = "Programaciones"
+    
+    def __str__(self):
+        return f"{self.nombre}: {self.ultima}"
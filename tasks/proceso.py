@@ -0,0 +1,16 @@
+"""
+Punto de entrada de los procesos del pool (``run_worker --procesos``).
+
+Los procesos arrancan con ``spawn`` y desempaquetan estas funciones antes
+de configurar Django: este módulo no importa modelos al cargarse.
+"""
+
+
+def iniciar():
+    import django
+    django.setup()
+
+
+def ejecutar(tarea_id):
+    from .worker import ejecutar_en_pool
+    return ejecutar_en_pool(tarea_id)
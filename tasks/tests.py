@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from tasks import cola
+from tasks.cron import Cron
+from tasks.models import Tarea
+
+
+EJECUTADAS = []
+
+
+@cola.tarea(max_intentos=2, backoff=10)
+def anotar(valor, fallar=False):
+    if fallar:
+        raise RuntimeError(valor)
+    EJECUTADAS.append(valor)
+
+
+class CronTest(SimpleTestCase):
+
+    def test_campos(self):
+        cada_cuarto = Cron('*/15 8-17 * * 1-5')
+        lunes = datetime(2025, 3, 3, 8, 45)
+        self.assertTrue(cada_cuarto.coincide(lunes))
+        self.assertFalse(cada_cuarto.coincide(lunes.replace(minute=50)))
+        self.assertFalse(cada_cuarto.coincide(lunes.replace(hour=18, minute=0)))
+        self.assertFalse(cada_cuarto.coincide(datetime(2025, 3, 2, 9, 0)))  # domingo
+
+    def test_dia_del_mes_o_de_la_semana(self):
+        # Como en cron: el 13 de cada mes o cualquier viernes
+        cron = Cron('0 0 13 * 5')
+        self.assertTrue(cron.coincide(datetime(2025, 6, 13)))  # viernes 13
+        self.assertTrue(cron.coincide(datetime(2025, 3, 13)))  # jueves
+        self.assertTrue(cron.coincide(datetime(2025, 3, 14)))  # viernes
+        self.assertFalse(cron.coincide(datetime(2025, 3, 15)))
+        # 7 también es domingo
+        self.assertTrue(Cron('0 0 * * 7').coincide(datetime(2025, 3, 2)))
+
+    def test_expresion_invalida(self):
+        for expresion in ['* * * *', '60 * * * *', '* * 0 * *', '*/0 * * * *', '5-1 * * * *']:
+            with self.assertRaises(ValueError, msg=expresion):
+                Cron(expresion)
+
+
+class ColaTest(TestCase):
+
+    def setUp(self):
+        EJECUTADAS.clear()
+
+    def test_encolar_con_clave_deduplica(self):
+        primera = cola.encolar(anotar, clave='unica', valor=1)
+        self.assertEqual(cola.encolar(anotar, clave='unica', valor=2), primera)
+        self.assertEqual(Tarea.objects.count(), 1)
+        with self.assertRaises(KeyError):
+            cola.encolar('no.registrada')
+
+    def test_encolar_se_revierte_con_la_transaccion(self):
+        try:
+            with transaction.atomic():
+                cola.encolar(anotar, valor=1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_tomar_solo_vencidas_y_una_vez(self):
+        tareas = [cola.encolar(anotar, valor=n) for n in range(3)]
+        cola.encolar(anotar, valor=9, ejecutar_en=timezone.now() + timedelta(hours=1))
+
+        ids = cola.tomar('w1', 2)
+        self.assertEqual(sorted(ids), [tareas[0].pk, tareas[1].pk])
+        self.assertEqual(cola.tomar('w2', 5), [tareas[2].pk])
+        self.assertEqual(cola.tomar('w3', 5), [])
+        self.assertEqual(Tarea.objects.get(pk=ids[0]).intentos, 1)
+
+    def test_ejecutar_reintenta_y_falla(self):
+        tarea = cola.encolar(anotar, valor='x', fallar=True)
+        cola.tomar('w', 1)
+        with self.assertLogs('tasks', 'WARNING'):
+            self.assertFalse(cola.ejecutar(tarea.pk))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'PENDIENTE')
+        # Primer reintento: backoff de la tarea (10 s)
+        self.assertAlmostEqual(
+            (tarea.ejecutar_desde - timezone.now()).total_seconds(), 10, delta=2,
+        )
+        Tarea.objects.filter(pk=tarea.pk).update(ejecutar_desde=timezone.now())
+        cola.tomar('w', 1)
+        with self.assertLogs('tasks', 'ERROR'):
+            self.assertFalse(cola.ejecutar(tarea.pk))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ('FALLIDA', 2))
+        self.assertIn('RuntimeError', tarea.error)
+
+    def test_ejecutar_completa(self):
+        tarea = cola.encolar(anotar, valor=7)
+        cola.tomar('w', 1)
+        self.assertTrue(cola.ejecutar(tarea.pk))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, EJECUTADAS), ('COMPLETADA', [7]))
+
+    def test_liberar_vencidas(self):
+        colgada, agotada = cola.encolar(anotar, valor=1), cola.encolar(anotar, valor=2)
+        cola.tomar('caido', 2)
+        hace_rato = timezone.now() - timedelta(seconds=cola.configuracion()['TIMEOUT'] + 1)
+        Tarea.objects.update(tomada_en=hace_rato)
+        Tarea.objects.filter(pk=agotada.pk).update(intentos=2)
+
+        self.assertEqual(cola.liberar_vencidas(), (1, 1))
+        estados = dict(Tarea.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados, {colgada.pk: 'PENDIENTE', agotada.pk: 'FALLIDA'})
+        self.assertEqual(cola.tomar('w', 5), [colgada.pk])
+
+    def test_programar_una_vez_por_franja(self):
+        programa = {'anotar': {'task': anotar.nombre_tarea, 'cron': '30 4 * * *', 'kwargs': {'valor': 1}}}
+        momento = timezone.make_aware(datetime(2025, 3, 3, 4, 30, 12))
+        with override_settings(TASK_SETTINGS={**getattr(settings, 'TASK_SETTINGS', {}), 'SCHEDULE': programa}):
+            self.assertEqual(len(cola.programar(momento)), 1)
+            self.assertEqual(cola.programar(momento + timedelta(seconds=30)), [])
+            self.assertEqual(cola.programar(momento + timedelta(minutes=1)), [])
+        self.assertEqual(Tarea.objects.get().clave, 'cron:anotar')
@@ -0,0 +1,102 @@
+"""
+Worker de la cola (tasks/cola.py): reserva tareas en lotes y las ejecuta
+en un pool de hilos o de procesos.
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+from . import cola, proceso
+
+
+logger = logging.getLogger('tasks')
+
+MANTENIMIENTO_CADA = 60  # segundos
+
+
+def ejecutar_en_pool(tarea_id):
+    # Igual que en una petición: no reutilizar conexiones caídas o vencidas
+    close_old_connections()
+    try:
+        return cola.ejecutar(tarea_id)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+
+    def __init__(self, concurrencia=None, procesos=False, intervalo=None, nombre=None):
+        config = cola.configuracion()
+        self.concurrencia = concurrencia or config['CONCURRENCY']
+        self.procesos = procesos
+        self.intervalo = intervalo or config['POLL_INTERVAL']
+        self.nombre = nombre or f'{socket.gethostname()}:{os.getpid()}'
+        self.detener = threading.Event()
+        self.ejecutadas = 0
+        self.fallidas = 0
+
+    def pool(self):
+        if self.procesos:
+            # spawn: los procesos no heredan las conexiones abiertas del padre
+            return ProcessPoolExecutor(
+                max_workers=self.concurrencia,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=proceso.iniciar,
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix='tarea')
+
+    def run(self, una_vez=False):
+        """Procesa tareas hasta `detener` (o, con `una_vez`, hasta vaciar la cola)"""
+        en_vuelo = set()
+        ultimo_minuto = None
+        ultimo_mantenimiento = 0
+        objetivo = proceso.ejecutar if self.procesos else ejecutar_en_pool
+        with self.pool() as pool:
+            while not self.detener.is_set():
+                ahora = time.monotonic()
+                if ahora - ultimo_mantenimiento >= MANTENIMIENTO_CADA:
+                    self.mantenimiento()
+                    ultimo_mantenimiento = ahora
+                minuto = int(time.time() // 60)
+                if minuto != ultimo_minuto and not una_vez:
+                    cola.programar()
+                    ultimo_minuto = minuto
+
+                libres = self.concurrencia - len(en_vuelo)
+                ids = cola.tomar(self.nombre, libres) if libres else []
+                for tarea_id in ids:
+                    en_vuelo.add(pool.submit(objetivo, tarea_id))
+
+                if en_vuelo:
+                    terminadas, en_vuelo = wait(en_vuelo, timeout=self.intervalo, return_when=FIRST_COMPLETED)
+                    for futuro in terminadas:
+                        self.contar(futuro)
+                elif una_vez:
+                    break
+                else:
+                    self.detener.wait(self.intervalo)
+
+            for futuro in wait(en_vuelo).done:
+                self.contar(futuro)
+
+    def contar(self, futuro):
+        try:
+            exito = futuro.result()
+        except Exception:
+            logger.exception('Error inesperado ejecutando una tarea')
+            exito = False
+        self.ejecutadas += 1
+        self.fallidas += not exito
+
+    def mantenimiento(self):
+        liberadas, fallidas = cola.liberar_vencidas()
+        if liberadas or fallidas:
+            logger.warning('Tareas colgadas: %s liberadas, %s fallidas', liberadas, fallidas)
+        cola.purgar()
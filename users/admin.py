@@ -3,7 +3,7 @@
 from django.contrib import admin
 
 #Models
-from users.models import Profile
+from users.models import Prestamista, Profile
 
 
 @admin.register(Profile)
@@ -18,4 +18,19 @@ class ProfileAdmin(admin.ModelAdmin):
     )
     list_filter = (
 
-        )
\ No newline at end of file
+        )
+
+
+@admin.register(Prestamista)
+class PrestamistaAdmin(admin.ModelAdmin):
+    """ Prestamista admin (métricas anotadas, sin N+1). """
+
+    list_display = (
+        'codigo', 'nombre_completo', 'cedula', 'activo',
+        'total_prestado', 'prestamos_activos', 'prestamos_mora', 'recaudado_mes',
+    )
+    search_fields = ('codigo', 'nombres', 'apellidos', 'cedula')
+    list_filter = ('activo',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_metrics()
@@ -8,6 +8,7 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         """Se ejecuta cada vez que se levanta el servidor Django."""
+        from . import identidad  # noqa: F401 (conecta la invalidación de la identidad en caché)
         #import users.signals
         """from django.db.utils import OperationalError, ProgrammingError
         from django.contrib.auth import get_user_model
@@ -0,0 +1,129 @@
+"""
+Identidad de la petición: usuario, perfil y prestamista.
+
+``IdentidadBackend.get_user`` carga User + Profile + Prestamista con una
+sola consulta (``select_related``) y guarda el resultado en caché durante
+``USER_SETTINGS['IDENTITY_CACHE_TTL']`` segundos. Las señales de este
+módulo invalidan la entrada cuando cambia cualquiera de los tres modelos.
+
+``IdentidadMiddleware`` (prestamosjl/middleware.py) expone el prestamista
+resuelto como ``request.prestamista`` y, para vistas async, como
+``await request.aprestamista()`` (igual que ``request.user`` y
+``request.auser()``). Un usuario sin perfil o sin prestamista no tiene
+cartera: ``request.prestamista`` es None, los managers ``del_prestamista``
+no devuelven nada y las vistas marcadas con ``prestamista_requerido``
+responden 403.
+
+Con varios procesos la invalidación solo es inmediata si ``CACHES`` usa
+un backend compartido (Redis, Memcached, base de datos).
+"""
+
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Prestamista, Profile
+
+
+def _clave(user_id):
+    return f'identidad:{user_id}'
+
+
+def _ttl():
+    return getattr(settings, 'USER_SETTINGS', {}).get('IDENTITY_CACHE_TTL', 300)
+
+
+def invalidar_identidad(*user_ids):
+    cache.delete_many([_clave(user_id) for user_id in user_ids])
+
+
+class IdentidadBackend(ModelBackend):
+    """ModelBackend que resuelve usuario, perfil y prestamista en una consulta"""
+
+    def get_user(self, user_id):
+        user = cache.get(_clave(user_id))
+        if user is None:
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.select_related(
+                    'profile__prestamista'
+                ).get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            cache.set(_clave(user_id), user, _ttl())
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # ModelBackend.aget_user no pasa por get_user: sin esto, las vistas
+        # async harían consultas separadas para usuario, perfil y prestamista
+        return await sync_to_async(self.get_user)(user_id)
+
+
+def prestamista_de(user):
+    """Prestamista del usuario; None si no tiene perfil o prestamista"""
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.profile.prestamista
+    except Profile.DoesNotExist:
+        return None
+
+
+def obtener_prestamista(request):
+    if not hasattr(request, '_cached_prestamista'):
+        request._cached_prestamista = prestamista_de(request.user)
+    return request._cached_prestamista
+
+
+async def aobtener_prestamista(request):
+    if not hasattr(request, '_cached_prestamista'):
+        user = await request.auser()
+        request._cached_prestamista = await sync_to_async(prestamista_de)(user)
+    return request._cached_prestamista
+
+
+def prestamista_requerido(view):
+    """Vista que actúa sobre la cartera del usuario: sin prestamista, 403"""
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _wrapped(request, *args, **kwargs):
+            if await aobtener_prestamista(request) is None:
+                raise PermissionDenied('El usuario no tiene prestamista asignado')
+            return await view(request, *args, **kwargs)
+        return _wrapped
+
+    @wraps(view)
+    def _wrapped(request, *args, **kwargs):
+        if obtener_prestamista(request) is None:
+            raise PermissionDenied('El usuario no tiene prestamista asignado')
+        return view(request, *args, **kwargs)
+
+    return _wrapped
+
+
+# ============= INVALIDACIÓN =============
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def _usuario_cambiado(sender, instance, **kwargs):
+    invalidar_identidad(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def _perfil_cambiado(sender, instance, **kwargs):
+    invalidar_identidad(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Prestamista)
+def _prestamista_cambiado(sender, instance, **kwargs):
+    invalidar_identidad(*Profile.objects.filter(
+        prestamista_id=instance.pk
+    ).values_list('user_id', flat=True))
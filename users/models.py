@@ -2,10 +2,49 @@
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
 
+ESTADOS_ABIERTOS = ['ACTIVO', 'VENCIDO', 'MORA']
+
+
+class PrestamistaQuerySet(models.QuerySet):
+
+    def with_metrics(self, hoy=None):
+        """
+        Anota en una sola consulta agrupada las métricas de exposición:
+        saldo prestado, préstamos activos, préstamos en mora y lo recaudado
+        en el mes. Las propiedades del modelo usan estos valores si existen.
+        """
+        from loans.dinero import DineroField
+        from payments.models import Pago
+
+        hoy = hoy or timezone.now().date()
+        # Subconsulta para no multiplicar las filas de préstamos por sus pagos
+        recaudado = Pago.objects.filter(
+            prestamista=OuterRef('pk'),
+            anulado=False,
+            fecha_pago__gte=hoy.replace(day=1),
+            fecha_pago__lte=hoy,
+        ).order_by().values('prestamista').annotate(
+            total=Sum('valor_total')
+        ).values('total')
+
+        cero = models.Value(Decimal('0'), output_field=DineroField(max_digits=14))
+        return self.annotate(
+            metrica_total_prestado=Coalesce(
+                Sum('prestamos__saldo_actual', filter=Q(prestamos__estado__in=ESTADOS_ABIERTOS)), cero
+            ),
+            metrica_prestamos_activos=Count('prestamos', filter=Q(prestamos__estado='ACTIVO')),
+            metrica_prestamos_mora=Count('prestamos', filter=Q(prestamos__estado='MORA')),
+            metrica_recaudado_mes=Coalesce(Subquery(recaudado), cero),
+        )
+
+
 class Prestamista(models.Model):
     """ Prestamista model """
     
@@ -42,6 +81,8 @@ class Prestamista(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
     
+    objects = PrestamistaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Prestamista"
         verbose_name_plural = "Prestamistas"
@@ -57,10 +98,12 @@ class Prestamista(models.Model):
     @property
     def total_prestado(self):
         """Total de dinero prestado actualmente"""
+        if hasattr(self, 'metrica_total_prestado'):
+            return self.metrica_total_prestado
         from loans.models import Prestamo
         return Prestamo.objects.filter(
             prestamista=self,
-            estado__in=['ACTIVO', 'VENCIDO', 'MORA']
+            estado__in=ESTADOS_ABIERTOS
         ).aggregate(
             total=models.Sum('saldo_actual')
         )['total'] or Decimal('0')
@@ -68,12 +111,35 @@ class Prestamista(models.Model):
     @property
     def prestamos_activos(self):
         """Cantidad de préstamos activos"""
+        if hasattr(self, 'metrica_prestamos_activos'):
+            return self.metrica_prestamos_activos
         from loans.models import Prestamo
         return Prestamo.objects.filter(
             prestamista=self,
             estado='ACTIVO'
         ).count()
     
+    @property
+    def prestamos_mora(self):
+        """Cantidad de préstamos en mora"""
+        if hasattr(self, 'metrica_prestamos_mora'):
+            return self.metrica_prestamos_mora
+        return self.prestamos.filter(estado='MORA').count()
+    
+    @property
+    def recaudado_mes(self):
+        """Total recaudado (pagos no anulados) en el mes en curso"""
+        if hasattr(self, 'metrica_recaudado_mes'):
+            return self.metrica_recaudado_mes
+        from payments.models import Pago
+        hoy = timezone.now().date()
+        return Pago.objects.filter(
+            prestamista=self,
+            anulado=False,
+            fecha_pago__gte=hoy.replace(day=1),
+            fecha_pago__lte=hoy,
+        ).aggregate(total=Sum('valor_total'))['total'] or Decimal('0')
+    
     def save(self, *args, **kwargs):
         # Generar código automático si no existe
         if not self.codigo:
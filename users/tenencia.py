@@ -0,0 +1,55 @@
+"""
+Cartera por prestamista.
+
+``Prestamo``, ``Pago`` y ``Cliente`` tienen una columna ``prestamista`` y,
+además de ``objects`` (todas las filas: admin, comandos, tareas), un
+manager ``del_prestamista`` que filtra solo las filas del prestamista en
+curso::
+
+    Prestamo.del_prestamista.filter(estado='MORA')
+
+En una petición, el prestamista en curso es ``request.prestamista``
+(``IdentidadMiddleware`` lo deja en ``_prestamista`` al empezar). Fuera de
+una petición se fija con ``usar_prestamista``; sin prestamista el manager
+no devuelve nada. Los índices de esos modelos empiezan por
+``prestamista``, así cada consulta recorre solo la cartera de un
+prestamista.
+
+Las vistas async deben resolver antes ``await request.aprestamista()``:
+el manager lo lee de forma síncrona.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+from django.db import models
+
+
+# Función sin argumentos que devuelve el prestamista en curso (o None)
+_prestamista = contextvars.ContextVar('prestamista_actual', default=None)
+
+
+def prestamista_actual():
+    obtener = _prestamista.get()
+    return obtener() if obtener is not None else None
+
+
+@contextmanager
+def usar_prestamista(prestamista):
+    """Fija el prestamista en curso dentro del bloque (tareas, comandos, shell)"""
+    token = _prestamista.set(lambda: prestamista)
+    try:
+        yield prestamista
+    finally:
+        _prestamista.reset(token)
+
+
+class DelPrestamistaManager(models.Manager):
+    """Filas del prestamista en curso; sin prestamista, ninguna"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        prestamista = prestamista_actual()
+        if prestamista is None:
+            return queryset.none()
+        return queryset.filter(prestamista_id=prestamista.pk)
@@ -1,3 +1,110 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from prestamosjl.perf import RoutePerformanceMixin
+from prestamosjl.pruebas import crear_cliente, crear_pago, crear_prestamista, crear_prestamo, crear_usuario
+from users.identidad import prestamista_de
+from users.models import Prestamista
+
+
+class UsersRoutesPerformanceTest(RoutePerformanceMixin, TestCase):
+    """Presupuesto de consultas para todas las rutas de users.urls"""
+
+    urls_module = 'users.urls'
+    namespace = 'users'
+    login = False
+    routes = {
+        'users:login': ('GET', None, None),
+        'users:login[POST]': ('POST', None, {'username': 'cajero', 'password': 'cajero123'}),
+        'users:logout': ('GET', None, None),
+        'users:signup': ('GET', None, None),
+    }
+
+
+class TenenciaTest(TestCase):
+    """Cada usuario ve solo la cartera de su prestamista"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = crear_prestamista(), crear_prestamista()
+        cls.user_a = crear_usuario('usuario_a', cls.a)
+        cls.cliente_b = crear_cliente(cls.b)
+        cls.prestamo_b = crear_prestamo(cls.cliente_b)
+        cls.pago_b = crear_pago(cls.prestamo_b, 100000)
+        cls.cliente_a = crear_cliente(cls.a)
+        cls.prestamo_a = crear_prestamo(cls.cliente_a)
+        cls.pago_a = crear_pago(cls.prestamo_a, 100000)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_prestamista_de(self):
+        self.assertEqual(prestamista_de(self.user_a), self.a)
+        self.assertIsNone(prestamista_de(crear_usuario('sin_perfil', perfil=False)))
+        self.assertIsNone(prestamista_de(crear_usuario('perfil_vacio')))
+
+    def test_sin_prestamista_no_ve_nada(self):
+        for user in (crear_usuario('sin_perfil', perfil=False), crear_usuario('perfil_vacio')):
+            self.client.force_login(user)
+            response = self.client.get(reverse('loans:cliente_lista'))
+            self.assertEqual(list(response.context['clientes']), [])
+            response = self.client.get(reverse('loans:prestamo_lista'))
+            self.assertEqual(list(response.context['prestamos']), [])
+            response = self.client.get(reverse('payments:pago_lista'))
+            self.assertEqual(list(response.context['pagos']), [])
+            self.assertEqual(self.client.get(reverse('loans:cliente_detalle', args=[self.cliente_a.pk])).status_code, 404)
+            # Lo que necesita un prestamista dueño se rechaza
+            for nombre, kwargs in [
+                ('loans:cliente_crear', {}),
+                ('loans:prestamo_crear', {}),
+                ('loans:pronostico_cobros', {}),
+                ('loans:reporte_historico', {}),
+                ('loans:dashboard_panel', {'nombre': 'estadisticas'}),
+            ]:
+                self.assertEqual(self.client.get(reverse(nombre, kwargs=kwargs)).status_code, 403, nombre)
+            self.assertEqual(self.client.post(reverse('loans:recordatorios_enviar')).status_code, 403)
+            self.client.logout()
+
+    def test_no_lee_detalle_de_otro_prestamista(self):
+        self.client.force_login(self.user_a)
+        for nombre, propio, ajeno in [
+            ('loans:cliente_detalle', self.cliente_a, self.cliente_b),
+            ('loans:prestamo_detalle', self.prestamo_a, self.prestamo_b),
+            ('payments:pago_detalle', self.pago_a, self.pago_b),
+        ]:
+            self.assertEqual(self.client.get(reverse(nombre, args=[propio.pk])).status_code, 200, nombre)
+            self.assertEqual(self.client.get(reverse(nombre, args=[ajeno.pk])).status_code, 404, nombre)
+
+    def test_listas_solo_del_prestamista(self):
+        self.client.force_login(self.user_a)
+        response = self.client.get(reverse('loans:cliente_lista'))
+        self.assertEqual(list(response.context['clientes']), [self.cliente_a])
+        response = self.client.get(reverse('payments:pago_lista'))
+        self.assertEqual(list(response.context['pagos']), [self.pago_a])
+
+
+class MetricasPrestamistaTest(TestCase):
+    """with_metrics anota en una consulta lo mismo que calculan las propiedades"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestamista = crear_prestamista()
+        cliente = crear_cliente(cls.prestamista)
+        crear_pago(crear_prestamo(cliente, valor=1000000), 200000, valor_capital=200000)
+        crear_prestamo(cliente, valor=500000, estado='MORA')
+        crear_pago(crear_prestamo(cliente, valor=300000), 300000, valor_capital=300000)
+        crear_prestamista()
+
+    def metricas(self, prestamista):
+        return (
+            prestamista.total_prestado, prestamista.prestamos_activos,
+            prestamista.prestamos_mora, prestamista.recaudado_mes,
+        )
+
+    def test_anotadas_igual_a_las_propiedades(self):
+        with self.assertNumQueries(1):
+            anotados = {p.pk: self.metricas(p) for p in Prestamista.objects.with_metrics()}
+        for prestamista in Prestamista.objects.all():
+            self.assertEqual(anotados[prestamista.pk], self.metricas(prestamista))
+        self.assertEqual(anotados[self.prestamista.pk], (1300000, 1, 1, 500000))